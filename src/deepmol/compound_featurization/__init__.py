@@ -2,16 +2,20 @@ import warnings
 
 from .base_featurizer import MolecularFeaturizer
 
+from .cache import FeaturizationCache
+
 from .rdkit_descriptors import ThreeDimensionalMoleculeGenerator, All3DDescriptors, AutoCorr3D, \
     RadialDistributionFunction, PlaneOfBestFit, MORSE, WHIM, RadiusOfGyration, InertialShapeFactor, Eccentricity, \
     Asphericity, SpherocityIndex, PrincipalMomentsOfInertia, NormalizedPrincipalMomentsRatios, \
-    generate_conformers_to_sdf_file, TwoDimensionDescriptors
+    generate_conformers_to_sdf_file, TwoDimensionDescriptors, descriptor_costs
 
 from .rdkit_fingerprints import MorganFingerprint, AtomPairFingerprint, LayeredFingerprint, RDKFingerprint, \
     MACCSkeysFingerprint
 
 from .similarity_matrix import TanimotoSimilarityMatrix
 
+from .reference_similarity import ReferenceSimilarity
+
 from .mixed_descriptors import MixedFeaturizer
 
 try:
@@ -1,15 +1,19 @@
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import Sequence, Tuple, Union
 
 import numpy as np
+import scipy.sparse as sp
 from rdkit.Chem import Mol, MolToSmiles
 
-from deepmol.datasets import Dataset
+from deepmol.compound_featurization.cache import FeaturizationCache
+from deepmol.datasets import Dataset, DiskDataset, PackedFingerprints
 from deepmol.loggers.logger import Logger
-from deepmol.parallelism.multiprocessing import JoblibMultiprocessing
+from deepmol.parallelism.backends import get_multiprocessing_class
+from deepmol.parallelism.multiprocessing import MultiprocessingClass
+from deepmol.parallelism.progress import ProgressMonitor
 from deepmol.scalers import BaseScaler
 from deepmol.utils.errors import PreConditionViolationException
-from deepmol.utils.utils import canonicalize_mol_object
+from deepmol.utils.utils import canonicalize_mol_object, mol_to_smiles
 
 
 class MolecularFeaturizer(ABC):
@@ -20,7 +24,26 @@ class MolecularFeaturizer(ABC):
     Subclasses need to implement the _featurize method for calculating features for a single molecule.
     """
 
-    def __init__(self, n_jobs: int = -1) -> None:
+    # whether the featurizer computes binary features that can be stored bit-packed
+    _packable = False
+    # the dtype of the (unpacked) features stored in the datasets (None to keep the dtype computed by the featurizer)
+    _dtype = None
+    # whether the featurization holds the GIL (the 'auto' backend runs featurizers that release it in threads)
+    _gil_bound = True
+    # whether the molecules are canonicalized (atoms renumbered) before the featurization
+    _canonicalize = True
+    # whether the features only depend on the canonical SMILES of the molecule (and can be cached by it)
+    _cacheable = True
+    # attributes that do not change the features (excluded from the keys of the featurization cache)
+    _non_feature_params = ('n_jobs', 'backend', 'progress', 'cache', 'feature_names', 'logger')
+
+    def __init__(self,
+                 n_jobs: int = -1,
+                 packed: bool = False,
+                 sparse: bool = False,
+                 backend: Union[str, MultiprocessingClass] = None,
+                 progress: ProgressMonitor = None,
+                 cache: FeaturizationCache = None) -> None:
         """
         Initializes the featurizer.
 
@@ -28,8 +51,36 @@ class MolecularFeaturizer(ABC):
         ----------
         n_jobs: int
             The number of jobs to run in parallel in the featurization.
+        packed: bool
+            Whether to store the features bit-packed (8 features per byte, see PackedFingerprints) in the dataset.
+            Only available for binary fingerprints. Datasets stored on disk (DiskDataset) keep the bits unpacked as
+            uint8 values.
+        sparse: bool
+            Whether to store the features in a scipy CSR matrix in the dataset (e.g. for count or hashed fingerprints
+            that are mostly zeros). Only the non-zero values are sent back from the workers. Datasets stored on disk
+            (DiskDataset) keep dense features.
+        backend: Union[str, MultiprocessingClass]
+            The parallel backend used in the featurization ('threads', 'loky', 'multiprocessing', 'executor', 'dask',
+            'isolated', any registered backend or 'auto') or a configured multiprocessing class (e.g.
+            IsolatedMultiprocessing with a timeout per molecule). If None, the default backend is used (see
+            deepmol.parallelism.backends.set_default_backend).
+        progress: ProgressMonitor
+            Hook that reports the progress, throughput and slowest molecules of the featurization.
+        cache: FeaturizationCache
+            On-disk cache of features keyed by the featurizer parameters and the canonical SMILES. Only the molecules
+            that are not in the cache are featurized. Ignored by featurizers whose features depend on more than the
+            SMILES (e.g. 3D descriptors).
         """
+        if packed and not self._packable:
+            raise ValueError(f'{self.__class__.__name__} does not compute binary features that can be packed.')
+        if packed and sparse:
+            raise ValueError('The features can not be both packed and sparse.')
         self.n_jobs = n_jobs
+        self.packed = packed
+        self.sparse = sparse
+        self.backend = backend
+        self.progress = progress
+        self.cache = cache
         self.feature_names = None
         self.logger = Logger()
 
@@ -50,12 +101,17 @@ class MolecularFeaturizer(ABC):
             Whether the molecule should be removed from the dataset.
         """
         try:
-            mol = canonicalize_mol_object(mol)
+            if self._canonicalize:
+                mol = canonicalize_mol_object(mol)
             feat = self._featurize(mol)
+            if self.packed:
+                feat = np.packbits(feat != 0)
+            elif self.sparse:
+                feat = sp.csr_matrix(feat)
             remove_mol = False
             return feat, remove_mol
         except PreConditionViolationException:
-            exit(1)
+            raise
 
         except Exception as e:
             if mol is not None:
@@ -68,6 +124,166 @@ class MolecularFeaturizer(ABC):
             remove_mol = True
             return np.array([]), remove_mol
 
+    def _featurize_mol_row(self, mol: Mol) -> Union[np.ndarray, None]:
+        """
+        Calculate features for a single molecule as a row of the features array.
+
+        Parameters
+        ----------
+        mol: Mol
+            The molecule to featurize.
+
+        Returns
+        -------
+        features: Union[np.ndarray, None]
+            The features for the molecule or None if the molecule should be removed from the dataset.
+        """
+        features, remove_mol = self._featurize_mol(mol)
+        return None if remove_mol else features
+
+    def _get_multiprocessing_class(self) -> MultiprocessingClass:
+        """
+        Get the multiprocessing class of the parallel backend of the featurizer.
+
+        Returns
+        -------
+        MultiprocessingClass
+            The multiprocessing class used in the featurization.
+        """
+        return get_multiprocessing_class(self.backend, n_jobs=self.n_jobs, progress=self.progress,
+                                         gil_bound=self._gil_bound)
+
+    def _cache_params(self) -> dict:
+        """
+        Get the parameters of the featurizer that define its features (used in the keys of the featurization cache).
+
+        Returns
+        -------
+        dict
+            The public parameters with simple (JSON serializable) values. Private attributes (e.g. state built lazily
+            while featurizing) are left out, so the keys do not change after the first featurization.
+        """
+        return {name: value for name, value in vars(self).items()
+                if not name.startswith('_') and name not in self._non_feature_params
+                and isinstance(value, (bool, int, float, str, type(None), tuple, list))}
+
+    def _compute_features(self, multiprocessing_cls: MultiprocessingClass, molecules: Sequence[Mol]) \
+            -> Tuple[Union[np.ndarray, sp.csr_matrix, list], np.ndarray]:
+        """
+        Calculate features for a sequence of molecules, looking them up first in the featurization cache (if any).
+        Only the molecules that are not in the cache are featurized, and their features are added to the cache.
+
+        Parameters
+        ----------
+        multiprocessing_cls: MultiprocessingClass
+            The multiprocessing class used to featurize the molecules.
+        molecules: Sequence[Mol]
+            The molecules to featurize.
+
+        Returns
+        -------
+        features: Union[np.ndarray, sp.csr_matrix, list]
+            The features of the molecules that were not removed: an array, a CSR matrix (sparse featurizers) or a list
+            with the features of each molecule.
+        remove_mols: np.ndarray
+            Boolean mask of the molecules that should be removed from the dataset.
+        """
+        if self.cache is None or not self._cacheable:
+            return self._run_featurization(multiprocessing_cls, molecules)
+
+        smiles = [mol_to_smiles(mol) for mol in molecules]
+        valid = np.array([s is not None for s in smiles], dtype=bool)
+        rows = [None] * len(molecules)
+        keys = self.cache.keys(self, [s for s in smiles if s is not None])
+        for i, row in zip(np.flatnonzero(valid), self.cache.get_many(keys)):
+            rows[i] = row
+        key_of = dict(zip(np.flatnonzero(valid), keys))
+
+        missing = np.array([row is None for row in rows], dtype=bool)
+        remove_mols = np.zeros(len(molecules), dtype=bool)
+        if missing.any():
+            indexes = np.flatnonzero(missing)
+            try:
+                missing_molecules = molecules[indexes]
+            except TypeError:
+                missing_molecules = [molecules[i] for i in indexes]
+            features, remove_missing = self._run_featurization(multiprocessing_cls, missing_molecules)
+            remove_mols[indexes] = remove_missing
+            computed = indexes[~remove_missing]
+            new_keys, new_rows = [], []
+            for position, i in enumerate(computed):
+                rows[i] = features[position]
+                if i in key_of:
+                    new_keys.append(key_of[i])
+                    new_rows.append(rows[i])
+            self.cache.put_many(new_keys, new_rows)
+        self.logger.info(f"Featurization cache: {int((~missing).sum())} hits, {int(missing.sum())} misses.")
+
+        rows = [row for row, remove_mol in zip(rows, remove_mols) if not remove_mol]
+        if self.sparse:
+            features = sp.vstack(rows, format='csr') if rows else sp.csr_matrix((0, 0))
+        elif rows and all(isinstance(row, np.ndarray) and row.dtype.kind in 'biuf' for row in rows) and \
+                len({row.shape for row in rows}) == 1:
+            features = np.stack(rows)
+        else:
+            features = rows
+        return features, remove_mols
+
+    def _run_featurization(self, multiprocessing_cls: MultiprocessingClass, molecules: Sequence[Mol]) \
+            -> Tuple[Union[np.ndarray, sp.csr_matrix, list], np.ndarray]:
+        """
+        Calculate features for a sequence of molecules.
+        When the featurizer computes a numeric array for each molecule, the features are written by the workers
+        directly into a preallocated array (see MultiprocessingClass.run_to_array). Otherwise, the results are consumed
+        one chunk at a time as they are finished (see MultiprocessingClass.run_chunks), so only a bounded number of
+        chunks is held besides the features.
+
+        Parameters
+        ----------
+        multiprocessing_cls: MultiprocessingClass
+            The multiprocessing class used to featurize the molecules.
+        molecules: Sequence[Mol]
+            The molecules to featurize.
+
+        Returns
+        -------
+        features: Union[np.ndarray, sp.csr_matrix, list]
+            The features of the molecules that were not removed: an array, a CSR matrix (sparse featurizers) or a list
+            with the features of each molecule.
+        remove_mols: np.ndarray
+            Boolean mask of the molecules that should be removed from the dataset.
+        """
+        if not self.sparse:
+            # the first molecule that can be featurized defines the shape and dtype of the features array (it runs
+            # through the backend, so fault-isolated backends also guard it)
+            multiprocessing_cls.process = self._featurize_mol_row
+            for i in range(len(molecules)):
+                (_, (rows, _, _)), = multiprocessing_cls._run_chunks(molecules[i:i + 1])
+                row = rows[0]
+                if row is not None:
+                    break
+            else:
+                return [], np.ones(len(molecules), dtype=bool)
+            if isinstance(row, np.ndarray) and row.dtype.kind in 'biuf':
+                features, remove_mols = multiprocessing_cls.run_to_array(molecules, row.shape, row.dtype)
+                return (features[~remove_mols] if remove_mols.any() else features), remove_mols
+
+        multiprocessing_cls.process = self._featurize_mol
+        remove_mols = np.zeros(len(molecules), dtype=bool)
+        features = []
+        for start, results in multiprocessing_cls.run_chunks(molecules):
+            # failed items of fault-isolated backends have no result
+            results = [(None, True) if result is None else result for result in results]
+            chunk_features = [feat for feat, remove_mol in results if not remove_mol]
+            remove_mols[start:start + len(results)] = [remove_mol for _, remove_mol in results]
+            if self.sparse and chunk_features:
+                # one CSR block per chunk instead of one matrix per molecule
+                chunk_features = [sp.vstack(chunk_features, format='csr')]
+            features.extend(chunk_features)
+        if self.sparse:
+            features = sp.vstack(features, format='csr') if features else sp.csr_matrix((0, 0))
+        return features, remove_mols
+
     def featurize(self,
                   dataset: Dataset,
                   scaler: BaseScaler = None,
@@ -94,25 +310,27 @@ class MolecularFeaturizer(ABC):
         dataset: Dataset
           The input Dataset containing a featurized representation of the molecules in Dataset.X.
         """
-        molecules = dataset.mols
-
-        multiprocessing_cls = JoblibMultiprocessing(process=self._featurize_mol, n_jobs=self.n_jobs)
-        features = multiprocessing_cls.run(molecules)
-
-        features, remove_mols = zip(*features)
+        if isinstance(dataset, DiskDataset):
+            self._featurize_disk_dataset(dataset)
+        else:
+            with self._get_multiprocessing_class() as multiprocessing_cls:
+                features, remove_mols_list = self._compute_features(multiprocessing_cls, dataset.mols)
 
-        remove_mols_list = np.array(remove_mols)
-        dataset.remove_elements(dataset.ids[remove_mols_list])
+            dataset.remove_elements(dataset.ids[remove_mols_list])
 
-        features = np.array(features)
-        features = features[~remove_mols_list]
+            if isinstance(features, list):
+                features = np.array(features)
 
-        if (isinstance(features[0], np.ndarray) and len(features[0].shape) == 2) or not isinstance(features[0],
-                                                                                                   np.ndarray):
-            pass
-        else:
-            features = np.vstack(features)
-        dataset._X = features
+                if len(features) == 0 or (isinstance(features[0], np.ndarray) and len(features[0].shape) == 2) or \
+                        not isinstance(features[0], np.ndarray):
+                    pass
+                else:
+                    features = np.vstack(features)
+            if self.packed:
+                features = PackedFingerprints(features, len(self.feature_names))
+            elif self._dtype is not None and (isinstance(features, np.ndarray) or sp.issparse(features)):
+                features = features.astype(self._dtype, copy=False)
+            dataset._X = features
         dataset.feature_names = self.feature_names
 
         dataset.remove_nan(remove_nans_axis)
@@ -127,6 +345,40 @@ class MolecularFeaturizer(ABC):
 
         return dataset
 
+    def _featurize_disk_dataset(self, dataset: DiskDataset) -> None:
+        """
+        Calculate features for the molecules of a dataset stored on disk.
+        The molecules are featurized one chunk at a time and the features are written directly to the memory-mapped
+        features array of the dataset.
+
+        Parameters
+        ----------
+        dataset: DiskDataset
+            The dataset containing the molecules to featurize.
+        """
+        X = None
+        remove_mols = np.zeros(len(dataset), dtype=bool)
+        # the worker processes are kept (with the featurizer) for all the chunks
+        with self._get_multiprocessing_class() as multiprocessing_cls:
+            for start, stop in dataset._chunks():
+                features, remove_chunk = self._compute_features(multiprocessing_cls, dataset.mols[start:stop])
+                remove_mols[start:stop] = remove_chunk
+                if remove_chunk.all():
+                    continue
+                if self.sparse:
+                    features = features.toarray()
+                elif isinstance(features, list):
+                    features = np.stack(features)
+                if self.packed:
+                    features = np.unpackbits(features, axis=1, count=len(self.feature_names))
+                if X is None:
+                    dtype = features.dtype if self.packed or self._dtype is None else self._dtype
+                    X = dataset.allocate_array('X', (len(dataset),) + features.shape[1:], dtype=dtype)
+                X[start + np.flatnonzero(~remove_chunk)] = features
+        if X is not None:
+            X.flush()
+        dataset._select_rows(~remove_mols)
+
     @abstractmethod
     def _featurize(self, mol: Mol):
         raise NotImplementedError
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import time
+from typing import Any, List, Sequence
+
+import numpy as np
+
+
+class FeaturizationCache:
+    """
+    On-disk cache of the features of molecules, shared between featurizations and experiments.
+    The entries are keyed by the featurizer (class and parameters) and the canonical SMILES of the molecule and are
+    stored in a SQLite database. When the stored features exceed max_size bytes, the least recently used entries are
+    evicted.
+    """
+
+    # number of keys per SQL query
+    _batch_size = 500
+
+    def __init__(self, path: str, max_size: int = 10 * 1024 ** 3) -> None:
+        """
+        Initializes the cache.
+
+        Parameters
+        ----------
+        path: str
+            The path of the SQLite database of the cache (created if it does not exist).
+        max_size: int
+            The maximum size (in bytes) of the stored features.
+        """
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._size = None
+
+    def __getstate__(self) -> dict:
+        # the connection is opened again in each process that uses the cache
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_size'] = None
+        return state
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        Returns the connection to the database of the cache, opening it if needed.
+        """
+        if self._connection is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path)
+            self._connection.execute('CREATE TABLE IF NOT EXISTS features (key BLOB PRIMARY KEY, value BLOB NOT NULL, '
+                                     'size INTEGER NOT NULL, last_access REAL NOT NULL)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS features_last_access ON features (last_access)')
+            self._connection.commit()
+            self._size = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM features').fetchone()[0]
+        return self._connection
+
+    @property
+    def size(self) -> int:
+        """
+        Returns the size (in bytes) of the stored features.
+        """
+        _ = self.connection
+        return self._size
+
+    def __len__(self) -> int:
+        """
+        Get the number of entries in the cache.
+
+        Returns
+        -------
+        int
+            The number of entries in the cache.
+        """
+        return self.connection.execute('SELECT COUNT(*) FROM features').fetchone()[0]
+
+    @staticmethod
+    def featurizer_key(featurizer: Any) -> str:
+        """
+        Get the part of the keys that identifies a featurizer: its class and parameters.
+
+        Parameters
+        ----------
+        featurizer: MolecularFeaturizer
+            The featurizer.
+
+        Returns
+        -------
+        str
+            The class and the JSON encoded parameters of the featurizer.
+        """
+        cls = featurizer.__class__
+        params = json.dumps(featurizer._cache_params(), sort_keys=True, default=repr)
+        return f'{cls.__module__}.{cls.__qualname__}:{params}'
+
+    def keys(self, featurizer: Any, smiles: Sequence[str]) -> List[bytes]:
+        """
+        Get the keys of the features of molecules computed by a featurizer.
+
+        Parameters
+        ----------
+        featurizer: MolecularFeaturizer
+            The featurizer.
+        smiles: Sequence[str]
+            The canonical SMILES of the molecules.
+
+        Returns
+        -------
+        List[bytes]
+            The keys (SHA-256 digests) of the features.
+        """
+        prefix = self.featurizer_key(featurizer).encode() + b'\n'
+        return [hashlib.sha256(prefix + s.encode()).digest() for s in smiles]
+
+    def get_many(self, keys: Sequence[bytes]) -> list:
+        """
+        Get the cached features of a list of keys and mark them as the most recently used entries.
+
+        Parameters
+        ----------
+        keys: Sequence[bytes]
+            The keys.
+
+        Returns
+        -------
+        list
+            The features of each key (None for the keys that are not in the cache).
+        """
+        found = {}
+        for start in range(0, len(keys), self._batch_size):
+            batch = list(set(keys[start:start + self._batch_size]))
+            query = f"SELECT key, value FROM features WHERE key IN ({','.join('?' * len(batch))})"
+            found.update(self.connection.execute(query, batch).fetchall())
+        if found:
+            now = time.time()
+            self.connection.executemany('UPDATE features SET last_access = ? WHERE key = ?',
+                                        [(now, key) for key in found])
+            self.connection.commit()
+        values = [pickle.loads(found[key]) if key in found else None for key in keys]
+        n_hits = sum(value is not None for value in values)
+        self.hits += n_hits
+        self.misses += len(keys) - n_hits
+        return values
+
+    def put_many(self, keys: Sequence[bytes], values: Sequence[Any]) -> None:
+        """
+        Adds features to the cache, evicting the least recently used entries if the cache is full.
+
+        Parameters
+        ----------
+        keys: Sequence[bytes]
+            The keys.
+        values: Sequence[Any]
+            The features of each key.
+        """
+        connection = self.connection
+        now = time.time()
+        for key, value in zip(keys, values):
+            blob = pickle.dumps(value, protocol=4)
+            inserted = connection.execute('INSERT OR IGNORE INTO features VALUES (?, ?, ?, ?)',
+                                          (key, blob, len(blob), now)).rowcount
+            if inserted:
+                self._size += len(blob)
+        connection.commit()
+        self._evict()
+
+    def _evict(self) -> None:
+        """
+        Removes the least recently used entries until the stored features fit in max_size bytes.
+        """
+        if self._size <= self.max_size:
+            return
+        excess = self._size - self.max_size
+        evicted = []
+        for key, size in self.connection.execute('SELECT key, size FROM features ORDER BY last_access'):
+            evicted.append(key)
+            excess -= size
+            self._size -= size
+            if excess <= 0:
+                break
+        for start in range(0, len(evicted), self._batch_size):
+            batch = evicted[start:start + self._batch_size]
+            self.connection.execute(f"DELETE FROM features WHERE key IN ({','.join('?' * len(batch))})", batch)
+        self.connection.commit()
+
+    def clear(self) -> None:
+        """
+        Removes all the entries of the cache and resets the hit/miss counters.
+        """
+        self.connection.execute('DELETE FROM features')
+        self.connection.commit()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        """
+        Closes the connection to the database of the cache.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+            self._size = None
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Returns the fraction of lookups that were found in the cache.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else np.nan
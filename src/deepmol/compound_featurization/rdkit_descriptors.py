@@ -1,8 +1,10 @@
 import inspect
 import sys
+import time
 import traceback
 import warnings
-from typing import Union, List
+from functools import partial
+from typing import Dict, Union, List
 
 import numpy as np
 from rdkit import Chem
@@ -13,10 +15,9 @@ from rdkit.ML.Descriptors import MoleculeDescriptors
 from deepmol.compound_featurization import MolecularFeaturizer
 from deepmol.datasets import Dataset
 from deepmol.loggers.logger import Logger
+from deepmol.parallelism.multiprocessing import IsolatedMultiprocessing
 from deepmol.utils.errors import PreConditionViolationException
 
-import signal
-
 
 def _no_conformers_message(e):
     """
@@ -308,10 +309,6 @@ def generate_conformers(generator: ThreeDimensionalMoleculeGenerator,
     return new_mol
 
 
-def handler(signum, frame):
-    raise Exception()
-
-
 # TODO : check whether sdf file is being correctly exported for multi-class classification
 def generate_conformers_to_sdf_file(dataset: Dataset,
                                     file_path: str,
@@ -320,10 +317,13 @@ def generate_conformers_to_sdf_file(dataset: Dataset,
                                     threads: int = 1,
                                     timeout_per_molecule: int = 12,
                                     etkg_version: int = 1,
-                                    optimization_mode: str = "MMFF94"):
+                                    optimization_mode: str = "MMFF94",
+                                    n_jobs: int = 1):
     """
     Generate conformers using the experimental-torsion-knowledge distance geometry (ETKDG) algorithm from RDKit,
     optimize them and save in an SDF file.
+    The molecules are processed in supervised worker processes (see IsolatedMultiprocessing): molecules that take
+    longer than timeout_per_molecule or crash their worker are skipped without stopping the generation.
 
     Parameters
     ----------
@@ -343,6 +343,8 @@ def generate_conformers_to_sdf_file(dataset: Dataset,
         Version of the experimental-torsion-knowledge distance geometry (ETKDG) algorithm.
     optimization_mode: str
         Mode for the molecular geometry optimization (MMFF or UFF).
+    n_jobs: int
+        Number of worker processes. If -1, all available cores are used.
     """
 
     def printProgressBar(iteration, total, prefix='', suffix='', decimals=1, length=100, fill='|'):
@@ -378,45 +380,158 @@ def generate_conformers_to_sdf_file(dataset: Dataset,
 
     generator = ThreeDimensionalMoleculeGenerator(max_iterations, n_conformations, threads, timeout_per_molecule)
     mol_set = dataset.mols
+    labels = dataset.y
+    ids = dataset.ids if dataset.ids is not None and dataset.ids.size > 0 else None
     final_set_with_conformations = []
     writer = Chem.SDWriter(file_path)
 
-    signal.signal(signal.SIGALRM, handler)
-    for i in range(mol_set.shape[0]):
-        printProgressBar(i, mol_set.shape[0])
-        try:
-            signal.alarm(timeout_per_molecule)
-            m2 = generate_conformers(generator, mol_set[i], etkg_version, optimization_mode)
-            signal.alarm(0)
-            label = dataset.y[i]
-            m2.SetProp("_Class", "%f" % label)
-            if dataset.ids is not None and dataset.ids.size > 0:
-                mol_id = dataset.ids[i]
-                m2.SetProp("_ID", f"{mol_id}")
-            writer.write(m2)
-            final_set_with_conformations.append(m2)
-        except:
-            logger.info("Timeout for molecule %d" % i)
+    process = partial(generate_conformers, generator, etkg_version=etkg_version, optimization_mode=optimization_mode)
+    with IsolatedMultiprocessing(n_jobs=n_jobs, process=process, timeout=timeout_per_molecule) as multiprocessing_cls:
+        for start, conformers in multiprocessing_cls.run_chunks(mol_set):
+            printProgressBar(start, len(mol_set))
+            for i, m2 in enumerate(conformers, start):
+                if m2 is None:
+                    continue
+                label = labels[i]
+                m2.SetProp("_Class", "%f" % label)
+                if ids is not None:
+                    mol_id = ids[i]
+                    m2.SetProp("_ID", f"{mol_id}")
+                writer.write(m2)
+                final_set_with_conformations.append(m2)
+        printProgressBar(len(mol_set), len(mol_set))
+        for failure in multiprocessing_cls.failures:
+            logger.info(f"Failed to generate conformers for molecule {failure['index']}: {failure['error']}")
 
     writer.close()
 
 
+# drug-like molecules used to estimate the cost of the descriptors
+_REFERENCE_SMILES = ['CC(=O)Oc1ccccc1C(=O)O', 'CN1C=NC2=C1C(=O)N(C(=O)N2C)C', 'CC(C)Cc1ccc(cc1)C(C)C(=O)O',
+                     'CN1CCC[C@H]1c1cccnc1', 'O=C(O)C[C@@H](O)C(=O)O', 'Clc1ccc(cc1)C(c1ccccc1)N1CCN(CC1)CCOCC(=O)O',
+                     'CC1=C(C(=O)OC2CCCC2)[C@@H](c2ccccc2[N+](=O)[O-])C(C(=O)OC)=C(C)N1',
+                     'CC[C@H](C)[C@H](NC(=O)[C@@H](N)Cc1ccccc1)C(=O)N[C@@H](CCCNC(N)=N)C(=O)O']
+
+
+def descriptor_costs(molecules: List[Mol] = None, descriptors: List[str] = None) -> Dict[str, float]:
+    """
+    Estimate the time each RDKit 2D descriptor takes per molecule.
+
+    Parameters
+    ----------
+    molecules: List[Mol]
+        The molecules used to time the descriptors. If None, a small set of drug-like molecules is used.
+    descriptors: List[str]
+        The names of the descriptors to time. If None, all the RDKit 2D descriptors are timed.
+
+    Returns
+    -------
+    Dict[str, float]
+        The mean number of seconds per molecule of each descriptor.
+    """
+    if molecules is None:
+        molecules = [MolFromSmiles(smiles) for smiles in _REFERENCE_SMILES]
+    functions = dict(Descriptors._descList)
+    costs = {}
+    for name in descriptors if descriptors is not None else functions:
+        start = time.perf_counter()
+        for mol in molecules:
+            try:
+                functions[name](mol)
+            except Exception:
+                pass
+        costs[name] = (time.perf_counter() - start) / max(len(molecules), 1)
+    return costs
+
+
 class TwoDimensionDescriptors(MolecularFeaturizer):
     """
     Class to generate two-dimensional descriptors.
-    It generates all descriptors from the RDKit library.
+    It generates all descriptors from the RDKit library, a subset of them (e.g. the features kept by a feature
+    selection) or the cheapest descriptors that fit a time budget per molecule.
     """
 
-    def __init__(self, **kwargs):
+    def __init__(self,
+                 descriptors: List[str] = None,
+                 time_budget: float = None,
+                 costs: Dict[str, float] = None,
+                 **kwargs):
         """
         Initialize the class.
+
+        Parameters
+        ----------
+        descriptors: List[str]
+            The names of the RDKit descriptors to compute (e.g. the feature names of a dataset after a feature
+            selection). If None, all the descriptors are computed.
+        time_budget: float
+            The maximum number of seconds per molecule. The most expensive descriptors are dropped until the estimated
+            cost of the rest fits the budget. If None, no descriptor is dropped.
+        costs: Dict[str, float]
+            The seconds per molecule of each descriptor used with the time budget. If None, they are estimated with
+            descriptor_costs.
         """
         super().__init__(**kwargs)
-        self.feature_names = [x[0] for x in Descriptors._descList]
+        available = [x[0] for x in Descriptors._descList]
+        if descriptors is None:
+            descriptors = available
+        unknown = set(descriptors) - set(available)
+        if unknown:
+            raise ValueError(f'Unknown RDKit descriptors: {sorted(unknown)}')
+        descriptors = list(dict.fromkeys(descriptors))
+        if time_budget is not None:
+            descriptors = self._fit_time_budget(descriptors, time_budget, costs)
+        if not descriptors:
+            raise ValueError('No descriptors to compute.')
+        self.descriptors = descriptors
+        self.time_budget = time_budget
+        self.feature_names = list(descriptors)
+
+    def _fit_time_budget(self, descriptors: List[str], time_budget: float, costs: Dict[str, float] = None) \
+            -> List[str]:
+        """
+        Select the cheapest descriptors whose total cost fits a time budget.
+
+        Parameters
+        ----------
+        descriptors: List[str]
+            The names of the descriptors.
+        time_budget: float
+            The maximum number of seconds per molecule.
+        costs: Dict[str, float]
+            The seconds per molecule of each descriptor. If None, they are estimated with descriptor_costs.
+
+        Returns
+        -------
+        List[str]
+            The selected descriptors (in the same order).
+        """
+        if costs is None:
+            costs = descriptor_costs(descriptors=descriptors)
+        missing = set(descriptors) - set(costs)
+        if missing:
+            raise ValueError(f'No cost for the descriptors: {sorted(missing)}')
+        total, kept = 0.0, set()
+        for name in sorted(descriptors, key=lambda x: costs[x]):
+            if total + costs[name] > time_budget:
+                break
+            total += costs[name]
+            kept.add(name)
+        dropped = [name for name in descriptors if name not in kept]
+        if dropped:
+            self.logger.info(f'Dropped {len(dropped)} descriptors to fit the time budget of {time_budget}s per '
+                             f'molecule: {dropped}')
+        return [name for name in descriptors if name in kept]
+
+    def __getstate__(self) -> dict:
+        # the calculator is built again in each worker
+        state = self.__dict__.copy()
+        state.pop('_calculator', None)
+        return state
 
     def _featurize(self, mol: Mol):
         """
-        Generate all descriptors from the RDKit library.
+        Generate the selected descriptors from the RDKit library.
 
         Parameters
         ----------
@@ -426,11 +541,12 @@ class TwoDimensionDescriptors(MolecularFeaturizer):
         Returns
         -------
         all_descriptors: np.ndarray
-            Array with all 2D descriptors from rdkit.
+            Array with the 2D descriptors from rdkit.
         """
-        calc = MoleculeDescriptors.MolecularDescriptorCalculator([x[0] for x in Descriptors._descList])
+        if '_calculator' not in self.__dict__:
+            self._calculator = MoleculeDescriptors.MolecularDescriptorCalculator(self.descriptors)
 
-        descriptors = calc.CalcDescriptors(mol)
+        descriptors = self._calculator.CalcDescriptors(mol)
         assert not np.isnan(np.sum(descriptors))
         descriptors = np.array(descriptors, dtype=np.float32)
         return descriptors
@@ -441,6 +557,9 @@ class ThreeDimensionDescriptor(MolecularFeaturizer):
     Class to generate three-dimensional descriptors.
     """
 
+    # the descriptors depend on the conformers of the molecules, not only on their SMILES
+    _cacheable = False
+
     def __init__(self, mandatory_generation_of_conformers: bool, **kwargs):
         """
         Initialize the class.
@@ -516,6 +635,9 @@ class All3DDescriptors(MolecularFeaturizer):
     Class to generate all three-dimensional descriptors.
     """
 
+    # the descriptors depend on the conformers of the molecules, not only on their SMILES
+    _cacheable = False
+
     def __init__(self, mandatory_generation_of_conformers=True):
         """
         Initialize the class.
@@ -1,11 +1,97 @@
+from typing import Union
+
 import numpy as np
-from rdkit.Chem import Mol, rdMolDescriptors, MACCSkeys, rdmolops
+from rdkit import DataStructs
+from rdkit.Chem import Mol, rdMolDescriptors, MACCSkeys, rdmolops, rdFingerprintGenerator
 from rdkit.Chem.rdMolDescriptors import GetAtomPairAtomCode
 
 from deepmol.compound_featurization import MolecularFeaturizer
 
 
-class MorganFingerprint(MolecularFeaturizer):
+class BitVectorFingerprint(MolecularFeaturizer):
+    """
+    Base class of the binary fingerprints computed by RDKit.
+    Subclasses create an RDKit fingerprint generator (built once per worker and reused for all the molecules) or
+    compute the bit vector of each molecule. The bits are converted to a uint8 array in C++ (instead of iterating
+    over the bit vector in Python).
+    """
+
+    _packable = True
+    # the bits are computed as uint8 rows, but the datasets keep float32 features (e.g. to be scaled in place)
+    _dtype = np.float32
+    # the fingerprints do not depend on the order of the atoms
+    _canonicalize = False
+
+    def __getstate__(self) -> dict:
+        # RDKit fingerprint generators can not be pickled, each worker builds its own
+        state = self.__dict__.copy()
+        state.pop('_generator', None)
+        return state
+
+    def _create_generator(self) -> Union[rdFingerprintGenerator.FingerprintGenerator64, None]:
+        """
+        Create the RDKit fingerprint generator of the featurizer.
+
+        Returns
+        -------
+        Union[rdFingerprintGenerator.FingerprintGenerator64, None]
+            The fingerprint generator or None if the parameters of the featurizer are not supported by the
+            generators (the fingerprints are then computed by _bit_vector).
+        """
+        return None
+
+    def _bit_vector(self, mol: Mol) -> DataStructs.ExplicitBitVect:
+        """
+        Calculate the fingerprint of a single molecule as a bit vector.
+
+        Parameters
+        ----------
+        mol: Mol
+          RDKit Mol object
+
+        Returns
+        -------
+        fp: DataStructs.ExplicitBitVect
+          The fingerprint bit vector.
+        """
+        raise NotImplementedError
+
+    def _featurize(self, mol: Mol) -> np.ndarray:
+        """
+        Calculate the fingerprint of a single molecule.
+
+        Parameters
+        ----------
+        mol: Mol
+          RDKit Mol object
+
+        Returns
+        -------
+        fp: np.ndarray
+          A uint8 numpy array with the bits of the fingerprint.
+        """
+        if '_generator' not in self.__dict__:
+            self._generator = self._create_generator()
+        if self._generator is not None:
+            return self._generator.GetFingerprintAsNumPy(mol, **self._generator_kwargs())
+        fp = self._bit_vector(mol)
+        bits = np.zeros(fp.GetNumBits(), dtype=np.uint8)
+        DataStructs.ConvertToNumpyArray(fp, bits)
+        return bits
+
+    def _generator_kwargs(self) -> dict:
+        """
+        Get the keyword arguments of the fingerprint generator calls.
+
+        Returns
+        -------
+        dict
+            The keyword arguments.
+        """
+        return {}
+
+
+class MorganFingerprint(BitVectorFingerprint):
     """
     Morgan fingerprints.
     Extended Connectivity Circular Fingerprints compute a bag-of-words style
@@ -39,31 +125,24 @@ class MorganFingerprint(MolecularFeaturizer):
         self.features = features
         self.feature_names = [f'morgan_{i}' for i in range(self.size)]
 
-    def _featurize(self, mol: Mol) -> np.ndarray:
+    def _create_generator(self) -> rdFingerprintGenerator.FingerprintGenerator64:
         """
-        Calculate morgan fingerprint for a single molecule.
-
-        Parameters
-        ----------
-        mol: Mol
-          RDKit Mol object
+        Create the Morgan fingerprint generator.
 
         Returns
         -------
-        fp: np.ndarray
-          A numpy array of circular fingerprint.
-        """
-        fp = rdMolDescriptors.GetMorganFingerprintAsBitVect(mol,
-                                                            self.radius,
-                                                            nBits=self.size,
-                                                            useChirality=self.chiral,
-                                                            useBondTypes=self.bonds,
-                                                            useFeatures=self.features)
-        fp = np.asarray(fp, dtype=np.float32)
-        return fp
+        rdFingerprintGenerator.FingerprintGenerator64
+            The fingerprint generator.
+        """
+        invariants = rdFingerprintGenerator.GetMorganFeatureAtomInvGen() if self.features else None
+        return rdFingerprintGenerator.GetMorganGenerator(radius=self.radius,
+                                                         fpSize=self.size,
+                                                         includeChirality=self.chiral,
+                                                         useBondTypes=self.bonds,
+                                                         atomInvariantsGenerator=invariants)
 
 
-class MACCSkeysFingerprint(MolecularFeaturizer):
+class MACCSkeysFingerprint(BitVectorFingerprint):
     """
     MACCS Keys.
     SMARTS-based implementation of the 166 public MACCS keys.
@@ -76,7 +155,7 @@ class MACCSkeysFingerprint(MolecularFeaturizer):
         super().__init__(**kwargs)
         self.feature_names = [f'maccs_{i}' for i in range(167)]
 
-    def _featurize(self, mol: Mol) -> np.ndarray:
+    def _bit_vector(self, mol: Mol) -> DataStructs.ExplicitBitVect:
         """
         Calculate MACCSkeys for a single molecule.
 
@@ -87,15 +166,13 @@ class MACCSkeysFingerprint(MolecularFeaturizer):
 
         Returns
         -------
-        fp: np.ndarray
-          A numpy array of MACCSkeys.
+        fp: DataStructs.ExplicitBitVect
+          The MACCSkeys bit vector.
         """
-        fp = MACCSkeys.GenMACCSKeys(mol)
-        fp = np.asarray(fp, dtype=np.float32)
-        return fp
+        return MACCSkeys.GenMACCSKeys(mol)
 
 
-class LayeredFingerprint(MolecularFeaturizer):
+class LayeredFingerprint(BitVectorFingerprint):
     """
     Calculate layered fingerprint for a single molecule.
 
@@ -108,6 +185,9 @@ class LayeredFingerprint(MolecularFeaturizer):
         0x20: aromaticity
     """
 
+    # RDKit releases the GIL while it enumerates the subgraphs, so the 'auto' backend runs it in threads
+    _gil_bound = False
+
     def __init__(self,
                  layerFlags: int = 4294967295,
                  minPath: int = 1,
@@ -146,7 +226,7 @@ class LayeredFingerprint(MolecularFeaturizer):
         self.branchedPaths = branchedPaths
         self.feature_names = [f'layered_{i}' for i in range(self.fpSize)]
 
-    def _featurize(self, mol: Mol) -> np.ndarray:
+    def _bit_vector(self, mol: Mol) -> DataStructs.ExplicitBitVect:
         """
         Calculate layered fingerprint for a single molecule.
 
@@ -156,21 +236,19 @@ class LayeredFingerprint(MolecularFeaturizer):
           RDKit Mol object
         Returns
         -------
-        fp: np.ndarray
-          A numpy array of layered fingerprints.
+        fp: DataStructs.ExplicitBitVect
+          The layered fingerprint bit vector.
         """
-        fp = rdmolops.LayeredFingerprint(mol,
-                                         layerFlags=self.layerFlags,
-                                         minPath=self.minPath,
-                                         maxPath=self.maxPath,
-                                         fpSize=self.fpSize,
-                                         atomCounts=self.atomCounts,
-                                         branchedPaths=self.branchedPaths)
-        fp = np.asarray(fp, dtype=np.float32)
-        return fp
+        return rdmolops.LayeredFingerprint(mol,
+                                           layerFlags=self.layerFlags,
+                                           minPath=self.minPath,
+                                           maxPath=self.maxPath,
+                                           fpSize=self.fpSize,
+                                           atomCounts=self.atomCounts,
+                                           branchedPaths=self.branchedPaths)
 
 
-class RDKFingerprint(MolecularFeaturizer):
+class RDKFingerprint(BitVectorFingerprint):
     """
     RDKit topological fingerprints
 
@@ -183,6 +261,9 @@ class RDKFingerprint(MolecularFeaturizer):
         _nBitsPerHash_ random numbers are generated and used to set the corresponding bits in the fingerprint
     """
 
+    # RDKit releases the GIL while it enumerates the subgraphs, so the 'auto' backend runs it in threads
+    _gil_bound = False
+
     def __init__(self,
                  minPath: int = 1,
                  maxPath: int = 7,
@@ -230,7 +311,27 @@ class RDKFingerprint(MolecularFeaturizer):
         self.useBondOrder = useBondOrder
         self.feature_names = [f'rdk_{i}' for i in range(self.fpSize)]
 
-    def _featurize(self, mol: Mol) -> np.ndarray:
+    def _create_generator(self) -> Union[rdFingerprintGenerator.FingerprintGenerator64, None]:
+        """
+        Create the RDKit topological fingerprint generator.
+
+        Returns
+        -------
+        Union[rdFingerprintGenerator.FingerprintGenerator64, None]
+            The fingerprint generator or None if the fingerprint is folded to a target density (not supported by the
+            generator).
+        """
+        if self.tgtDensity > 0:
+            return None
+        return rdFingerprintGenerator.GetRDKitFPGenerator(minPath=self.minPath,
+                                                          maxPath=self.maxPath,
+                                                          useHs=self.useHs,
+                                                          branchedPaths=self.branchedPaths,
+                                                          useBondOrder=self.useBondOrder,
+                                                          fpSize=self.fpSize,
+                                                          numBitsPerFeature=self.nBitsPerHash)
+
+    def _bit_vector(self, mol: Mol) -> DataStructs.ExplicitBitVect:
         """
         Calculate topological fingerprint for a single molecule.
 
@@ -240,24 +341,22 @@ class RDKFingerprint(MolecularFeaturizer):
           RDKit Mol object
         Returns
         -------
-        fp: np.ndarray
-          A numpy array of layered fingerprints.
+        fp: DataStructs.ExplicitBitVect
+          The topological fingerprint bit vector.
         """
-        fp = rdmolops.RDKFingerprint(mol,
-                                     minPath=self.minPath,
-                                     maxPath=self.maxPath,
-                                     fpSize=self.fpSize,
-                                     nBitsPerHash=self.nBitsPerHash,
-                                     useHs=self.useHs,
-                                     tgtDensity=self.tgtDensity,
-                                     minSize=self.minSize,
-                                     branchedPaths=self.branchedPaths,
-                                     useBondOrder=self.useBondOrder)
-        fp = np.asarray(fp, dtype=np.float32)
-        return fp
-
-
-class AtomPairFingerprint(MolecularFeaturizer):
+        return rdmolops.RDKFingerprint(mol,
+                                       minPath=self.minPath,
+                                       maxPath=self.maxPath,
+                                       fpSize=self.fpSize,
+                                       nBitsPerHash=self.nBitsPerHash,
+                                       useHs=self.useHs,
+                                       tgtDensity=self.tgtDensity,
+                                       minSize=self.minSize,
+                                       branchedPaths=self.branchedPaths,
+                                       useBondOrder=self.useBondOrder)
+
+
+class AtomPairFingerprint(BitVectorFingerprint):
     """
     Atom pair fingerprints
 
@@ -303,7 +402,37 @@ class AtomPairFingerprint(MolecularFeaturizer):
         self.confId = confId
         self.feature_names = [f'atom_pair_{i}' for i in range(self.nBits)]
 
-    def _featurize(self, mol: Mol) -> np.ndarray:
+    def _create_generator(self) -> Union[rdFingerprintGenerator.FingerprintGenerator64, None]:
+        """
+        Create the atom pair fingerprint generator.
+
+        Returns
+        -------
+        Union[rdFingerprintGenerator.FingerprintGenerator64, None]
+            The fingerprint generator or None if the counts are simulated with other than 4 bits per entry (not
+            supported by the generator).
+        """
+        if self.nBitsPerEntry != 4:
+            return None
+        return rdFingerprintGenerator.GetAtomPairGenerator(minDistance=self.minLength,
+                                                           maxDistance=self.maxLength,
+                                                           includeChirality=self.includeChirality,
+                                                           use2D=self.use2D,
+                                                           countSimulation=True,
+                                                           fpSize=self.nBits)
+
+    def _generator_kwargs(self) -> dict:
+        """
+        Get the keyword arguments of the atom pair fingerprint generator calls.
+
+        Returns
+        -------
+        dict
+            The conformation used for 3D distances.
+        """
+        return {'confId': self.confId}
+
+    def _bit_vector(self, mol: Mol) -> DataStructs.ExplicitBitVect:
         """
         Calculate atom pair fingerprint for a single molecule.
 
@@ -313,19 +442,17 @@ class AtomPairFingerprint(MolecularFeaturizer):
           RDKit Mol object
         Returns
         -------
-        fp: np.ndarray
-          A numpy array of layered fingerprints.
+        fp: DataStructs.ExplicitBitVect
+          The atom pair fingerprint bit vector.
         """
-        fp = rdMolDescriptors.GetHashedAtomPairFingerprintAsBitVect(mol,
-                                                                    nBits=self.nBits,
-                                                                    minLength=self.minLength,
-                                                                    maxLength=self.maxLength,
-                                                                    nBitsPerEntry=self.nBitsPerEntry,
-                                                                    includeChirality=self.includeChirality,
-                                                                    use2D=self.use2D,
-                                                                    confId=self.confId)
-        fp = np.asarray(fp, dtype=np.float32)
-        return fp
+        return rdMolDescriptors.GetHashedAtomPairFingerprintAsBitVect(mol,
+                                                                      nBits=self.nBits,
+                                                                      minLength=self.minLength,
+                                                                      maxLength=self.maxLength,
+                                                                      nBitsPerEntry=self.nBitsPerEntry,
+                                                                      includeChirality=self.includeChirality,
+                                                                      use2D=self.use2D,
+                                                                      confId=self.confId)
 
 
 class AtomPairFingerprintCallbackHash(MolecularFeaturizer):
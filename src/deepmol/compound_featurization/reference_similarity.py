@@ -0,0 +1,123 @@
+from typing import List, Union
+
+import joblib
+import numpy as np
+from rdkit.Chem import Mol
+
+from deepmol.compound_featurization import MolecularFeaturizer
+from deepmol.compound_featurization.cache import FeaturizationCache
+from deepmol.compound_featurization.rdkit_fingerprints import MorganFingerprint
+from deepmol.datasets import Dataset
+from deepmol.utils.similarity import SIMILARITY_METRICS, pack_fingerprints, popcount64, similarity_from_counts
+from deepmol.utils.utils import smiles_to_mol
+
+
+class ReferenceSimilarity(MolecularFeaturizer):
+    """
+    Similarities of each molecule to a fixed set of reference (anchor) molecules.
+    The fingerprints of the anchors are computed once and stored bit-packed in the featurizer, so the features of the
+    training and test sets have the same columns (one per anchor). Each molecule is compared with all the anchors at
+    once on the packed words, and the molecules are featurized in chunks by the parallel backend (O(n * m) for n
+    molecules and m anchors, streaming for DiskDataset). The featurizer can be saved with the model and loaded for
+    inference.
+    """
+
+    def __init__(self,
+                 anchors: Union[Dataset, List[str], List[Mol]],
+                 fingerprint: MolecularFeaturizer = None,
+                 metric: str = 'tanimoto',
+                 **kwargs):
+        """
+        Initialize a ReferenceSimilarity object.
+
+        Parameters
+        ----------
+        anchors: Union[Dataset, List[str], List[Mol]]
+            The reference molecules: a dataset, SMILES strings or RDKit molecules.
+        fingerprint: MolecularFeaturizer
+            The binary fingerprint compared (e.g. MorganFingerprint, MACCSkeysFingerprint). If None, Morgan
+            fingerprints of radius 2 and 2048 bits.
+        metric: str
+            The similarity metric: 'tanimoto', 'dice' or 'cosine'.
+        """
+        super().__init__(**kwargs)
+        fingerprint = fingerprint if fingerprint is not None else MorganFingerprint(n_jobs=1)
+        if not fingerprint._packable:
+            raise ValueError(f'{fingerprint.__class__.__name__} does not compute binary fingerprints.')
+        if metric not in SIMILARITY_METRICS:
+            raise ValueError(f'Unknown similarity metric {metric}. Available metrics: {list(SIMILARITY_METRICS)}')
+        self.fingerprint = fingerprint
+        self.metric = metric
+        self._canonicalize = fingerprint._canonicalize
+
+        mols = anchors.mols if isinstance(anchors, Dataset) else anchors
+        mols = [smiles_to_mol(mol) if isinstance(mol, str) else mol for mol in mols]
+        if len(mols) == 0 or any(mol is None for mol in mols):
+            raise ValueError('The anchors must be a non-empty set of valid molecules.')
+        self.anchor_words = pack_fingerprints(np.stack([fingerprint._featurize(mol) for mol in mols]))
+        self.anchor_counts = popcount64(self.anchor_words).sum(axis=1, dtype=np.int32)
+        self.feature_names = [f'{metric}_anchor_{i}' for i in range(len(mols))]
+
+    def _cache_params(self) -> dict:
+        """
+        Get the parameters of the featurizer that define its features (used in the keys of the featurization cache).
+
+        Returns
+        -------
+        dict
+            The parameters, including the fingerprint and a digest of the anchors.
+        """
+        params = super()._cache_params()
+        params['fingerprint'] = FeaturizationCache.featurizer_key(self.fingerprint)
+        params['anchors'] = joblib.hash(self.anchor_words)
+        return params
+
+    def _featurize(self, mol: Mol) -> np.ndarray:
+        """
+        Calculate the similarities of a single molecule to the anchors.
+
+        Parameters
+        ----------
+        mol: Mol
+          RDKit Mol object
+
+        Returns
+        -------
+        similarities: np.ndarray
+          A float32 array with the similarity to each anchor.
+        """
+        words = pack_fingerprints(self.fingerprint._featurize(mol)[None, :])
+        common = popcount64(self.anchor_words & words).sum(axis=1, dtype=np.int32)
+        count = popcount64(words).sum(dtype=np.int32)
+        return similarity_from_counts(common, count, self.anchor_counts, self.metric)
+
+    def save(self, file_path: str) -> None:
+        """
+        Saves the featurizer (with the fingerprints of the anchors) to a file.
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the file where the featurizer will be saved.
+        """
+        joblib.dump(self, file_path)
+
+    @classmethod
+    def load(cls, file_path: str) -> 'ReferenceSimilarity':
+        """
+        Loads a featurizer saved with save.
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the file where the featurizer is saved.
+
+        Returns
+        -------
+        ReferenceSimilarity
+            The featurizer.
+        """
+        featurizer = joblib.load(file_path)
+        if not isinstance(featurizer, cls):
+            raise ValueError(f'{file_path} does not contain a {cls.__name__} featurizer.')
+        return featurizer
@@ -1,51 +1,55 @@
-from typing import Tuple
+from typing import Union
 
 import numpy as np
 
-from deepmol.compound_featurization._utils import calc_morgan_fingerprints, calc_similarity
+from deepmol.compound_featurization._utils import calc_morgan_fingerprints
 from deepmol.datasets import Dataset
-from deepmol.parallelism.multiprocessing import JoblibMultiprocessing
+from deepmol.utils.similarity import tanimoto_matrix, tanimoto_neighbors
 
 
 class TanimotoSimilarityMatrix:
 
-    def __init__(self, n_molecules: int, n_jobs: int = -1) -> None:
+    def __init__(self,
+                 n_molecules: int,
+                 n_jobs: int = -1,
+                 dtype: Union[np.dtype, str] = np.float32,
+                 block_size: int = 512,
+                 path: str = None,
+                 k: int = None,
+                 threshold: float = None) -> None:
         """
-        Initialize a MACCSkeysFingerprint object.
+        Initialize a TanimotoSimilarityMatrix object.
+        The similarities are computed on bit-packed Morgan fingerprints in square blocks, in parallel threads.
+        For large datasets, k and/or threshold keep only the largest similarities of each molecule in a sparse (CSR)
+        matrix, computed in blocks without materializing the dense matrix.
 
         Parameters
         ----------
         n_molecules: int
             Number of molecules in the dataset.
         n_jobs: int
-            Number of jobs to run in parallel.
+            Number of threads to run in parallel.
+        dtype: Union[np.dtype, str]
+            The dtype of the similarity matrix (e.g. float32 or float16).
+        block_size: int
+            The number of rows and columns of the blocks of the similarity matrix computed at a time.
+        path: str
+            If given, the similarity matrix is written to a memory-mapped .npy file at this path (for large datasets).
+            Only used for dense matrices.
+        k: int
+            If given, only the similarities to the k most similar molecules of each molecule are kept.
+        threshold: float
+            If given, only the similarities above this threshold are kept.
         """
         self.n_jobs = n_jobs
+        self.dtype = dtype
+        self.block_size = block_size
+        self.path = path
+        self.k = k
+        self.threshold = threshold
         self.feature_names = [f"tanimoto_{i}" for i in range(n_molecules)]
         self.fps = None
 
-    def _calc_similarity(self, i, j) -> Tuple[int, int, float]:
-        """
-        Calculates the Tanimoto similarity between two fingerprints.
-
-        Parameters
-        ----------
-        i: int
-            Index of the first fingerprint
-        j: int
-            Index of the second fingerprint
-
-        Returns
-        -------
-        i: int
-            Index of the first fingerprint
-        j: int
-            Index of the second fingerprint
-        similarity: float
-            Tanimoto similarity between the two fingerprints
-        """
-        return calc_similarity(i, j, self.fps)
-
     def featurize(self,
                   dataset: Dataset,
                   **kwargs
@@ -66,19 +70,12 @@ class TanimotoSimilarityMatrix:
             The dataset with the Tanimoto similarities as features.
         """
         self.fps = calc_morgan_fingerprints(dataset.mols, **kwargs)
-        # initialize similarity matrix as a numpy array
-        n_mols = len(dataset.smiles)
-        similarity_matrix = np.zeros((n_mols, n_mols), dtype=np.float32)
-
-        # use multiprocessing to calculate similarities in parallel
-        multiprocessing_cls = JoblibMultiprocessing(process=self._calc_similarity, n_jobs=self.n_jobs)
-        pairs = [(i, j) for i in range(n_mols) for j in range(i + 1, n_mols)]
-        features = multiprocessing_cls.run(pairs)
-        for i, j, similarity in features:
-            similarity_matrix[i, j] = similarity
-            similarity_matrix[j, i] = similarity
-
-        features = np.array(similarity_matrix, dtype=object)
+        if self.k is not None or self.threshold is not None:
+            features = tanimoto_neighbors(self.fps, k=self.k, threshold=self.threshold, dtype=self.dtype,
+                                          block_size=self.block_size, n_jobs=self.n_jobs)
+        else:
+            features = tanimoto_matrix(self.fps, dtype=self.dtype, block_size=self.block_size, n_jobs=self.n_jobs,
+                                       path=self.path)
 
         dataset._X = features
         dataset.feature_names = self.feature_names
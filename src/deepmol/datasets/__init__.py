@@ -1 +1,2 @@
-from .datasets import Dataset, SmilesDataset
+from .datasets import Dataset, SmilesDataset, DatasetView, DiskDataset
+from ._utils import PackedFingerprints
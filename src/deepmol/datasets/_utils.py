@@ -1,8 +1,17 @@
-from typing import Union
+from typing import Union, Iterator, List, Tuple
 
 import numpy as np
+from rdkit import Chem
+from rdkit.Chem import Mol
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
 
 from deepmol.loggers.logger import Logger
+from deepmol.utils.cache import LRUCache
+from deepmol.utils.similarity import tanimoto_matrix
 
 
 def merge_arrays(array1: np.ndarray, size1: int, array2: np.ndarray, size2: int) -> np.ndarray:
@@ -61,3 +70,404 @@ def merge_arrays_of_arrays(array1: np.ndarray, array2: np.ndarray) -> Union[np.n
         return None
     merged = np.concatenate([array1, array2], axis=0)
     return merged
+
+
+class LazyMols:
+    """
+    Read-only sequence of RDKit Mol objects that are parsed from their SMILES strings when accessed.
+    The parsed molecules are kept in a bounded LRU cache (keyed by SMILES) that is shared by all the selections made
+    from the sequence, so only the most recently used molecules are held in memory.
+    """
+
+    def __init__(self, smiles: Union[np.ndarray, List[str]], cache_size: int = 1024, cache: LRUCache = None) -> None:
+        """
+        Initializes the sequence.
+
+        Parameters
+        ----------
+        smiles: Union[np.ndarray, List[str]]
+            SMILES strings of the molecules.
+        cache_size: int
+            The maximum number of parsed molecules kept in memory.
+        cache: LRUCache
+            A cache to share with other sequences. If given, cache_size is ignored.
+        """
+        self._smiles = np.asarray(smiles)
+        self._cache = cache if cache is not None else LRUCache(cache_size)
+
+    def __len__(self) -> int:
+        """
+        Get the number of molecules in the sequence.
+
+        Returns
+        -------
+        int
+            The number of molecules.
+        """
+        return len(self._smiles)
+
+    @property
+    def shape(self) -> tuple:
+        """
+        Get the shape of the sequence, as for a one dimensional numpy array.
+
+        Returns
+        -------
+        tuple
+            The shape of the sequence.
+        """
+        return self._smiles.shape
+
+    def _get_mol(self, smiles: str) -> Mol:
+        """
+        Get the molecule of a SMILES string, parsing it if it is not in the cache.
+
+        Parameters
+        ----------
+        smiles: str
+            The SMILES string of the molecule.
+
+        Returns
+        -------
+        Mol
+            The RDKit molecule object.
+        """
+        mol = self._cache.get(smiles)
+        if mol is None:
+            # parsed directly (not with the memoized smiles_to_mol) so that the molecules are only held by this cache
+            mol = Chem.MolFromSmiles(smiles)
+            self._cache.put(smiles, mol)
+        return mol
+
+    def __getitem__(self, item: Union[int, slice, np.ndarray, List[int]]) -> Union[Mol, 'LazyMols']:
+        """
+        Get a molecule (integer index) or a lazy selection of molecules (slice, index array or boolean mask).
+
+        Parameters
+        ----------
+        item: Union[int, slice, np.ndarray, List[int]]
+            The index or selection of molecules.
+
+        Returns
+        -------
+        Union[Mol, LazyMols]
+            The molecule or the selection of molecules.
+        """
+        if isinstance(item, (int, np.integer)):
+            return self._get_mol(self._smiles[item])
+        return LazyMols(self._smiles[item], cache=self._cache)
+
+    def __iter__(self) -> Iterator[Mol]:
+        """
+        Iterates over the molecules, parsing them as needed.
+
+        Returns
+        -------
+        Iterator[Mol]
+            Iterator over the molecules.
+        """
+        for smiles in self._smiles:
+            yield self._get_mol(smiles)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        """
+        Converts the sequence into a numpy array of molecules.
+
+        Returns
+        -------
+        np.ndarray
+            Array with all the molecules.
+        """
+        return self.to_numpy()
+
+    def to_numpy(self) -> np.ndarray:
+        """
+        Parses all the molecules into a numpy array of RDKit Mol objects.
+
+        Returns
+        -------
+        np.ndarray
+            Array with all the molecules.
+        """
+        mols = np.empty(len(self._smiles), dtype=object)
+        for i, smiles in enumerate(self._smiles):
+            mols[i] = self._get_mol(smiles)
+        return mols
+
+
+def to_arrow_column(array: np.ndarray) -> 'pa.Array':
+    """
+    Converts a numpy array into an Arrow column with one value per row.
+    Arrays with more than one dimension are stored as fixed size lists with the flattened values of each row.
+
+    Parameters
+    ----------
+    array: np.ndarray
+        The array to convert.
+
+    Returns
+    -------
+    pa.Array
+        The Arrow column.
+    """
+    if array.ndim == 1:
+        return pa.array(array)
+    if array.dtype == object:
+        raise ValueError('Only arrays with a fixed-size dtype can be stored in columns.')
+    flat = np.ascontiguousarray(array).reshape(len(array), -1)
+    return pa.FixedSizeListArray.from_arrays(pa.array(flat.ravel()), flat.shape[1])
+
+
+def from_arrow_column(column: Union['pa.Array', 'pa.ChunkedArray'], row_shape: Tuple[int, ...]) -> np.ndarray:
+    """
+    Converts an Arrow column created with to_arrow_column back into a numpy array.
+
+    Parameters
+    ----------
+    column: Union[pa.Array, pa.ChunkedArray]
+        The Arrow column.
+    row_shape: Tuple[int, ...]
+        The shape of each row of the array (empty for one dimensional arrays).
+
+    Returns
+    -------
+    np.ndarray
+        The numpy array.
+    """
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks()
+    if len(row_shape) == 0:
+        return column.to_numpy(zero_copy_only=False)
+    values = column.flatten().to_numpy(zero_copy_only=False)
+    return values.reshape((len(column),) + tuple(row_shape))
+
+
+class PackedFingerprints:
+    """
+    Binary fingerprints stored with 8 bits per byte (see np.packbits).
+    The fingerprints behave as a read-only two dimensional float32 array of 0s and 1s: row selections (slices, index
+    arrays or boolean masks) stay packed, while single rows, column selections and conversions to numpy arrays are
+    unpacked, so only the requested rows are expanded (e.g. one mini-batch at a time).
+    """
+
+    def __init__(self, packed: np.ndarray, n_bits: int) -> None:
+        """
+        Initializes the fingerprints.
+
+        Parameters
+        ----------
+        packed: np.ndarray
+            The packed fingerprints, an uint8 array with shape (n_molecules, ceil(n_bits / 8)).
+        n_bits: int
+            The number of bits of each fingerprint.
+        """
+        packed = np.asarray(packed, dtype=np.uint8)
+        if packed.ndim != 2 or packed.shape[1] != (n_bits + 7) // 8:
+            raise ValueError(f'Packed fingerprints of {n_bits} bits must have shape (n_molecules, {(n_bits + 7) // 8}).')
+        self._packed = packed
+        self._n_bits = n_bits
+
+    @classmethod
+    def from_dense(cls, X: np.ndarray) -> 'PackedFingerprints':
+        """
+        Packs a two dimensional array of binary fingerprints.
+
+        Parameters
+        ----------
+        X: np.ndarray
+            The fingerprints. Non-zero values are stored as set bits.
+
+        Returns
+        -------
+        PackedFingerprints
+            The packed fingerprints.
+        """
+        X = np.asarray(X)
+        return cls(np.packbits(X != 0, axis=1), X.shape[1])
+
+    @property
+    def packed(self) -> np.ndarray:
+        """
+        Get the packed fingerprints.
+
+        Returns
+        -------
+        np.ndarray
+            The uint8 array with the packed bits.
+        """
+        return self._packed
+
+    @property
+    def n_bits(self) -> int:
+        """
+        Get the number of bits of each fingerprint.
+
+        Returns
+        -------
+        int
+            The number of bits.
+        """
+        return self._n_bits
+
+    @property
+    def shape(self) -> tuple:
+        """
+        Get the shape of the unpacked fingerprints.
+
+        Returns
+        -------
+        tuple
+            The shape (n_molecules, n_bits).
+        """
+        return len(self._packed), self._n_bits
+
+    @property
+    def ndim(self) -> int:
+        """
+        Get the number of dimensions of the unpacked fingerprints.
+
+        Returns
+        -------
+        int
+            The number of dimensions.
+        """
+        return 2
+
+    @property
+    def dtype(self) -> np.dtype:
+        """
+        Get the dtype of the unpacked fingerprints.
+
+        Returns
+        -------
+        np.dtype
+            The dtype.
+        """
+        return np.dtype(np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Get the number of bytes used by the packed fingerprints.
+
+        Returns
+        -------
+        int
+            The number of bytes.
+        """
+        return self._packed.nbytes
+
+    def __len__(self) -> int:
+        """
+        Get the number of fingerprints.
+
+        Returns
+        -------
+        int
+            The number of fingerprints.
+        """
+        return len(self._packed)
+
+    def __getitem__(self, item: Union[int, slice, np.ndarray, List[int], tuple]) -> Union[np.ndarray,
+                                                                                          'PackedFingerprints']:
+        """
+        Get an unpacked fingerprint (integer index), a packed selection of fingerprints (slice, index array or boolean
+        mask) or an unpacked selection of rows and columns (tuple).
+
+        Parameters
+        ----------
+        item: Union[int, slice, np.ndarray, List[int], tuple]
+            The index or selection.
+
+        Returns
+        -------
+        Union[np.ndarray, PackedFingerprints]
+            The selected fingerprints.
+        """
+        if isinstance(item, tuple):
+            rows = self[item[0]]
+            if isinstance(rows, PackedFingerprints):
+                return rows.to_numpy()[(slice(None),) + item[1:]]
+            return rows[item[1:]]
+        if isinstance(item, (int, np.integer)):
+            return np.unpackbits(self._packed[item], count=self._n_bits).astype(np.float32)
+        return PackedFingerprints(self._packed[item], self._n_bits)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        """
+        Iterates over the unpacked fingerprints.
+
+        Returns
+        -------
+        Iterator[np.ndarray]
+            Iterator over the fingerprints.
+        """
+        for i in range(len(self._packed)):
+            yield self[i]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        """
+        Unpacks the fingerprints into a numpy array.
+
+        Returns
+        -------
+        np.ndarray
+            The unpacked fingerprints.
+        """
+        return self.to_numpy(dtype if dtype is not None else np.float32)
+
+    def to_numpy(self, dtype: Union[np.dtype, str] = np.float32) -> np.ndarray:
+        """
+        Unpacks the fingerprints into a numpy array.
+
+        Parameters
+        ----------
+        dtype: Union[np.dtype, str]
+            The dtype of the array.
+
+        Returns
+        -------
+        np.ndarray
+            The unpacked fingerprints with shape (n_molecules, n_bits).
+        """
+        return np.unpackbits(self._packed, axis=1, count=self._n_bits).astype(dtype)
+
+    def concatenate(self, other: 'PackedFingerprints') -> 'PackedFingerprints':
+        """
+        Concatenates two sets of packed fingerprints with the same number of bits.
+
+        Parameters
+        ----------
+        other: PackedFingerprints
+            The fingerprints to append.
+
+        Returns
+        -------
+        PackedFingerprints
+            The concatenated fingerprints.
+        """
+        if other.n_bits != self._n_bits:
+            raise ValueError('Packed fingerprints must have the same number of bits to be concatenated.')
+        return PackedFingerprints(np.concatenate([self._packed, other.packed], axis=0), self._n_bits)
+
+    def tanimoto(self, other: 'PackedFingerprints' = None, n_jobs: int = -1) -> np.ndarray:
+        """
+        Computes the Tanimoto similarities between the fingerprints and another set of fingerprints, counting the
+        common bits directly on the packed words (see deepmol.utils.similarity.tanimoto_matrix).
+
+        Parameters
+        ----------
+        other: PackedFingerprints
+            The fingerprints to compare with. If None, the fingerprints are compared with themselves.
+        n_jobs: int
+            The number of threads. If -1, all available cores are used.
+
+        Returns
+        -------
+        np.ndarray
+            Float32 matrix with shape (len(self), len(other)) with the similarities. The similarity of two empty
+            fingerprints is 0.
+        """
+        if other is not None and other.n_bits != self._n_bits:
+            raise ValueError('Packed fingerprints must have the same number of bits to be compared.')
+        return tanimoto_matrix(self, other, n_jobs=n_jobs)
@@ -1,15 +1,28 @@
+import json
+import os
+import tempfile
 import uuid
 import warnings
 from abc import ABC, abstractmethod
-from typing import Union, List, Tuple
+from typing import Union, List, Tuple, Iterator
 
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from rdkit.Chem import Mol
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
 from deepmol.loggers.logger import Logger
-from deepmol.datasets._utils import merge_arrays, merge_arrays_of_arrays
-from deepmol.utils.utils import smiles_to_mol, mol_to_smiles
+from deepmol.datasets._utils import merge_arrays, merge_arrays_of_arrays, LazyMols, PackedFingerprints, \
+    to_arrow_column, from_arrow_column
+from deepmol.utils.cache import LRUCache
+from deepmol.utils.utils import smiles_to_mol, mol_to_smiles, validate_smiles
 
 
 class Dataset(ABC):
@@ -321,6 +334,78 @@ class Dataset(ABC):
             The indexes of the elements to select.
         """
 
+    def _batch_source(self) -> Tuple[Union[np.ndarray, None], Union[np.ndarray, None], np.ndarray,
+                                     Union[np.ndarray, None]]:
+        """
+        Get the arrays that mini-batches are taken from.
+
+        Returns
+        -------
+        X: Union[np.ndarray, None]
+            The features.
+        y: Union[np.ndarray, None]
+            The labels.
+        ids: np.ndarray
+            The ids.
+        rows: Union[np.ndarray, None]
+            The positions of the molecules of the dataset in the arrays, or None if the arrays only contain the
+            molecules of the dataset (in order).
+        """
+        return self.X, self.y, self.ids, None
+
+    def iterbatches(self,
+                    batch_size: int = None,
+                    epochs: int = 1,
+                    deterministic: bool = False,
+                    pad_batches: bool = False) -> Iterator[Tuple[Union[np.ndarray, None], Union[np.ndarray, None],
+                                                                 Union[np.ndarray, None], np.ndarray]]:
+        """
+        Iterates over mini-batches of the dataset.
+        Only the molecules of each batch are read from the arrays of the dataset: in deterministic order the batches
+        are slices of the arrays, otherwise the molecules are shuffled in every epoch.
+
+        Parameters
+        ----------
+        batch_size: int
+            The number of molecules in each batch. If None, each batch contains the whole dataset.
+        epochs: int
+            The number of times to iterate over the dataset.
+        deterministic: bool
+            If True, the molecules are iterated in the order of the dataset. If False, they are shuffled in every epoch.
+        pad_batches: bool
+            If True, the last batch of each epoch is padded with repeated molecules to have batch_size molecules.
+
+        Returns
+        -------
+        Iterator[Tuple[Union[np.ndarray, None], Union[np.ndarray, None], Union[np.ndarray, None], np.ndarray]]
+            Tuples (X, y, w, ids) for each batch. w are unit weights with the shape of y (None if the dataset has no
+            labels).
+        """
+        X, y, ids, rows = self._batch_source()
+        n_samples = len(self)
+        if batch_size is None:
+            batch_size = max(n_samples, 1)
+        for _ in range(epochs):
+            order = None if deterministic else np.random.permutation(n_samples)
+            for start in range(0, n_samples, batch_size):
+                stop = min(start + batch_size, n_samples)
+                pad = pad_batches and stop - start < batch_size
+                if order is None and rows is None and not pad:
+                    selection = slice(start, stop)
+                else:
+                    selection = order[start:stop] if order is not None else np.arange(start, stop)
+                    if pad:
+                        selection = np.resize(selection, batch_size)
+                    if rows is not None:
+                        selection = rows[selection]
+                X_batch = X[selection] if X is not None else None
+                if X_batch is not None and not sp.issparse(X_batch):
+                    # packed fingerprints are unpacked one batch at a time
+                    X_batch = np.asarray(X_batch)
+                y_batch = y[selection] if y is not None else None
+                w_batch = np.ones(y_batch.shape, dtype=np.float32) if y_batch is not None else None
+                yield X_batch, y_batch, w_batch, ids[selection]
+
 
 class SmilesDataset(Dataset):
     """
@@ -337,7 +422,9 @@ class SmilesDataset(Dataset):
                  feature_names: Union[List, np.ndarray] = None,
                  y: Union[List, np.ndarray] = None,
                  label_names: Union[List, np.ndarray] = None,
-                 mode: str = 'auto') -> None:
+                 mode: str = 'auto',
+                 lazy_mols: bool = False,
+                 n_jobs: int = 1) -> None:
         """
         Initialize a dataset from SMILES strings.
 
@@ -362,15 +449,30 @@ class SmilesDataset(Dataset):
             If 'auto', the mode is inferred from the labels. If 'classification', the dataset is treated as a
             classification dataset. If 'regression', the dataset is treated as a regression dataset. If 'multitask',
             the dataset is treated as a multitask dataset.
+        lazy_mols: bool
+            If True and mols are not provided, the RDKit Mol objects are only parsed from the SMILES when accessed and
+            only a bounded number of them is kept in memory. The SMILES are still validated when the dataset is
+            created.
+        n_jobs: int
+            The number of jobs used to validate the SMILES in lazy mode. If -1, all available cores are used.
         """
         super().__init__()
         self._smiles = np.array(smiles)
         self._ids = np.array([str(i) for i in ids]) if ids is not None \
             else np.array([str(uuid.uuid4().hex) for _ in range(len(smiles))])
-        self._X = np.array(X) if X is not None else None
+        if sp.issparse(X):
+            self._X = sp.csr_matrix(X)
+        else:
+            self._X = X if X is None or isinstance(X, PackedFingerprints) else np.array(X)
         self._y = np.array(y) if y is not None else None
-        self._mols = np.array(mols) if mols is not None else np.array([smiles_to_mol(s) for s in self._smiles])
-        self.remove_elements([self._ids[i] for i, m in enumerate(self._mols) if m is None])
+        self._lazy_mols = lazy_mols and mols is None
+        self._ids_index = None
+        if self._lazy_mols:
+            self._mols = LazyMols(self._smiles)
+            self._select_rows(validate_smiles(self._smiles, n_jobs=n_jobs))
+        else:
+            self._mols = np.array(mols) if mols is not None else np.array([smiles_to_mol(s) for s in self._smiles])
+            self._select_rows(np.array([m is not None for m in self._mols], dtype=bool))
         self._feature_names = np.array(feature_names) if feature_names is not None else None
         self._label_names = np.array(label_names) if label_names is not None else None
         self._validate_params()
@@ -434,7 +536,7 @@ class SmilesDataset(Dataset):
         """
         if len(self._smiles) != len(self._ids):
             raise ValueError('Length of smiles and ids must be the same.')
-        if self._X is not None and len(self._smiles) != len(self._X):
+        if self._X is not None and len(self._smiles) != self._X.shape[0]:
             raise ValueError('Length of smiles and X must be the same.')
         if self._y is not None and len(self._smiles) != len(self._y):
             raise ValueError('Length of smiles and y must be the same.')
@@ -478,8 +580,13 @@ class SmilesDataset(Dataset):
         self._X = None
         self._y = None
         self._n_tasks = None
-        self._mols = np.array([smiles_to_mol(s) for s in self._smiles])
-        self.remove_elements([self._ids[i] for i, m in enumerate(self._mols) if m is None])
+        self._ids_index = None
+        if self._lazy_mols:
+            self._mols = LazyMols(self._smiles)
+            self._select_rows(validate_smiles(self._smiles))
+        else:
+            self._mols = np.array([smiles_to_mol(s) for s in self._smiles])
+            self._select_rows(np.array([m is not None for m in self._mols], dtype=bool))
         self._feature_names = None
         self._label_names = None
         self.mode = None
@@ -533,16 +640,28 @@ class SmilesDataset(Dataset):
         self._reset(smiles)
 
     @property
-    def mols(self) -> np.ndarray:
+    def mols(self) -> Union[np.ndarray, LazyMols]:
         """
         Get the RDKit Mol objects of the molecules in the dataset.
         Returns
         -------
-        np.ndarray
-            RDKit molecules of the molecules in the dataset.
+        Union[np.ndarray, LazyMols]
+            RDKit molecules of the molecules in the dataset. In lazy mode, a sequence that parses the molecules when
+            they are accessed.
         """
         return self._mols
 
+    @property
+    def lazy_mols(self) -> bool:
+        """
+        Whether the RDKit Mol objects of the dataset are parsed on access.
+        Returns
+        -------
+        bool
+            True if the dataset is in lazy mode.
+        """
+        return isinstance(self._mols, LazyMols)
+
     @property
     def feature_names(self) -> np.ndarray:
         """
@@ -569,7 +688,7 @@ class SmilesDataset(Dataset):
             if len(feature_names) != 1:
                 raise ValueError('The number of feature names must be equal to the number of features.')
         else:
-            if len(feature_names) != len(self._X[0]):
+            if len(feature_names) != self._X.shape[1]:
                 raise ValueError('The number of feature names must be equal to the number of features.')
         if len(feature_names) != len(set(feature_names)):
             raise ValueError('The feature names must be unique.')
@@ -608,16 +727,39 @@ class SmilesDataset(Dataset):
         self._label_names = np.array([str(ln) for ln in label_names])
 
     @property
-    def X(self) -> np.ndarray:
+    def X(self) -> Union[np.ndarray, PackedFingerprints]:
         """
         Get the features of the molecules in the dataset.
         Returns
         -------
-        np.ndarray
-            Features of the molecules in the dataset.
+        Union[np.ndarray, PackedFingerprints]
+            Features of the molecules in the dataset (PackedFingerprints if they were stored bit-packed, a scipy CSR
+            matrix if they are sparse).
         """
         return self._X
 
+    @property
+    def sparse(self) -> bool:
+        """
+        Whether the features of the dataset are stored in a scipy sparse matrix.
+        Returns
+        -------
+        bool
+            True if the features are sparse.
+        """
+        return sp.issparse(self._X)
+
+    @property
+    def packed(self) -> bool:
+        """
+        Whether the features of the dataset are binary fingerprints stored bit-packed.
+        Returns
+        -------
+        bool
+            True if the features are stored bit-packed.
+        """
+        return isinstance(self._X, PackedFingerprints)
+
     @property
     def y(self) -> np.ndarray:
         """
@@ -654,6 +796,68 @@ class SmilesDataset(Dataset):
         if len(ids) != len(np.unique(ids)):
             raise ValueError('The IDs must be unique.')
         self._ids = np.array([str(idx) for idx in ids])
+        self._ids_index = None
+
+    def _get_ids_index(self) -> dict:
+        """
+        Get the mapping between the IDs of the molecules and their positions in the dataset.
+        The mapping is built on first use and rebuilt whenever the IDs change.
+
+        Returns
+        -------
+        dict
+            Dictionary mapping each ID to its position in the dataset.
+        """
+        if self._ids_index is None:
+            self._ids_index = {idx: i for i, idx in enumerate(self._ids)}
+        return self._ids_index
+
+    def _ids_to_mask(self, ids: Union[List[str], np.ndarray]) -> np.ndarray:
+        """
+        Get a boolean mask over the molecules of the dataset marking the ones with the given IDs.
+        IDs that are not in the dataset are ignored.
+
+        Parameters
+        ----------
+        ids: Union[List[str], np.ndarray]
+            IDs of the molecules to mark.
+
+        Returns
+        -------
+        np.ndarray
+            Boolean mask with the same length as the dataset.
+        """
+        ids_index = self._get_ids_index()
+        positions = [ids_index[idx] for idx in ids if idx in ids_index]
+        mask = np.zeros(len(self._ids), dtype=bool)
+        mask[positions] = True
+        return mask
+
+    def _select_rows(self, mask: np.ndarray) -> None:
+        """
+        Keep only the molecules marked in a boolean mask (along the first axis).
+        All the removed molecules are reported in a single log record.
+
+        Parameters
+        ----------
+        mask: np.ndarray
+            Boolean mask with the same length as the dataset. True marks the molecules to keep.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        n_removed = int(len(mask) - np.count_nonzero(mask))
+        if n_removed == 0:
+            return
+        removed_smiles = self._smiles[~mask]
+        preview = ', '.join(str(smi) for smi in removed_smiles[:10])
+        if n_removed > 10:
+            preview += ', ...'
+        self.logger.warning(f"{n_removed} molecules removed from dataset: {preview}")
+        self._smiles = self._smiles[mask]
+        self._mols = self._mols[mask]
+        self._y = self._y[mask] if self._y is not None else self._y
+        self._X = self._X[mask] if self._X is not None else self._X
+        self._ids = self._ids[mask]
+        self._ids_index = None
 
     @property
     def n_tasks(self) -> int:
@@ -719,11 +923,25 @@ class SmilesDataset(Dataset):
         Remove molecules with duplicated features from the dataset.
         """
         if self._X is not None:
-            if np.isnan(np.stack(self._X)).any():
-                warnings.warn('The dataset contains NaNs. Molecules with NaNs will be ignored.')
-            unique, index = np.unique(self.X, return_index=True, axis=0)
-            ids = self.ids[index]
-            self.select(ids, axis=0)
+            if sp.issparse(self._X):
+                if np.isnan(self._X.data).any():
+                    warnings.warn('The dataset contains NaNs. Molecules with NaNs will be ignored.')
+                X = self._X.copy()
+                X.sum_duplicates()
+                X.eliminate_zeros()
+                # rows are compared by their stored column indexes and values
+                first_rows = {}
+                for i in range(X.shape[0]):
+                    start, stop = X.indptr[i], X.indptr[i + 1]
+                    first_rows.setdefault((X.indices[start:stop].tobytes(), X.data[start:stop].tobytes()), i)
+                index = list(first_rows.values())
+            else:
+                if np.isnan(np.stack(self._X)).any():
+                    warnings.warn('The dataset contains NaNs. Molecules with NaNs will be ignored.')
+                unique, index = np.unique(self.X, return_index=True, axis=0)
+            mask = np.zeros(len(self._ids), dtype=bool)
+            mask[index] = True
+            self._select_rows(mask)
 
     def remove_elements(self, ids: List[str]) -> None:
         """
@@ -734,9 +952,7 @@ class SmilesDataset(Dataset):
             IDs of the elements to remove.
         """
         if len(ids) != 0:
-            all_indexes = self.ids
-            indexes_to_keep = list(set(all_indexes) - set(ids))
-            self.select(indexes_to_keep)
+            self._select_rows(~self._ids_to_mask(ids))
 
     def remove_elements_by_index(self, indexes: List[int]) -> None:
         """
@@ -747,8 +963,9 @@ class SmilesDataset(Dataset):
             Indexes of the elements to remove.
         """
         if len(indexes) > 0:
-            indexes = self._ids[indexes]
-            self.remove_elements(indexes)
+            mask = np.ones(len(self._ids), dtype=bool)
+            mask[indexes] = False
+            self._select_rows(mask)
 
     def select_features_by_index(self, indexes: List[int]) -> None:
         """
@@ -785,21 +1002,23 @@ class SmilesDataset(Dataset):
         """
         if self._X is None or len(self._X.shape) == 0:
             return
+        if isinstance(self._X, PackedFingerprints):
+            # packed fingerprints are binary and can not contain NaNs
+            return
+        if sp.issparse(self._X):
+            self._remove_nan_sparse(axis)
+            return
         if axis == 0:
-            if len(self._X.shape) == 1:
-                indexes = np.where(pd.isna(self._X))[0]
-            else:
-                indexes = np.where(pd.isna(self._X).any(axis=1))[0]
             # rows with at least one NaN
-            self.remove_elements_by_index(indexes)
+            nan_mask = pd.isna(self._X).reshape(len(self._X), -1).any(axis=1)
+            self._select_rows(~nan_mask)
         elif axis == 1:
             if len(self._X.shape) == 1:
-                indexes = np.where(np.isnan(self._X))[0]
-                self.remove_elements_by_index(indexes)
+                self._select_rows(~np.isnan(self._X))
             else:
                 # rows with all NaNs
-                indexes = np.where(np.isnan(self._X).all(axis=1))[0]
-                self.remove_elements_by_index(indexes)
+                nan_mask = np.isnan(self._X).all(axis=1).reshape(len(self._X), -1).any(axis=1)
+                self._select_rows(~nan_mask)
                 # columns with at least one NaN
                 columns = list(set(np.where(np.isnan(self._X).any(axis=0))[0]))
                 self._X = np.delete(self._X, columns, axis=1)
@@ -809,6 +1028,35 @@ class SmilesDataset(Dataset):
         else:
             raise ValueError('The axis must be 0 or 1.')
 
+    def _remove_nan_sparse(self, axis: int) -> None:
+        """
+        Remove the NaNs of sparse features (see remove_nan). Only the stored values are checked, as the implicit zeros
+        can not be NaN.
+        Parameters
+        ----------
+        axis: int
+            The axis to remove the NaNs from.
+        """
+        if axis not in (0, 1):
+            raise ValueError('The axis must be 0 or 1.')
+        X = self._X
+        nan_values = np.isnan(X.data)
+        if not nan_values.any():
+            return
+        rows_of_values = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+        nan_per_row = np.bincount(rows_of_values[nan_values], minlength=X.shape[0])
+        if axis == 0:
+            self._select_rows(nan_per_row == 0)
+        else:
+            # rows with all NaNs
+            self._select_rows(nan_per_row < X.shape[1])
+            # columns with at least one NaN
+            X = self._X
+            columns = np.unique(X.indices[np.isnan(X.data)])
+            self._X = X[:, np.setdiff1d(np.arange(X.shape[1]), columns)]
+            columns = set(columns)
+            self._feature_names = [name for i, name in enumerate(self._feature_names) if i not in columns]
+
     def select_to_split(self, indexes: Union[np.ndarray, List[int]]) -> 'SmilesDataset':
         """
         Select elements with specific indexes to split the dataset
@@ -819,17 +1067,9 @@ class SmilesDataset(Dataset):
         Returns
         -------
         SmilesDataset
-            The dataset with the selected elements.
+            A view of the dataset with the selected elements. The data is only copied when the view is modified.
         """
-        smiles = self._smiles[indexes]
-        mols = self._mols[indexes]
-        X = self._X[indexes] if self._X is not None else None
-        y = self._y[indexes] if self._y is not None else None
-        ids = self._ids[indexes]
-        feature_names = self._feature_names
-        label_names = self._label_names
-        mode = self._mode
-        return SmilesDataset(smiles, mols, ids, X, feature_names, y, label_names, mode)
+        return DatasetView(self, indexes)
 
     def select(self, ids: Union[List[str], List[int]], axis: int = 0) -> None:
         """
@@ -844,15 +1084,7 @@ class SmilesDataset(Dataset):
             Axis to select along. 0 selects along the first axis, 1 selects along the second axis.
         """
         if axis == 0:
-            ids_to_delete = sorted(list(set(self._ids) - set(ids)))
-            raw_indexes = [i for i, mol_index in enumerate(self._ids) if mol_index in ids_to_delete]
-            for idx in raw_indexes:
-                self.logger.error(f"Molecule with smiles: {self._smiles[idx]} removed from dataset.")
-            self._smiles = np.delete(self._smiles, raw_indexes, axis)
-            self._mols = np.delete(self._mols, raw_indexes, axis)
-            self._y = np.delete(self._y, raw_indexes, axis) if self._y is not None else self._y
-            self._X = np.delete(self._X, raw_indexes, axis) if self._X is not None else self._X
-            self._ids = np.delete(self._ids, raw_indexes, axis)
+            self._select_rows(self._ids_to_mask(ids))
 
         elif axis == 1:
             if self._X is None or len(self._X.shape) == 0:
@@ -861,7 +1093,10 @@ class SmilesDataset(Dataset):
                 pass
             else:
                 indexes_to_delete = list(set(np.arange(self._X.shape[1])) - set(ids))
-                self._X = np.delete(self.X, indexes_to_delete, axis=1)
+                if sp.issparse(self._X):
+                    self._X = self._X[:, np.setdiff1d(np.arange(self._X.shape[1]), indexes_to_delete)]
+                else:
+                    self._X = np.delete(self.X, indexes_to_delete, axis=1)
                 if len(self._X.shape) <= 2:  # feature names in datasets with more than two dimensions not supported
                     feature_names_to_delete = [self._feature_names[i] for i in indexes_to_delete]
                     self._feature_names = [name for name in self._feature_names if name not in feature_names_to_delete]
@@ -891,20 +1126,31 @@ class SmilesDataset(Dataset):
         label_names = self._label_names
         mode = self._mode
 
+        lazy_mols = isinstance(mols, LazyMols) or any(isinstance(ds.mols, LazyMols) for ds in datasets)
+
         for ds in datasets:
-            ids = merge_arrays(ids, len(mols), ds.ids, len(ds.mols))
+            ids = merge_arrays(ids, len(smiles), ds.ids, len(ds.smiles))
             if len(set(ids)) != len(ids):
                 raise ValueError(f'IDs must be unique! IDs are {ids}')
-            y = merge_arrays(y, len(mols), ds.y, len(ds.mols))
+            y = merge_arrays(y, len(smiles), ds.y, len(ds.smiles))
             if X is None or ds.X is None:
                 self.logger.error('Features are not the same length/type... Recalculate features for all inputs!')
                 X = None
             elif len(X.shape) == 1 and len(ds.X.shape) == 1:
-                X = merge_arrays(X, len(mols), ds.X, len(ds.mols))
+                X = merge_arrays(X, len(smiles), ds.X, len(ds.smiles))
+            elif isinstance(X, PackedFingerprints) and isinstance(ds.X, PackedFingerprints) \
+                    and X.n_bits == ds.X.n_bits:
+                X = X.concatenate(ds.X)
+            elif (sp.issparse(X) or sp.issparse(ds.X)) and X.shape[1:] == ds.X.shape[1:]:
+                X = sp.vstack([X, ds.X], format='csr')
             else:
                 X = merge_arrays_of_arrays(X, ds.X)
-            mols = np.append(mols, ds.mols, axis=0)
+            if not lazy_mols:
+                mols = np.append(mols, ds.mols, axis=0)
             smiles = np.append(smiles, ds.smiles, axis=0)
+        if lazy_mols:
+            # the molecules of the merged dataset are parsed from its SMILES when accessed
+            return SmilesDataset(smiles, None, ids, X, feature_names, y, label_names, mode, lazy_mols=True)
         return SmilesDataset(smiles, mols, ids, X, feature_names, y, label_names, mode)
 
     def to_csv(self, path: str) -> None:
@@ -924,11 +1170,107 @@ class SmilesDataset(Dataset):
             df = pd.concat([df, df_y], axis=1)
         if self._X is not None:
             columns_names = self._feature_names
-            df_x = pd.DataFrame(self._X, columns=columns_names)
+            df_x = pd.DataFrame.sparse.from_spmatrix(self._X, columns=columns_names) if sp.issparse(self._X) \
+                else pd.DataFrame(np.asarray(self._X), columns=columns_names)
             df = pd.concat([df, df_x], axis=1)
 
         df.to_csv(path, index=False)
 
+    def to_parquet(self, path: str, **kwargs) -> None:
+        """
+        Save the dataset to a Parquet file.
+        The ids, smiles, labels (column 'y') and features (column 'X') are stored as typed columns. Labels and
+        features with more than one value per molecule are stored as fixed size lists, so they can be read back without
+        parsing. Bit-packed fingerprints are stored packed and sparse features are stored dense. The feature names,
+        label names, number of tasks and mode are stored in the metadata of the file.
+        Parameters
+        ----------
+        path: str
+            Path to save the Parquet file.
+        kwargs:
+            Keyword arguments to pass to pyarrow.parquet.write_table (e.g. compression).
+        """
+        if pq is None:
+            raise ImportError('pyarrow not available. Please install it to use it.')
+        columns = {'ids': pa.array(np.asarray(self.ids, dtype=str)),
+                   'smiles': pa.array(np.asarray(self.smiles, dtype=str))}
+        metadata = {'feature_names': [str(name) for name in self.feature_names]
+                    if self.feature_names is not None else None,
+                    'label_names': [str(name) for name in self.label_names] if self.label_names is not None else None,
+                    'n_tasks': self.n_tasks,
+                    'mode': self.mode,
+                    'packed_bits': None}
+        X = self.X
+        if X is not None:
+            if isinstance(X, PackedFingerprints):
+                metadata['packed_bits'] = X.n_bits
+                X = X.packed
+            elif sp.issparse(X):
+                X = X.toarray()
+            X = np.asarray(X)
+            columns['X'] = to_arrow_column(X)
+            metadata['x_shape'] = list(X.shape[1:])
+        if self.y is not None:
+            y = np.asarray(self.y)
+            columns['y'] = to_arrow_column(y)
+            metadata['y_shape'] = list(y.shape[1:])
+        table = pa.table(columns).replace_schema_metadata({'deepmol': json.dumps(metadata)})
+        pq.write_table(table, path, **kwargs)
+
+    @staticmethod
+    def from_parquet(path: str, columns: List[str] = None) -> 'SmilesDataset':
+        """
+        Load a dataset saved with to_parquet.
+        Only the requested columns are read from the file. The SMILES were validated when the dataset was saved, so
+        the RDKit Mol objects are only parsed when accessed (lazy mols).
+        Parameters
+        ----------
+        path: str
+            Path to the Parquet file.
+        columns: List[str]
+            The columns to read ('X' and/or 'y'). The ids and smiles are always read. If None, all columns are read.
+        Returns
+        -------
+        SmilesDataset
+            The loaded dataset.
+        """
+        if pq is None:
+            raise ImportError('pyarrow not available. Please install it to use it.')
+        columns = ['X', 'y'] if columns is None else list(columns)
+        if not set(columns).issubset({'ids', 'smiles', 'X', 'y'}):
+            raise ValueError("The columns to read must be 'X' and/or 'y'.")
+        schema = pq.read_schema(path)
+        if schema.metadata is None or b'deepmol' not in schema.metadata:
+            raise ValueError(f'{path} was not saved with SmilesDataset.to_parquet.')
+        metadata = json.loads(schema.metadata[b'deepmol'])
+        columns = ['ids', 'smiles'] + [name for name in ('X', 'y') if name in columns and name in schema.names]
+        table = pq.read_table(path, columns=columns)
+
+        dataset = SmilesDataset.__new__(SmilesDataset)
+        Dataset.__init__(dataset)
+        dataset._smiles = from_arrow_column(table.column('smiles'), ())
+        dataset._ids = from_arrow_column(table.column('ids'), ())
+        dataset._mols = LazyMols(dataset._smiles)
+        dataset._lazy_mols = True
+        dataset._ids_index = None
+        dataset._X = None
+        dataset._feature_names = None
+        if 'X' in columns:
+            dataset._X = from_arrow_column(table.column('X'), metadata['x_shape'])
+            if metadata['packed_bits'] is not None:
+                dataset._X = PackedFingerprints(dataset._X, metadata['packed_bits'])
+            if metadata['feature_names'] is not None:
+                dataset._feature_names = np.array(metadata['feature_names'])
+        dataset._y = None
+        dataset._label_names = None
+        if 'y' in columns:
+            dataset._y = from_arrow_column(table.column('y'), metadata['y_shape'])
+            if metadata['label_names'] is not None:
+                dataset._label_names = np.array(metadata['label_names'])
+        dataset._n_tasks = metadata['n_tasks']
+        dataset._mode = metadata['mode']
+        return dataset
+
     def load_features(self, path: str, **kwargs) -> None:
         """
         Load features from a csv file.
@@ -952,7 +1294,766 @@ class SmilesDataset(Dataset):
         """
         if self.X is not None:
             columns_names = self._feature_names
-            df = pd.DataFrame(self._X, columns=columns_names)
+            df = pd.DataFrame.sparse.from_spmatrix(self._X, columns=columns_names) if sp.issparse(self._X) \
+                else pd.DataFrame(np.asarray(self._X), columns=columns_names)
             df.to_csv(path, index=False)
         else:
             raise ValueError('Features array is empty!')
+
+
+def _view_array_property(name: str) -> property:
+    """
+    Creates a property that reads one of the arrays of a DatasetView through its index array.
+    The gathered rows are cached in the view until the parent array or the view itself changes.
+    Setting the property materializes the view before storing the new value.
+
+    Parameters
+    ----------
+    name: str
+        The name of the array in the view.
+
+    Returns
+    -------
+    property
+        The property giving access to the array.
+    """
+
+    def getter(self: 'DatasetView') -> Union[np.ndarray, None]:
+        array = self._arrays[name]
+        if array is None or self._indexes is None:
+            return array
+        source, gathered = self._gathered.get(name, (None, None))
+        if source is not array:
+            gathered = array[self._indexes]
+            self._gathered[name] = (array, gathered)
+        return gathered
+
+    def setter(self: 'DatasetView', value: Union[np.ndarray, None]) -> None:
+        self._materialize()
+        self._arrays[name] = value
+
+    return property(getter, setter)
+
+
+class DatasetView(SmilesDataset):
+    """
+    A lazy selection of the molecules of a SmilesDataset.
+    It keeps references to the arrays of the parent dataset plus an array with the indexes of the selected molecules,
+    so creating a view does not copy smiles, mols, X or y. The selected rows are gathered (once per array) the first
+    time each array is read, and the view only copies (materializes) its data the first time it is modified.
+    Afterwards, it behaves like an independent SmilesDataset.
+    Changes made in place to the arrays of the parent dataset are visible through the arrays of its views that were not
+    read yet.
+    """
+
+    _smiles = _view_array_property('smiles')
+    _mols = _view_array_property('mols')
+    _X = _view_array_property('X')
+    _y = _view_array_property('y')
+    _ids = _view_array_property('ids')
+
+    def __init__(self, dataset: SmilesDataset, indexes: Union[np.ndarray, List[int]]) -> None:
+        """
+        Initialize a view over the molecules of a dataset.
+
+        Parameters
+        ----------
+        dataset: SmilesDataset
+            The parent dataset.
+        indexes: Union[np.ndarray, List[int]]
+            The indexes of the molecules of the parent dataset to select.
+        """
+        Dataset.__init__(self)
+        indexes = np.asarray(indexes, dtype=int)
+        if isinstance(dataset, DatasetView) and dataset._indexes is not None:
+            # views of views point directly to the arrays of the original dataset
+            self._arrays = dict(dataset._arrays)
+            self._indexes = dataset._indexes[indexes]
+        else:
+            self._arrays = {'smiles': dataset._smiles, 'mols': dataset._mols, 'X': dataset._X, 'y': dataset._y,
+                            'ids': dataset._ids}
+            self._indexes = indexes
+        # the rows gathered from the parent arrays, with the array they were gathered from
+        self._gathered = {}
+        self._ids_index = None
+        self._lazy_mols = dataset._lazy_mols
+        self._feature_names = dataset._feature_names
+        self._label_names = dataset._label_names
+        self._n_tasks = dataset._n_tasks
+        self._mode = dataset._mode
+
+    def __len__(self) -> int:
+        """
+        Get the number of molecules in the dataset.
+        Returns
+        -------
+        int
+            Number of molecules in the dataset.
+        """
+        if self._indexes is not None:
+            return len(self._indexes)
+        return len(self._arrays['smiles'])
+
+    @property
+    def is_materialized(self) -> bool:
+        """
+        Whether the view holds its own copy of the data.
+        Returns
+        -------
+        bool
+            True if the view was already materialized, False if it still points to the parent arrays.
+        """
+        return self._indexes is None
+
+    def _batch_source(self) -> Tuple[Union[np.ndarray, None], Union[np.ndarray, None], np.ndarray,
+                                     Union[np.ndarray, None]]:
+        """
+        Get the arrays that mini-batches are taken from.
+        Views that were not materialized read the batches directly from the parent arrays.
+
+        Returns
+        -------
+        X: Union[np.ndarray, None]
+            The features.
+        y: Union[np.ndarray, None]
+            The labels.
+        ids: np.ndarray
+            The ids.
+        rows: Union[np.ndarray, None]
+            The positions of the molecules of the view in the arrays, or None if the view was materialized.
+        """
+        return self._arrays['X'], self._arrays['y'], self._arrays['ids'], self._indexes
+
+    def _materialize(self) -> None:
+        """
+        Copies the selected rows of the parent arrays so that the view holds its own data.
+        """
+        if self._indexes is None:
+            return
+        arrays = {}
+        for name, array in self._arrays.items():
+            # the rows already gathered from the parent arrays are reused instead of being copied again
+            source, gathered = self._gathered.get(name, (None, None))
+            if array is not None:
+                array = gathered if source is array else array[self._indexes]
+            arrays[name] = array
+        self._arrays = arrays
+        self._indexes = None
+        self._gathered = {}
+
+
+def _disk_array_property(name: str) -> property:
+    """
+    Creates a property that gives access to one of the memory-mapped arrays of a DiskDataset.
+    Setting the property writes the new array to the dataset directory (or deletes it when set to None).
+
+    Parameters
+    ----------
+    name: str
+        The name of the array in the dataset directory.
+
+    Returns
+    -------
+    property
+        The property giving access to the array.
+    """
+
+    def getter(self: 'DiskDataset') -> Union[np.memmap, None]:
+        return self._open_array(name)
+
+    def setter(self: 'DiskDataset', value: Union[np.ndarray, None]) -> None:
+        self._write_array(name, value)
+
+    return property(getter, setter)
+
+
+class DiskDataset(SmilesDataset):
+    """
+    A Dataset stored in a directory on disk.
+    The smiles, ids, features X and labels y are kept in numpy (.npy) files that are memory-mapped when accessed, so
+    datasets that do not fit in memory can be used. Row and column selections, NaN removal, splitting and merging are
+    done in chunks of rows. The RDKit Mol objects are parsed from the SMILES when accessed (see LazyMols).
+    Feature names, label names and mode are stored in a metadata.json file in the same directory.
+    """
+
+    _smiles = _disk_array_property('smiles')
+    _ids = _disk_array_property('ids')
+    _X = _disk_array_property('X')
+    _y = _disk_array_property('y')
+
+    def __init__(self,
+                 data_dir: str,
+                 smiles: Union[np.ndarray, List[str]],
+                 ids: Union[List, np.ndarray] = None,
+                 X: Union[List, np.ndarray] = None,
+                 feature_names: Union[List, np.ndarray] = None,
+                 y: Union[List, np.ndarray] = None,
+                 label_names: Union[List, np.ndarray] = None,
+                 mode: str = 'auto',
+                 chunk_size: int = 10000,
+                 n_jobs: int = 1) -> None:
+        """
+        Initialize a dataset stored on disk from SMILES strings.
+        The given arrays are written to the dataset directory.
+
+        Parameters
+        ----------
+        data_dir: str
+            Directory where the dataset is stored. It is created if it does not exist.
+        smiles: Union[np.ndarray, List[str]]
+            SMILES strings of the molecules.
+        ids: Union[List, np.ndarray]
+            IDs of the molecules.
+        X: Union[List, np.ndarray]
+            Features of the molecules.
+        feature_names: Union[List, np.ndarray]
+            Names of the features.
+        y: Union[List, np.ndarray]
+            Labels of the molecules.
+        label_names: Union[List, np.ndarray]
+            Names of the labels.
+        mode: str
+            The mode of the dataset.
+            If 'auto', the mode is inferred from the labels. If 'classification', the dataset is treated as a
+            classification dataset. If 'regression', the dataset is treated as a regression dataset. If 'multitask',
+            the dataset is treated as a multitask dataset.
+        chunk_size: int
+            The number of rows processed at a time in chunked operations.
+        n_jobs: int
+            The number of jobs used to validate the SMILES. If -1, all available cores are used.
+        """
+        self._init_storage(data_dir, chunk_size)
+        self._smiles = np.array(smiles, dtype=str)
+        self._ids = np.array([str(i) for i in ids]) if ids is not None \
+            else np.array([str(uuid.uuid4().hex) for _ in range(len(smiles))])
+        self._X = X
+        self._y = y
+        self._select_rows(validate_smiles(self._smiles, n_jobs=n_jobs))
+        self._feature_names = np.array(feature_names) if feature_names is not None else None
+        self._label_names = np.array(label_names) if label_names is not None else None
+        self._validate_params()
+        self._n_tasks = len(self._label_names) if self._label_names is not None else 0
+        self._mode = mode if mode != 'auto' else self._infer_mode()
+        self._save_metadata()
+
+    def _init_storage(self, data_dir: str, chunk_size: int) -> None:
+        """
+        Initializes the attributes used to manage the files of the dataset.
+
+        Parameters
+        ----------
+        data_dir: str
+            Directory where the dataset is stored.
+        chunk_size: int
+            The number of rows processed at a time in chunked operations.
+        """
+        Dataset.__init__(self)
+        os.makedirs(data_dir, exist_ok=True)
+        self.data_dir = data_dir
+        self.chunk_size = chunk_size
+        self._memmaps = {}
+        self._mols_cache = LRUCache()
+        self._ids_index = None
+        self._lazy_mols = True
+        self._feature_names = None
+        self._label_names = None
+        self._n_tasks = 0
+        self._mode = None
+
+    @classmethod
+    def load(cls, data_dir: str, chunk_size: int = 10000) -> 'DiskDataset':
+        """
+        Opens a dataset previously stored in a directory.
+
+        Parameters
+        ----------
+        data_dir: str
+            Directory where the dataset is stored.
+        chunk_size: int
+            The number of rows processed at a time in chunked operations.
+
+        Returns
+        -------
+        DiskDataset
+            The dataset.
+        """
+        if not os.path.exists(os.path.join(data_dir, 'smiles.npy')):
+            raise ValueError(f'{data_dir} does not contain a DiskDataset.')
+        dataset = cls.__new__(cls)
+        dataset._init_storage(data_dir, chunk_size)
+        with open(os.path.join(data_dir, 'metadata.json')) as f:
+            metadata = json.load(f)
+        dataset._feature_names = np.array(metadata['feature_names']) if metadata['feature_names'] is not None \
+            else None
+        dataset._label_names = np.array(metadata['label_names']) if metadata['label_names'] is not None else None
+        dataset._n_tasks = metadata['n_tasks']
+        dataset._mode = metadata['mode']
+        return dataset
+
+    @classmethod
+    def from_dataset(cls, dataset: Dataset, data_dir: str, chunk_size: int = 10000) -> 'DiskDataset':
+        """
+        Stores an in-memory dataset in a directory.
+
+        Parameters
+        ----------
+        dataset: Dataset
+            The dataset to store.
+        data_dir: str
+            Directory where the dataset is stored.
+        chunk_size: int
+            The number of rows processed at a time in chunked operations.
+
+        Returns
+        -------
+        DiskDataset
+            The dataset stored on disk.
+        """
+        return cls(data_dir, dataset.smiles, ids=dataset.ids, X=dataset.X, feature_names=dataset.feature_names,
+                   y=dataset.y, label_names=dataset.label_names, mode=dataset.mode, chunk_size=chunk_size)
+
+    def _array_path(self, name: str) -> str:
+        """
+        Get the path of the file of one of the arrays of the dataset.
+
+        Parameters
+        ----------
+        name: str
+            The name of the array.
+
+        Returns
+        -------
+        str
+            The path of the .npy file.
+        """
+        return os.path.join(self.data_dir, f'{name}.npy')
+
+    def _open_array(self, name: str) -> Union[np.memmap, None]:
+        """
+        Get one of the arrays of the dataset as a memory-mapped array.
+
+        Parameters
+        ----------
+        name: str
+            The name of the array.
+
+        Returns
+        -------
+        Union[np.memmap, None]
+            The memory-mapped array or None if the dataset does not have it.
+        """
+        if name not in self._memmaps:
+            path = self._array_path(name)
+            self._memmaps[name] = np.load(path, mmap_mode='r+') if os.path.exists(path) else None
+        return self._memmaps[name]
+
+    def _replace_array(self, name: str, tmp_path: Union[str, None]) -> None:
+        """
+        Replaces the file of one of the arrays of the dataset by a new file.
+
+        Parameters
+        ----------
+        name: str
+            The name of the array.
+        tmp_path: Union[str, None]
+            The path of the new file. If None, the array is deleted.
+        """
+        memmap = self._memmaps.pop(name, None)
+        if memmap is not None:
+            memmap.flush()
+        del memmap
+        path = self._array_path(name)
+        if tmp_path is not None:
+            os.replace(tmp_path, path)
+        elif os.path.exists(path):
+            os.remove(path)
+        if name == 'smiles':
+            self._mols_cache.clear()
+        if name == 'ids':
+            self._ids_index = None
+
+    def _write_array(self, name: str, value: Union[np.ndarray, None]) -> None:
+        """
+        Writes one of the arrays of the dataset to disk.
+
+        Parameters
+        ----------
+        name: str
+            The name of the array.
+        value: Union[np.ndarray, None]
+            The new array. If None, the array is deleted.
+        """
+        if value is not None and value is self._memmaps.get(name):
+            # the array was modified in place
+            value.flush()
+            return
+        if value is None:
+            self._replace_array(name, None)
+            return
+        value = value.toarray() if sp.issparse(value) else np.asarray(value)
+        if value.dtype == object:
+            raise ValueError(f'The {name} array of a DiskDataset must have a fixed-size dtype.')
+        tmp_path = self._array_path(f'{name}.tmp')
+        np.save(tmp_path, value)
+        self._replace_array(name, tmp_path)
+
+    def allocate_array(self, name: str, shape: tuple, dtype: Union[np.dtype, str] = np.float32) -> np.memmap:
+        """
+        Creates an empty array in the dataset directory that can be written in chunks (e.g. by featurizers).
+        The previous array with the same name is replaced.
+
+        Parameters
+        ----------
+        name: str
+            The name of the array ('X' or 'y').
+        shape: tuple
+            The shape of the array. The first dimension must be the number of molecules of the dataset.
+        dtype: Union[np.dtype, str]
+            The dtype of the array.
+
+        Returns
+        -------
+        np.memmap
+            The writable memory-mapped array.
+        """
+        if name not in ('X', 'y'):
+            raise ValueError('Only the X and y arrays can be allocated.')
+        if shape[0] != len(self):
+            raise ValueError('The first dimension of the array must be equal to the number of molecules.')
+        tmp_path = self._array_path(f'{name}.tmp')
+        np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=shape).flush()
+        self._replace_array(name, tmp_path)
+        return self._open_array(name)
+
+    def _save_metadata(self) -> None:
+        """
+        Writes the feature names, label names, number of tasks and mode of the dataset to metadata.json.
+        """
+        metadata = {'feature_names': [str(name) for name in self._feature_names]
+                    if self._feature_names is not None else None,
+                    'label_names': [str(name) for name in self._label_names]
+                    if self._label_names is not None else None,
+                    'n_tasks': self._n_tasks,
+                    'mode': self._mode}
+        with open(os.path.join(self.data_dir, 'metadata.json'), 'w') as f:
+            json.dump(metadata, f)
+
+    @property
+    def _mols(self) -> LazyMols:
+        """
+        Get the RDKit Mol objects of the dataset, parsed from the SMILES stored on disk when accessed.
+        """
+        return LazyMols(self._smiles, cache=self._mols_cache)
+
+    @_mols.setter
+    def _mols(self, value: Union[np.ndarray, LazyMols]) -> None:
+        """
+        The molecules of a DiskDataset are always derived from its SMILES, so only the cache of parsed molecules is
+        reset. The SMILES must be set to change the molecules.
+        """
+        self._mols_cache.clear()
+
+    def __len__(self) -> int:
+        """
+        Get the number of molecules in the dataset.
+        Returns
+        -------
+        int
+            Number of molecules in the dataset.
+        """
+        return len(self._smiles)
+
+    @SmilesDataset.feature_names.setter
+    def feature_names(self, feature_names: Union[List, np.ndarray]) -> None:
+        """
+        Set the feature labels of the molecules in the dataset.
+        Parameters
+        ----------
+        feature_names: Union[List, np.ndarray]
+            Feature names of the molecules.
+        """
+        SmilesDataset.feature_names.fset(self, feature_names)
+        self._save_metadata()
+
+    @SmilesDataset.label_names.setter
+    def label_names(self, label_names: Union[List, np.ndarray]) -> None:
+        """
+        Set the label names of the molecules in the dataset.
+        Parameters
+        ----------
+        label_names: Union[List, np.ndarray]
+            Label names of the molecules.
+        """
+        SmilesDataset.label_names.fset(self, label_names)
+        self._save_metadata()
+
+    @SmilesDataset.mode.setter
+    def mode(self, mode: str) -> None:
+        """
+        Set the mode of the dataset.
+
+        Parameters
+        ----------
+        mode: str
+            The mode of the dataset.
+        """
+        SmilesDataset.mode.fset(self, mode)
+        self._save_metadata()
+
+    def _chunks(self, n_rows: int = None) -> Iterator[Tuple[int, int]]:
+        """
+        Iterates over the (start, stop) positions of the chunks of rows of the dataset.
+
+        Parameters
+        ----------
+        n_rows: int
+            The number of rows to split in chunks. By default, the number of molecules in the dataset.
+
+        Returns
+        -------
+        Iterator[Tuple[int, int]]
+            The start and stop positions of each chunk.
+        """
+        n_rows = len(self) if n_rows is None else n_rows
+        for start in range(0, n_rows, self.chunk_size):
+            yield start, min(start + self.chunk_size, n_rows)
+
+    def _copy_rows(self, array: np.memmap, indexes: np.ndarray, path: str) -> None:
+        """
+        Copies rows of an array to a new .npy file, one chunk at a time.
+
+        Parameters
+        ----------
+        array: np.memmap
+            The array to copy from.
+        indexes: np.ndarray
+            The indexes of the rows to copy.
+        path: str
+            The path of the new file.
+        """
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=array.dtype, shape=(len(indexes),) + array.shape[1:])
+        for start, stop in self._chunks(len(indexes)):
+            out[start:stop] = array[indexes[start:stop]]
+        out.flush()
+        del out
+
+    def _select_rows(self, mask: np.ndarray) -> None:
+        """
+        Keep only the molecules marked in a boolean mask (along the first axis), rewriting the arrays on disk in chunks.
+
+        Parameters
+        ----------
+        mask: np.ndarray
+            Boolean mask with the same length as the dataset. True marks the molecules to keep.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        n_removed = int(len(mask) - np.count_nonzero(mask))
+        if n_removed == 0:
+            return
+        removed_smiles = self._smiles[np.flatnonzero(~mask)[:10]]
+        preview = ', '.join(str(smi) for smi in removed_smiles)
+        if n_removed > 10:
+            preview += ', ...'
+        self.logger.warning(f"{n_removed} molecules removed from dataset: {preview}")
+        indexes = np.flatnonzero(mask)
+        for name in ('smiles', 'ids', 'X', 'y'):
+            array = self._open_array(name)
+            if array is not None:
+                tmp_path = self._array_path(f'{name}.tmp')
+                self._copy_rows(array, indexes, tmp_path)
+                self._replace_array(name, tmp_path)
+
+    def _select_columns(self, columns: np.ndarray) -> None:
+        """
+        Keep only some columns of the features, rewriting them on disk in chunks.
+
+        Parameters
+        ----------
+        columns: np.ndarray
+            The indexes of the columns to keep (in order).
+        """
+        X = self._open_array('X')
+        columns = np.asarray(columns, dtype=int)
+        tmp_path = self._array_path('X.tmp')
+        out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=X.dtype,
+                                        shape=(X.shape[0], len(columns)) + X.shape[2:])
+        for start, stop in self._chunks():
+            out[start:stop] = X[start:stop][:, columns]
+        out.flush()
+        del out
+        self._replace_array('X', tmp_path)
+        if len(X.shape) <= 2:  # feature names in datasets with more than two dimensions not supported
+            self._feature_names = self._feature_names[columns]
+        self._save_metadata()
+
+    def select(self, ids: Union[List[str], List[int]], axis: int = 0) -> None:
+        """
+        Keeps a selection of the molecules (axis = 0, by id) or of the features (axis = 1, by index).
+
+        Parameters
+        ----------
+        ids: Union[List[str], List[int]]
+          List of ids/indexes to select.IDs of the compounds in case axis = 0,
+          indexes of the columns in case axis = 1.
+        axis: int
+            Axis to select along. 0 selects along the first axis, 1 selects along the second axis.
+        """
+        if axis == 0:
+            self._select_rows(self._ids_to_mask(ids))
+        elif axis == 1:
+            if self._X is None or len(self._X.shape) == 0:
+                raise ValueError('Dataset has no features.')
+            if len(self._X.shape) > 1:
+                self._select_columns(np.sort(np.unique(np.asarray(ids, dtype=int))))
+        else:
+            raise ValueError('The axis must be 0 or 1.')
+
+    def remove_nan(self, axis: int = 0) -> None:
+        """
+        Remove samples with at least one NaN in the features (when axis = 0)
+        Or remove samples with all features with NaNs and the features with at least one NaN (axis = 1)
+        The features are scanned in chunks.
+
+        Parameters
+        ----------
+        axis: int
+            The axis to remove the NaNs from.
+        """
+        X = self._X
+        if X is None or len(X.shape) == 0:
+            return
+        if axis not in (0, 1):
+            raise ValueError('The axis must be 0 or 1.')
+        if not np.issubdtype(X.dtype, np.floating):
+            return
+        rows_mask = np.ones(len(X), dtype=bool)
+        for start, stop in self._chunks():
+            chunk_nan = np.isnan(X[start:stop])
+            if axis == 0 or len(X.shape) == 1:
+                rows_mask[start:stop] = ~chunk_nan.reshape(stop - start, -1).any(axis=1)
+            else:
+                rows_mask[start:stop] = ~chunk_nan.all(axis=1).reshape(stop - start, -1).any(axis=1)
+        self._select_rows(rows_mask)
+        if axis == 1 and len(self._X.shape) > 1:
+            X = self._X
+            nan_columns = np.zeros(X.shape[1:], dtype=bool)
+            for start, stop in self._chunks():
+                nan_columns |= np.isnan(X[start:stop]).any(axis=0)
+            nan_columns = nan_columns.reshape(X.shape[1], -1).any(axis=1)
+            if nan_columns.any():
+                self._select_columns(np.flatnonzero(~nan_columns))
+
+    def select_to_split(self, indexes: Union[np.ndarray, List[int]], data_dir: str = None) -> 'DiskDataset':
+        """
+        Copies the elements with specific indexes to a new dataset stored on disk.
+
+        Parameters
+        ----------
+        indexes: Union[np.ndarray, List[int]]
+            The indexes of the elements to split the dataset.
+        data_dir: str
+            Directory of the new dataset. By default, a new temporary directory.
+
+        Returns
+        -------
+        DiskDataset
+            The dataset with the selected elements.
+        """
+        data_dir = data_dir if data_dir is not None else tempfile.mkdtemp()
+        split = DiskDataset.__new__(DiskDataset)
+        split._init_storage(data_dir, self.chunk_size)
+        indexes = np.asarray(indexes, dtype=int)
+        for name in ('smiles', 'ids', 'X', 'y'):
+            array = self._open_array(name)
+            if array is not None:
+                self._copy_rows(array, indexes, split._array_path(name))
+        split._feature_names = self._feature_names
+        split._label_names = self._label_names
+        split._n_tasks = self._n_tasks
+        split._mode = self._mode
+        split._save_metadata()
+        return split
+
+    def merge(self, datasets: List[Dataset], data_dir: str = None) -> 'DiskDataset':
+        """
+        Merges provided datasets with the self dataset into a new dataset stored on disk.
+        The arrays are copied one chunk at a time.
+
+        Parameters
+        ----------
+        datasets: List[Dataset]
+            List of datasets to merge.
+        data_dir: str
+            Directory of the new dataset. By default, a new temporary directory.
+
+        Returns
+        -------
+        DiskDataset
+            The merged dataset.
+        """
+        datasets = [self] + list(datasets)
+        ids = np.concatenate([np.asarray(ds.ids) for ds in datasets])
+        if len(np.unique(ids)) != len(ids):
+            raise ValueError('IDs must be unique!')
+        data_dir = data_dir if data_dir is not None else tempfile.mkdtemp()
+        merged = DiskDataset.__new__(DiskDataset)
+        merged._init_storage(data_dir, self.chunk_size)
+        merged._ids = ids
+        del ids
+        merged._smiles = np.concatenate([np.asarray(ds.smiles, dtype=str) for ds in datasets])
+        n_rows = [len(ds) for ds in datasets]
+
+        X_arrays = [ds.X for ds in datasets]
+        if any(X is None for X in X_arrays) or len({X.shape[1:] for X in X_arrays}) != 1:
+            self.logger.error('Features are not the same length/type... Recalculate features for all inputs!')
+        else:
+            self._concatenate_to(merged, 'X', X_arrays)
+
+        y_arrays = [ds.y for ds in datasets]
+        if any(y is not None for y in y_arrays):
+            y_arrays = [y if y is not None else np.full(n, np.nan) for y, n in zip(y_arrays, n_rows)]
+            self._concatenate_to(merged, 'y', y_arrays)
+
+        merged._feature_names = self._feature_names if merged._X is not None else None
+        merged._label_names = self._label_names
+        merged._n_tasks = self._n_tasks
+        merged._mode = self._mode
+        merged._save_metadata()
+        return merged
+
+    def _concatenate_to(self, dataset: 'DiskDataset', name: str, arrays: List[np.ndarray]) -> None:
+        """
+        Concatenates arrays into a new array of another DiskDataset, one chunk at a time.
+
+        Parameters
+        ----------
+        dataset: DiskDataset
+            The dataset where the array is written.
+        name: str
+            The name of the array.
+        arrays: List[np.ndarray]
+            The arrays to concatenate.
+        """
+        shape = (sum(len(array) for array in arrays),) + arrays[0].shape[1:]
+        out = dataset.allocate_array(name, shape, dtype=np.result_type(*arrays))
+        position = 0
+        for array in arrays:
+            for start, stop in self._chunks(len(array)):
+                out[position + start:position + stop] = array[start:stop]
+            position += len(array)
+        out.flush()
+
+    def save_features(self, path: str = 'features.csv') -> None:
+        """
+        Save the features to a csv file, one chunk at a time.
+        Parameters
+        ----------
+        path: str
+            Path to save the csv file.
+        """
+        X = self._X
+        if X is None:
+            raise ValueError('Features array is empty!')
+        for start, stop in self._chunks():
+            df = pd.DataFrame(X[start:stop], columns=self._feature_names)
+            df.to_csv(path, index=False, mode='w' if start == 0 else 'a', header=start == 0)
@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from typing import Union, Iterable, List
 
 import numpy as np
+import scipy.sparse as sp
 from boruta import BorutaPy
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.feature_selection import VarianceThreshold, chi2, SelectKBest, SelectPercentile, RFECV, SelectFromModel
@@ -9,6 +10,25 @@ from sklearn.feature_selection import VarianceThreshold, chi2, SelectKBest, Sele
 from deepmol.datasets import Dataset
 
 
+def _get_features(dataset: Dataset) -> Union[np.ndarray, sp.spmatrix]:
+    """
+    Get the features of a dataset as a two dimensional array. Sparse features are kept sparse.
+
+    Parameters
+    ----------
+    dataset: Dataset
+        The dataset.
+
+    Returns
+    -------
+    Union[np.ndarray, sp.spmatrix]
+        The features of the dataset.
+    """
+    if sp.issparse(dataset.X):
+        return dataset.X
+    return np.stack(dataset.X, axis=0)
+
+
 class BaseFeatureSelector(ABC):
     """
     Abstract class for feature selection.
@@ -92,7 +112,7 @@ class LowVarianceFS(BaseFeatureSelector):
         features_to_keep: np.ndarray
             Array containing the indexes of the features to keep.
         """
-        fs = np.stack(dataset.X, axis=0)
+        fs = _get_features(dataset)
         vt = VarianceThreshold(threshold=self.param)
         vt.fit_transform(fs)
         return vt.get_support(indices=True)
@@ -135,7 +155,7 @@ class KbestFS(BaseFeatureSelector):
         features_to_keep: np.ndarray
             Array containing the indexes of the features to keep.
         """
-        fs = np.stack(dataset.X, axis=0)
+        fs = _get_features(dataset)
         y = dataset.y
         kb = SelectKBest(self.score_func, k=self.k)
         kb.fit_transform(fs, y)
@@ -179,7 +199,7 @@ class PercentilFS(BaseFeatureSelector):
         features_to_keep: np.ndarray
             Array containing the indexes of the features to keep.
         """
-        fs = np.stack(dataset.X, axis=0)
+        fs = _get_features(dataset)
         y = dataset.y
         sp = SelectPercentile(self.score_func, percentile=self.percentil)
         sp.fit_transform(fs, y)
@@ -258,7 +278,7 @@ class RFECVFS(BaseFeatureSelector):
         features_to_keep: np.ndarray
             Array containing the indexes of the features to keep.
         """
-        fs = np.stack(dataset.X, axis=0)
+        fs = _get_features(dataset)
         y = dataset.y
         rfe = RFECV(self.estimator,
                     step=self.step,
@@ -334,7 +354,7 @@ class SelectFromModelFS(BaseFeatureSelector):
         features_to_keep: np.ndarray
             Array containing the indexes of the features to keep.
         """
-        fs = np.stack(dataset.X, axis=0)
+        fs = _get_features(dataset)
         y = dataset.y
         sfm = SelectFromModel(self.estimator,
                               threshold=self.threshold,
@@ -444,7 +464,10 @@ class BorutaAlgorithm(BaseFeatureSelector):
         features_to_keep: np.ndarray
             Array containing the indexes of the features to keep.
         """
-        fs = np.stack(dataset.X, axis=0)
+        fs = _get_features(dataset)
+        if sp.issparse(fs):
+            # BorutaPy only works with dense arrays
+            fs = fs.toarray()
         y = dataset.y
         self.boruta.fit(fs, y)
         self.boruta.transform(fs, weak=self.support_weak)
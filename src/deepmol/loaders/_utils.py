@@ -1,6 +1,13 @@
+import gzip
+import io
+import os
+from typing import Iterator, List, Tuple, Dict, Union
+
 import numpy as np
 import pandas as pd
-from rdkit.Chem import SDMolSupplier
+from rdkit.Chem import SDMolSupplier, ForwardSDMolSupplier, Mol
+
+from deepmol.parallelism.multiprocessing import JoblibMultiprocessing
 
 
 def load_csv_file(input_file: str,
@@ -29,34 +36,388 @@ def load_csv_file(input_file: str,
     if chunk_size is None:
         return pd.read_csv(input_file, **kwargs)[fields]
     else:
-        df = pd.read_csv(input_file)
+        df = pd.read_csv(input_file, usecols=fields)
         df = df.replace(np.nan, str(""), regex=True)
         return df[fields].sample(chunk_size)
 
 
-def load_sdf_file(input_file: str, shard_size: int = None) -> np.ndarray:
+def iter_csv_file(input_file: str,
+                  fields: list,
+                  chunk_size: int,
+                  **kwargs) -> Iterator[pd.DataFrame]:
     """
-    Load data as pandas dataframe from SDF files.
+    Reads a CSV file in consecutive chunks of rows, so the whole file is never held in memory.
+    Only the columns in fields are parsed.
+
+    Parameters
+    ----------
+    input_file: str
+        data path
+    fields: list
+        fields to keep
+    chunk_size: int
+        The number of rows of each chunk.
+    kwargs:
+        Keyword arguments to pass to pandas.read_csv.
+
+    Returns
+    -------
+    Iterator[pd.DataFrame]
+        Iterator over the dataframes of each chunk.
+    """
+    with pd.read_csv(input_file, usecols=fields, chunksize=chunk_size, **kwargs) as reader:
+        for chunk in reader:
+            yield chunk[fields]
+
+
+def sdf_chunk_offsets(input_file: str, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """
+    Splits a SDF file into byte ranges of approximately chunk_bytes that end on record boundaries ($$$$ lines).
+
+    Parameters
+    ----------
+    input_file: str
+        data path
+    chunk_bytes: int
+        The approximate number of bytes of each chunk.
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        The (start, end) byte offsets of each chunk.
+    """
+    file_size = os.path.getsize(input_file)
+    offsets = []
+    start = 0
+    with open(input_file, 'rb') as f:
+        while start < file_size:
+            f.seek(min(start + chunk_bytes, file_size))
+            if f.tell() < file_size:
+                # skip the (partial) line where the seek landed and look for the end of the record
+                f.readline()
+                line = f.readline()
+                while line and line.rstrip() != b'$$$$':
+                    line = f.readline()
+            end = f.tell()
+            offsets.append((start, end))
+            start = end
+    return offsets
+
+
+def _read_sdf_supplier(supplier: Union[SDMolSupplier, ForwardSDMolSupplier],
+                       fields: List[str]) -> Tuple[List[Mol], Dict[str, List[Union[str, None]]]]:
+    """
+    Reads the molecules of a SDF supplier and their properties. Records that can not be parsed are skipped.
+
+    Parameters
+    ----------
+    supplier: Union[SDMolSupplier, ForwardSDMolSupplier]
+        The supplier of the molecules.
+    fields: List[str]
+        The properties to extract.
+
+    Returns
+    -------
+    mols: List[Mol]
+        The molecules.
+    properties: Dict[str, List[Union[str, None]]]
+        The values of each property for each molecule (None if the molecule does not have the property).
+    """
+    mols = []
+    properties = {field: [] for field in fields}
+    for mol in supplier:
+        if mol is None:
+            continue
+        mols.append(mol)
+        for field in fields:
+            properties[field].append(mol.GetProp(field) if mol.HasProp(field) else None)
+    return mols, properties
+
+
+def _read_sdf_chunk(input_file: str, start: int, end: int,
+                    fields: List[str]) -> Tuple[List[Mol], Dict[str, List[Union[str, None]]]]:
+    """
+    Reads the molecules of a byte range of a SDF file and their properties.
+
+    Parameters
+    ----------
+    input_file: str
+        data path
+    start: int
+        The offset of the first byte of the range.
+    end: int
+        The offset after the last byte of the range.
+    fields: List[str]
+        The properties to extract.
+
+    Returns
+    -------
+    mols: List[Mol]
+        The molecules.
+    properties: Dict[str, List[Union[str, None]]]
+        The values of each property for each molecule.
+    """
+    with open(input_file, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start).decode('utf-8', errors='replace')
+    supplier = SDMolSupplier()
+    supplier.SetData(data)
+    return _read_sdf_supplier(supplier, fields)
+
+
+def read_sdf_file(input_file: str,
+                  fields: List[str] = None,
+                  n_jobs: int = 1,
+                  chunk_bytes: int = 64 * 1024 * 1024) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Reads the molecules of a SDF file and their properties as columns.
+    Plain SDF files are split into chunks of records by byte offset that are parsed in parallel. Gzipped SDF files
+    (.gz) can not be split and are streamed with a ForwardSDMolSupplier.
+
+    Parameters
+    ----------
+    input_file: str
+        data path
+    fields: List[str]
+        The properties to extract.
+    n_jobs: int
+        The number of jobs used to parse the chunks. If -1, all available cores are used.
+    chunk_bytes: int
+        The approximate number of bytes of each chunk.
+
+    Returns
+    -------
+    mols: np.ndarray
+        The molecules.
+    properties: Dict[str, np.ndarray]
+        The values of each property for each molecule (None if the molecule does not have the property).
+    """
+    fields = list(fields) if fields is not None else []
+    if input_file.endswith('.gz'):
+        with gzip.open(input_file) as f:
+            results = [_read_sdf_supplier(ForwardSDMolSupplier(f), fields)]
+    else:
+        offsets = sdf_chunk_offsets(input_file, chunk_bytes)
+        if len(offsets) <= 1 or n_jobs == 1:
+            results = [_read_sdf_chunk(input_file, start, end, fields) for start, end in offsets]
+        else:
+            multiprocessing_cls = JoblibMultiprocessing(process=_read_sdf_chunk, n_jobs=n_jobs)
+            results = list(multiprocessing_cls.run([(input_file, start, end, fields) for start, end in offsets]))
+    mols = np.empty(sum(len(chunk_mols) for chunk_mols, _ in results), dtype=object)
+    mols[:] = [mol for chunk_mols, _ in results for mol in chunk_mols]
+    properties = {field: np.array([value for _, chunk_properties in results for value in chunk_properties[field]],
+                                  dtype=object)
+                  for field in fields}
+    return mols, properties
+
+
+def _offset_index_path(input_file: str) -> str:
+    """
+    Get the path of the sidecar file with the byte offset index of a file.
+
+    Parameters
+    ----------
+    input_file: str
+        data path
+
+    Returns
+    -------
+    str
+        The path of the index file.
+    """
+    return f'{input_file}.offsets.npz'
+
+
+def _scan_sdf_offsets(input_file: str) -> np.ndarray:
+    """
+    Finds the byte offsets of the records of a SDF file.
 
     Parameters
     ----------
     input_file: str
         data path
-    shard_size: int
-        The chunk size to yield at one time.
 
     Returns
     -------
     np.ndarray
-        Array of 'chunk size' size with the molecules.
-    """
-    supplier = SDMolSupplier(input_file)
-    mols, attempts = [], 0
-
-    while not mols and attempts < 10:
-        mols = list(supplier)
-        attempts += 1
-    # sample from list
-    if shard_size is None:
-        return np.array(mols)
-    return np.random.choice(mols, shard_size)
+        The offset of the start of each record followed by the offset of the end of the last record.
+    """
+    offsets = [0]
+    position = 0
+    with open(input_file, 'rb') as f:
+        for line in f:
+            position += len(line)
+            if line.rstrip() == b'$$$$':
+                offsets.append(position)
+    return np.array(offsets, dtype=np.int64)
+
+
+def _scan_csv_offsets(input_file: str, block_size: int = 16 * 1024 * 1024) -> np.ndarray:
+    """
+    Finds the byte offsets of the rows of a CSV file (one row per line, after the header line).
+
+    Parameters
+    ----------
+    input_file: str
+        data path
+    block_size: int
+        The number of bytes read at a time.
+
+    Returns
+    -------
+    np.ndarray
+        The offset of the start of each row followed by the offset of the end of the last row.
+    """
+    line_starts = [np.zeros(1, dtype=np.int64)]
+    position = 0
+    with open(input_file, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            line_starts.append(np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord('\n')) + position + 1)
+            position += len(block)
+    line_starts = np.concatenate(line_starts)
+    if line_starts[-1] != position:
+        # the last line does not end with a new line
+        line_starts = np.append(line_starts, position)
+    # drop the header line and the empty lines
+    starts, ends = line_starts[1:-1], line_starts[2:]
+    rows = ends - starts > 1
+    return np.append(starts[rows], ends[rows][-1] if rows.any() else position)
+
+
+def load_offset_index(input_file: str, file_format: str) -> np.ndarray:
+    """
+    Get the byte offset index of the records of a SDF file or the rows of a CSV file.
+    The index is built with a single scan of the file and persisted next to it (<input_file>.offsets.npz), so
+    following calls only read the index. The index is rebuilt if the file changed (size or modification time).
+
+    Parameters
+    ----------
+    input_file: str
+        data path
+    file_format: str
+        The format of the file ('sdf' or 'csv').
+
+    Returns
+    -------
+    np.ndarray
+        The offset of the start of each record followed by the offset of the end of the last record. Record i is
+        stored in the bytes offsets[i]:offsets[i + 1].
+    """
+    if file_format not in ('sdf', 'csv'):
+        raise ValueError("The file format must be 'sdf' or 'csv'.")
+    if input_file.endswith('.gz'):
+        raise ValueError('Compressed files can not be indexed.')
+    stat = os.stat(input_file)
+    index_path = _offset_index_path(input_file)
+    if os.path.exists(index_path):
+        with np.load(index_path) as index:
+            if index['size'] == stat.st_size and index['mtime'] == stat.st_mtime_ns:
+                return index['offsets']
+    offsets = _scan_sdf_offsets(input_file) if file_format == 'sdf' else _scan_csv_offsets(input_file)
+    try:
+        np.savez(index_path, offsets=offsets, size=stat.st_size, mtime=stat.st_mtime_ns)
+    except OSError:
+        # the index can not be persisted (e.g. read-only directory), it is used only in memory
+        pass
+    return offsets
+
+
+def _read_records(input_file: str, offsets: np.ndarray, indexes: np.ndarray) -> bytes:
+    """
+    Reads the bytes of a selection of records using their byte offsets. Consecutive records are read at once.
+
+    Parameters
+    ----------
+    input_file: str
+        data path
+    offsets: np.ndarray
+        The byte offset index of the file.
+    indexes: np.ndarray
+        The sorted indexes of the records to read.
+
+    Returns
+    -------
+    bytes
+        The concatenated bytes of the records.
+    """
+    if len(indexes) == 0:
+        return b''
+    # split the selection into runs of consecutive records
+    breaks = np.flatnonzero(np.diff(indexes) != 1) + 1
+    runs_start = indexes[np.concatenate([[0], breaks])]
+    runs_stop = indexes[np.concatenate([breaks - 1, [len(indexes) - 1]])] + 1
+    data = []
+    with open(input_file, 'rb') as f:
+        for start, stop in zip(runs_start, runs_stop):
+            f.seek(offsets[start])
+            data.append(f.read(offsets[stop] - offsets[start]))
+    return b''.join(data)
+
+
+def read_sdf_records(input_file: str,
+                     offsets: np.ndarray,
+                     indexes: np.ndarray,
+                     fields: List[str] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Reads a selection of records of a SDF file and their properties, seeking to each record with the offset index.
+
+    Parameters
+    ----------
+    input_file: str
+        data path
+    offsets: np.ndarray
+        The byte offset index of the file (see load_offset_index).
+    indexes: np.ndarray
+        The indexes of the records to read. They are read in file order.
+    fields: List[str]
+        The properties to extract.
+
+    Returns
+    -------
+    mols: np.ndarray
+        The molecules.
+    properties: Dict[str, np.ndarray]
+        The values of each property for each molecule (None if the molecule does not have the property).
+    """
+    fields = list(fields) if fields is not None else []
+    supplier = SDMolSupplier()
+    supplier.SetData(_read_records(input_file, offsets, np.sort(indexes)).decode('utf-8', errors='replace'))
+    mols, properties = _read_sdf_supplier(supplier, fields)
+    mols_array = np.empty(len(mols), dtype=object)
+    mols_array[:] = mols
+    return mols_array, {field: np.array(values, dtype=object) for field, values in properties.items()}
+
+
+def read_csv_rows(input_file: str,
+                  offsets: np.ndarray,
+                  indexes: np.ndarray,
+                  fields: List[str],
+                  **kwargs) -> pd.DataFrame:
+    """
+    Reads a selection of rows of a CSV file, seeking to each row with the offset index.
+
+    Parameters
+    ----------
+    input_file: str
+        data path
+    offsets: np.ndarray
+        The byte offset index of the file (see load_offset_index).
+    indexes: np.ndarray
+        The indexes of the rows to read. They are read in file order.
+    fields: List[str]
+        fields to keep
+    kwargs:
+        Keyword arguments to pass to pandas.read_csv.
+
+    Returns
+    -------
+    pd.DataFrame
+        Dataframe with the selected rows.
+    """
+    with open(input_file, 'rb') as f:
+        header = f.read(offsets[0])
+    data = header + _read_records(input_file, offsets, np.sort(indexes))
+    return pd.read_csv(io.BytesIO(data), usecols=fields, **kwargs)[fields]
@@ -2,13 +2,14 @@
 Classes for processing input data into a format suitable for machine learning.
 """
 
-from typing import Optional, List
+from typing import Optional, List, Iterator, Tuple, Dict
 
 from deepmol.datasets import SmilesDataset
 import numpy as np
 import pandas as pd
 
-from deepmol.loaders._utils import load_csv_file, load_sdf_file
+from deepmol.loaders._utils import load_csv_file, iter_csv_file, read_sdf_file, load_offset_index, read_sdf_records, \
+    read_csv_rows
 
 
 class CSVLoader(object):
@@ -24,7 +25,9 @@ class CSVLoader(object):
                  labels_fields: List[str] = None,
                  features_fields: List[str] = None,
                  shard_size: int = None,
-                 mode: str = 'auto') -> None:
+                 mode: str = 'auto',
+                 lazy_mols: bool = False,
+                 use_index: bool = False) -> None:
         """
         Initialize the CSVLoader.
 
@@ -46,6 +49,11 @@ class CSVLoader(object):
             The mode of the dataset.
             If 'auto', the mode is inferred from the labels. If 'classification', the dataset is treated as a
             classification dataset. If 'regression', the dataset is treated as a regression dataset.
+        lazy_mols: bool
+            If True, the RDKit Mol objects of the created datasets are only parsed from the SMILES when accessed.
+        use_index: bool
+            If True, the shard of shard_size rows is sampled (without replacement) with a byte offset index of the
+            file (see load_range), so only the sampled rows are parsed.
         """
         self.dataset_path = dataset_path
         self.mols_field = smiles_field
@@ -66,6 +74,8 @@ class CSVLoader(object):
 
         self.fields2keep = fields2keep
         self.mode = mode
+        self.lazy_mols = lazy_mols
+        self.use_index = use_index
 
     @staticmethod
     def _get_dataset(dataset_path: str,
@@ -107,8 +117,75 @@ class CSVLoader(object):
         SmilesDataset
             Dataset with the data.
         """
-        dataset = self._get_dataset(self.dataset_path, fields=self.fields2keep, chunk_size=self.shard_size, **kwargs)
+        if self.shard_size is not None and self.use_index:
+            offsets = load_offset_index(self.dataset_path, 'csv')
+            n_rows = len(offsets) - 1
+            rows = np.random.choice(n_rows, min(self.shard_size, n_rows), replace=False)
+            dataset = read_csv_rows(self.dataset_path, offsets, rows, self.fields2keep, **kwargs)
+        else:
+            dataset = self._get_dataset(self.dataset_path, fields=self.fields2keep, chunk_size=self.shard_size,
+                                        **kwargs)
+        return self._dataframe_to_dataset(dataset)
+
+    def load_range(self, start: int, stop: int, **kwargs) -> SmilesDataset:
+        """
+        Creates a dataset from a range of rows of the CSV file.
+        The rows are read by seeking to their byte offsets, stored in an index next to the file (<file>.offsets.npz)
+        that is built with a single scan of the file the first time it is needed.
+
+        Parameters
+        ----------
+        start: int
+            The index of the first row (starting at 0, the header is not counted).
+        stop: int
+            The index after the last row.
+        kwargs:
+            Keyword arguments to pass to pandas.read_csv.
+
+        Returns
+        -------
+        SmilesDataset
+            Dataset with the rows in the range.
+        """
+        offsets = load_offset_index(self.dataset_path, 'csv')
+        rows = np.arange(start, min(stop, len(offsets) - 1))
+        return self._dataframe_to_dataset(read_csv_rows(self.dataset_path, offsets, rows, self.fields2keep, **kwargs))
+
+    def iter_datasets(self, chunk_size: int = 100000, **kwargs) -> Iterator[SmilesDataset]:
+        """
+        Iterates over the CSV file in consecutive shards of rows.
+        The file is read with pandas in chunks and only the fields to keep are parsed, so files that do not fit in
+        memory can be processed (e.g. standardized, featurized and predicted) one shard at a time.
+
+        Parameters
+        ----------
+        chunk_size: int
+            The number of rows of each shard.
+        kwargs:
+            Keyword arguments to pass to pandas.read_csv.
+
+        Returns
+        -------
+        Iterator[SmilesDataset]
+            Iterator over the datasets of each shard.
+        """
+        for chunk in iter_csv_file(self.dataset_path, self.fields2keep, chunk_size, **kwargs):
+            yield self._dataframe_to_dataset(chunk)
+
+    def _dataframe_to_dataset(self, dataset: pd.DataFrame) -> SmilesDataset:
+        """
+        Creates a dataset from a dataframe with the fields to keep.
 
+        Parameters
+        ----------
+        dataset: pd.DataFrame
+            Dataframe with the data.
+
+        Returns
+        -------
+        SmilesDataset
+            Dataset with the data.
+        """
         mols = dataset[self.mols_field].to_numpy()
 
         if self.features_fields is not None:
@@ -138,7 +215,8 @@ class CSVLoader(object):
                              ids=ids,
                              feature_names=self.features_fields,
                              label_names=self.labels_fields,
-                             mode=self.mode)
+                             mode=self.mode,
+                             lazy_mols=self.lazy_mols)
 
 
 class SDFLoader(object):
@@ -152,7 +230,9 @@ class SDFLoader(object):
                  labels_fields: List[str] = None,
                  features_fields: List[str] = None,
                  shard_size: Optional[int] = None,
-                 mode: str = 'auto') -> None:
+                 mode: str = 'auto',
+                 n_jobs: int = -1,
+                 use_index: bool = False) -> None:
         """
         Initialize the SDFLoader.
 
@@ -172,6 +252,12 @@ class SDFLoader(object):
             The mode of the dataset.
             If 'auto', the mode is inferred from the labels. If 'classification', the dataset is treated as a
             classification dataset. If 'regression', the dataset is treated as a regression dataset.
+        n_jobs: int
+            The number of jobs used to parse the file. If -1, all available cores are used. Gzipped files (.gz) are
+            always parsed by a single process.
+        use_index: bool
+            If True, the shard of shard_size molecules is sampled with a byte offset index of the file (see
+            load_range), so only the sampled records are parsed.
         """
         self.dataset_path = dataset_path
         self.id_field = id_field
@@ -192,24 +278,32 @@ class SDFLoader(object):
 
         self.fields2keep = fields2keep
         self.mode = mode
+        self.n_jobs = n_jobs
+        self.use_index = use_index
 
     @staticmethod
-    def _get_dataset(dataset_path: str, chunk_size: int = None) -> np.ndarray:
+    def _get_dataset(dataset_path: str,
+                     fields: List[str] = None,
+                     n_jobs: int = -1) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
         """
-        Loads data from path.
+        Loads the molecules and their properties from path.
 
         Parameters
         ----------
         dataset_path: str
             Filename to process
-        chunk_size: int
-            size of the shard to load
+        fields: List[str]
+            properties to extract
+        n_jobs: int
+            number of jobs used to parse the file
         Returns
         -------
-        pd.DataFrame
-            Dataframe
+        mols: np.ndarray
+            The molecules.
+        properties: Dict[str, np.ndarray]
+            The values of each property for each molecule.
         """
-        return load_sdf_file(dataset_path, chunk_size)
+        return read_sdf_file(dataset_path, fields, n_jobs=n_jobs)
 
     def create_dataset(self) -> SmilesDataset:
         """
@@ -220,43 +314,74 @@ class SDFLoader(object):
         SmilesDataset
             Dataset with the data.
         """
-        molecules = self._get_dataset(self.dataset_path, self.shard_size)
-        X = []
-        y = []
-        ids = []
-        mols = []
-        for mol in molecules:
-            mols.append(mol)
-            mol_feature = []
-            mol_ys = []
-            if self.features_fields is not None:
-                for feature in self.features_fields:
-                    mol_feature.append(mol.GetProp(feature))
-                if len(mol_feature) == 1:
-                    mol_feature = mol_feature[0]
-                X.append(mol_feature)
-
-            if self.labels_fields is not None:
-                for label in self.labels_fields:
-                    mol_ys.append(float(mol.GetProp(label)))
-                if len(mol_ys) == 1:
-                    mol_ys = mol_ys[0]
-                y.append(mol_ys)
-            else:
-                mol_y = None
-                y.append(mol_y)
+        if self.shard_size is not None and self.use_index:
+            offsets = load_offset_index(self.dataset_path, 'sdf')
+            n_records = len(offsets) - 1
+            records = np.random.choice(n_records, min(self.shard_size, n_records), replace=False)
+            mols, properties = read_sdf_records(self.dataset_path, offsets, records, self.fields2keep)
+        else:
+            mols, properties = self._get_dataset(self.dataset_path, self.fields2keep, n_jobs=self.n_jobs)
+            if self.shard_size is not None:
+                # sample from the molecules
+                selection = np.random.choice(len(mols), min(self.shard_size, len(mols)), replace=False)
+                mols = mols[selection]
+                properties = {field: values[selection] for field, values in properties.items()}
+        return self._to_dataset(mols, properties)
+
+    def load_range(self, start: int, stop: int) -> SmilesDataset:
+        """
+        Creates a dataset from a range of records of the SDF file.
+        The records are read by seeking to their byte offsets, stored in an index next to the file
+        (<file>.offsets.npz) that is built with a single scan of the file the first time it is needed.
 
-            if self.id_field is not None:
-                mol_id = mol.GetProp(self.id_field)
-                ids.append(mol_id)
-            else:
-                mol_id = None
-                ids.append(mol_id)
+        Parameters
+        ----------
+        start: int
+            The index of the first record (starting at 0).
+        stop: int
+            The index after the last record.
+
+        Returns
+        -------
+        SmilesDataset
+            Dataset with the molecules in the range.
+        """
+        offsets = load_offset_index(self.dataset_path, 'sdf')
+        records = np.arange(start, min(stop, len(offsets) - 1))
+        return self._to_dataset(*read_sdf_records(self.dataset_path, offsets, records, self.fields2keep))
+
+    def _to_dataset(self, mols: np.ndarray, properties: Dict[str, np.ndarray]) -> SmilesDataset:
+        """
+        Creates a dataset from the molecules and their properties.
+
+        Parameters
+        ----------
+        mols: np.ndarray
+            The molecules.
+        properties: Dict[str, np.ndarray]
+            The values of each property for each molecule.
+
+        Returns
+        -------
+        SmilesDataset
+            Dataset with the data.
+        """
+        if self.features_fields is not None:
+            X = np.array([properties[feature] for feature in self.features_fields]).T.astype(str)
+            if len(self.features_fields) == 1:
+                X = X[:, 0]
+        else:
+            X = None
+
+        if self.labels_fields is not None:
+            y = np.array([properties[label] for label in self.labels_fields], dtype=float).T
+            if len(self.labels_fields) == 1:
+                y = y[:, 0]
+        else:
+            y = None
 
-        X = np.array(X) if X is not None and len(X) != 0 else None
-        y = None if len(set(np.array(y).flatten())) == 1 and np.array(y).flatten()[0] is None else np.array(y)
-        ids = np.array(ids) if len(set(ids)) == len(ids) else None
-        mols = np.array(mols)
+        ids = properties[self.id_field] if self.id_field is not None else None
+        ids = ids.astype(str) if ids is not None and len(set(ids)) == len(ids) else None
         feature_names = self.features_fields
         return SmilesDataset.from_mols(mols=mols,
                                        X=X,
@@ -140,9 +140,8 @@ class DeepChemModel(BaseDeepChemModel):
         if isinstance(self.model, SeqToSeq):
             self.model.fit_sequences(generate_sequences(epochs=self.model.epochs, train_smiles=dataset.smiles))
         elif isinstance(self.model, WGAN):
-            pass
-            # TODO: Wait for the implementation of iterbactches
-            # self.model.fit_gan(dataset.iterbatches(5000))
+            batches = dataset.iterbatches(self.model.batch_size, epochs=self.epochs)
+            self.model.fit_gan({self.model.data_inputs[0]: X_batch} for X_batch, _, _, _ in batches)
         else:
             self.model.fit(new_dataset, nb_epoch=self.epochs)
 
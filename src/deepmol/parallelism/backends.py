@@ -0,0 +1,121 @@
+from typing import Dict, Type, Union
+
+from deepmol.parallelism.multiprocessing import MultiprocessingClass, JoblibMultiprocessing, ThreadMultiprocessing, \
+    LokyMultiprocessing, ExecutorMultiprocessing, DaskMultiprocessing, IsolatedMultiprocessing
+from deepmol.parallelism.progress import ProgressMonitor
+
+_BACKENDS: Dict[str, Type[MultiprocessingClass]] = {
+    'threads': ThreadMultiprocessing,
+    'loky': LokyMultiprocessing,
+    'multiprocessing': JoblibMultiprocessing,
+    'executor': ExecutorMultiprocessing,
+    'dask': DaskMultiprocessing,
+    'isolated': IsolatedMultiprocessing,
+}
+
+_default_backend = 'auto'
+
+
+def register_backend(name: str, multiprocessing_class: Type[MultiprocessingClass]) -> None:
+    """
+    Registers a parallel backend.
+
+    Parameters
+    ----------
+    name: str
+        The name of the backend.
+    multiprocessing_class: Type[MultiprocessingClass]
+        The multiprocessing class of the backend. It is built with the n_jobs, process, chunk_size and progress
+        arguments.
+    """
+    if name == 'auto':
+        raise ValueError("'auto' is reserved for the automatic choice of the backend.")
+    if not (isinstance(multiprocessing_class, type) and issubclass(multiprocessing_class, MultiprocessingClass)):
+        raise ValueError(f'{multiprocessing_class} is not a subclass of MultiprocessingClass.')
+    _BACKENDS[name] = multiprocessing_class
+
+
+def available_backends() -> list:
+    """
+    Get the names of the registered parallel backends.
+
+    Returns
+    -------
+    list
+        The names of the registered backends.
+    """
+    return list(_BACKENDS)
+
+
+def set_default_backend(name: str) -> None:
+    """
+    Sets the parallel backend used by featurizers and standardizers that do not select one.
+
+    Parameters
+    ----------
+    name: str
+        The name of a registered backend or 'auto' (threads for tasks that release the GIL, processes otherwise).
+    """
+    global _default_backend
+    if name != 'auto' and name not in _BACKENDS:
+        raise ValueError(f'Unknown backend {name}. Available backends: {["auto"] + available_backends()}')
+    _default_backend = name
+
+
+def get_default_backend() -> str:
+    """
+    Get the parallel backend used by featurizers and standardizers that do not select one.
+
+    Returns
+    -------
+    str
+        The name of the default backend.
+    """
+    return _default_backend
+
+
+def get_multiprocessing_class(backend: Union[str, MultiprocessingClass] = None,
+                              n_jobs: int = -1,
+                              process: callable = None,
+                              chunk_size: int = None,
+                              progress: ProgressMonitor = None,
+                              gil_bound: bool = True) -> MultiprocessingClass:
+    """
+    Builds the multiprocessing class of a parallel backend.
+
+    Parameters
+    ----------
+    backend: Union[str, MultiprocessingClass]
+        The name of a registered backend or 'auto'. If None, the default backend is used (see set_default_backend).
+        An already configured multiprocessing class (e.g. IsolatedMultiprocessing with a timeout) is used as it is,
+        with the given process and progress hook.
+    n_jobs: int
+        The number of jobs to use for multiprocessing. If -1, all available cores are used.
+    process: callable
+        The function to use for multiprocessing.
+    chunk_size: int
+        The number of consecutive items sent to a worker at a time. If None, the items are split in about four chunks
+        per worker.
+    progress: ProgressMonitor
+        Hook that reports the progress, throughput and time per item of the jobs.
+    gil_bound: bool
+        Whether the process holds the GIL while it runs. Used by the 'auto' backend: tasks that release the GIL run in
+        threads (no pickling), the others in persistent worker processes.
+
+    Returns
+    -------
+    MultiprocessingClass
+        The multiprocessing class.
+    """
+    if isinstance(backend, MultiprocessingClass):
+        if process is not None:
+            backend.process = process
+        if progress is not None:
+            backend.progress = progress
+        return backend
+    backend = backend or _default_backend
+    if backend == 'auto':
+        backend = 'multiprocessing' if gil_bound else 'threads'
+    if backend not in _BACKENDS:
+        raise ValueError(f'Unknown backend {backend}. Available backends: {["auto"] + available_backends()}')
+    return _BACKENDS[backend](n_jobs=n_jobs, process=process, chunk_size=chunk_size, progress=progress)
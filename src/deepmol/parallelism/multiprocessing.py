@@ -1,9 +1,249 @@
+import math
+import os
+import sys
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Iterable
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import Pipe, Pool, Process
+from multiprocessing.connection import Connection, wait
+from typing import Any, Iterable, Iterator, List, Sequence, Tuple, Union
 
-from joblib import Parallel, delayed
+import numpy as np
+from joblib import Parallel, delayed, cpu_count
+from joblib.externals.loky import ProcessPoolExecutor as LokyProcessPoolExecutor
 
 from deepmol.loggers.logger import Logger
+from deepmol.parallelism.progress import ProgressMonitor, describe_item
+
+try:
+    from distributed import Client
+except ImportError:
+    Client = None
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    # Python 3.7: the results of the persistent workers are pickled back instead of written in shared memory
+    resource_tracker = shared_memory = None
+
+# state of the persistent worker processes (see JoblibMultiprocessing.run_to_array)
+_worker_process = None
+_worker_memory = {}
+
+
+def _init_worker(process: callable) -> None:
+    """
+    Initializes a persistent worker process with the function to run, so it is only sent once to each worker.
+
+    Parameters
+    ----------
+    process: callable
+        The function to run on each item.
+    """
+    global _worker_process
+    _worker_process = process
+
+
+def _worker_name() -> str:
+    """
+    Get the name of the current worker (process id and thread name).
+
+    Returns
+    -------
+    str
+        The name of the worker.
+    """
+    return f'{os.getpid()}/{threading.current_thread().name}'
+
+
+def _run_chunk(process: callable, chunk: list) -> Tuple[list, np.ndarray, str]:
+    """
+    Runs a function on a chunk of items.
+
+    Parameters
+    ----------
+    process: callable
+        The function to run on each item. Tuple items are unpacked as the arguments of the function.
+    chunk: list
+        The items.
+
+    Returns
+    -------
+    results: list
+        The results of each item.
+    seconds: np.ndarray
+        The time spent on each item.
+    worker: str
+        The name of the worker.
+    """
+    results = []
+    seconds = np.zeros(len(chunk))
+    for i, item in enumerate(chunk):
+        start = time.perf_counter()
+        results.append(process(*item) if isinstance(item, tuple) else process(item))
+        seconds[i] = time.perf_counter() - start
+    return results, seconds, _worker_name()
+
+
+def _run_worker_chunk(chunk: list) -> Tuple[list, np.ndarray, str]:
+    """
+    Runs the function of a persistent worker on a chunk of items.
+
+    Parameters
+    ----------
+    chunk: list
+        The items.
+
+    Returns
+    -------
+    results: list
+        The results of each item.
+    seconds: np.ndarray
+        The time spent on each item.
+    worker: str
+        The name of the worker.
+    """
+    return _run_chunk(_worker_process, chunk)
+
+
+def _fill_rows(process: callable, output: np.ndarray, start: int, chunk: Sequence) \
+        -> Tuple[np.ndarray, np.ndarray, str]:
+    """
+    Runs a function on a chunk of items and writes the results in consecutive rows of an array.
+
+    Parameters
+    ----------
+    process: callable
+        The function to run on each item. It returns the row of the item or None if the item failed.
+    output: np.ndarray
+        The array where the rows are written.
+    start: int
+        The row of the first item of the chunk.
+    chunk: Sequence
+        The items.
+
+    Returns
+    -------
+    failed: np.ndarray
+        Boolean mask of the items that failed.
+    seconds: np.ndarray
+        The time spent on each item.
+    worker: str
+        The name of the worker.
+    """
+    failed = np.zeros(len(chunk), dtype=bool)
+    seconds = np.zeros(len(chunk))
+    for i, item in enumerate(chunk):
+        item_start = time.perf_counter()
+        row = process(item)
+        if row is None:
+            failed[i] = True
+        else:
+            output[start + i] = row
+        seconds[i] = time.perf_counter() - item_start
+    return failed, seconds, _worker_name()
+
+
+def _run_chunk_to_shared_memory(task: Tuple[str, tuple, np.dtype, int, list]) \
+        -> Tuple[int, np.ndarray, np.ndarray, str]:
+    """
+    Runs the function of a persistent worker on a chunk of items and writes the results in a shared memory array.
+
+    Parameters
+    ----------
+    task: Tuple[str, tuple, np.dtype, int, list]
+        The name of the shared memory block of the output array, the shape and dtype of the output array, the row of
+        the first item of the chunk and the items of the chunk.
+
+    Returns
+    -------
+    start: int
+        The row of the first item of the chunk.
+    failed: np.ndarray
+        Boolean mask of the items that failed.
+    seconds: np.ndarray
+        The time spent on each item.
+    worker: str
+        The name of the worker.
+    """
+    name, shape, dtype, start, chunk = task
+    if name not in _worker_memory:
+        # only the block of the current output stays attached
+        for memory in _worker_memory.values():
+            memory.close()
+        _worker_memory.clear()
+        _worker_memory[name] = shared_memory.SharedMemory(name=name)
+    output = np.ndarray(shape, dtype=dtype, buffer=_worker_memory[name].buf)
+    try:
+        return (start,) + _fill_rows(_worker_process, output, start, chunk)
+    finally:
+        del output
+
+
+def _memory_usage() -> float:
+    """
+    Get the resident memory of the current process.
+
+    Returns
+    -------
+    float
+        The resident memory in MB (the peak resident memory on systems without /proc).
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+        except ImportError:
+            return 0.0
+        # kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_isolated_worker(process: callable, connection: Connection, max_tasks: int, max_memory: float) -> None:
+    """
+    Main loop of the worker processes of IsolatedMultiprocessing.
+    The worker receives (offset, items) tasks and sends (index, result, seconds, error, retire) for each item. It exits
+    (retires) after max_tasks items or when its memory goes over max_memory MB, and when it receives None.
+
+    Parameters
+    ----------
+    process: callable
+        The function to run on each item.
+    connection: Connection
+        The connection to the parent process.
+    max_tasks: int
+        The number of items after which the worker retires. If None, the worker does not retire.
+    max_memory: float
+        The resident memory (in MB) above which the worker retires. If None, the memory is not checked.
+    """
+    n_tasks = 0
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        offset, chunk = task
+        for index, item in enumerate(chunk, offset):
+            start = time.perf_counter()
+            try:
+                result = process(*item) if isinstance(item, tuple) else process(item)
+                error = None
+            except Exception as e:
+                result = None
+                error = f'{e.__class__.__name__}: {e}'
+            n_tasks += 1
+            retire = (max_tasks is not None and n_tasks >= max_tasks) or \
+                     (max_memory is not None and _memory_usage() > max_memory)
+            connection.send((index, result, time.perf_counter() - start, error, retire))
+            if retire:
+                return
 
 
 class MultiprocessingClass(ABC):
@@ -11,7 +251,11 @@ class MultiprocessingClass(ABC):
     Base class for multiprocessing.
     """
 
-    def __init__(self, n_jobs: int = -1, process: callable = None):
+    def __init__(self,
+                 n_jobs: int = -1,
+                 process: callable = None,
+                 chunk_size: int = None,
+                 progress: ProgressMonitor = None):
         """
         Constructor for the MultiprocessingClass class.
 
@@ -21,9 +265,16 @@ class MultiprocessingClass(ABC):
             The number of jobs to use for multiprocessing. If -1, all available cores are used.
         process: callable
             The function to use for multiprocessing.
+        chunk_size: int
+            The number of consecutive items sent to a worker at a time. If None, the items are split in about four
+            chunks per worker.
+        progress: ProgressMonitor
+            Hook that reports the progress, throughput and time per item of the jobs.
         """
         self.n_jobs = n_jobs
         self._process = process
+        self.chunk_size = chunk_size
+        self.progress = progress
 
         self.logger = Logger()
 
@@ -34,6 +285,59 @@ class MultiprocessingClass(ABC):
         """
         return self._process
 
+    @process.setter
+    def process(self, process: callable) -> None:
+        """
+        Sets the function to use for multiprocessing. Workers holding the previous function are closed.
+
+        Parameters
+        ----------
+        process: callable
+            The function to use for multiprocessing.
+        """
+        if process != self._process:
+            self.close()
+        self._process = process
+
+    def __enter__(self) -> 'MultiprocessingClass':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Releases the resources (e.g. persistent worker processes) used for multiprocessing.
+        """
+
+    @property
+    def n_workers(self) -> int:
+        """
+        Returns the number of worker processes (n_jobs with negative values counted from the number of cores).
+        """
+        if self.n_jobs is None:
+            return 1
+        if self.n_jobs < 0:
+            return max(cpu_count() + 1 + self.n_jobs, 1)
+        return max(self.n_jobs, 1)
+
+    def _chunk_bounds(self, n_items: int) -> List[Tuple[int, int]]:
+        """
+        Splits the items into chunks of consecutive items.
+
+        Parameters
+        ----------
+        n_items: int
+            The number of items.
+
+        Returns
+        -------
+        List[Tuple[int, int]]
+            The (start, stop) indexes of each chunk.
+        """
+        chunk_size = self.chunk_size or max(math.ceil(n_items / (self.n_workers * 4)), 1)
+        return [(start, min(start + chunk_size, n_items)) for start in range(0, n_items, chunk_size)]
+
     def run_iteratively(self, items: list):
         """
         Does not run multiprocessing due to an error pickling the process function or other.
@@ -46,6 +350,125 @@ class MultiprocessingClass(ABC):
             for item in items:
                 yield self.process(item)
 
+    def _start_progress(self, items: Sequence) -> None:
+        """
+        Starts tracking a job with the progress hook (if any).
+
+        Parameters
+        ----------
+        items: Sequence
+            The items of the job.
+        """
+        if self.progress is not None:
+            self.progress.start(items)
+
+    def _update_progress(self, start: int, seconds: np.ndarray, worker: str) -> None:
+        """
+        Records a finished chunk of items in the progress hook (if any).
+
+        Parameters
+        ----------
+        start: int
+            The index of the first item of the chunk.
+        seconds: np.ndarray
+            The time spent on each item of the chunk.
+        worker: str
+            The name of the worker that processed the chunk.
+        """
+        if self.progress is not None:
+            self.progress.update(start, seconds, worker)
+
+    def _finish_progress(self) -> None:
+        """
+        Reports the final statistics of a job to the progress hook (if any).
+        """
+        if self.progress is not None:
+            self.progress.finish()
+
+    def _run_chunks(self, items: Sequence, max_in_flight: int = None) \
+            -> Iterator[Tuple[int, Tuple[list, np.ndarray, str]]]:
+        """
+        Runs the process on chunks of consecutive items and yields the results of each chunk in order.
+        Subclasses override this method to run the chunks in parallel.
+
+        Parameters
+        ----------
+        items: Sequence
+            The items to use for multiprocessing.
+        max_in_flight: int
+            The maximum number of chunks dispatched and not yet consumed.
+
+        Yields
+        ------
+        start: int
+            The index of the first item of the chunk.
+        chunk_results: Tuple[list, np.ndarray, str]
+            The results of each item of the chunk, the time spent on each item and the name of the worker.
+        """
+        for start, stop in self._chunk_bounds(len(items)):
+            yield start, _run_chunk(self.process, list(items[start:stop]))
+
+    def run_chunks(self, items: Sequence, max_in_flight: int = None) -> Iterator[Tuple[int, list]]:
+        """
+        Runs the process on chunks of consecutive items and yields the results of each chunk in order.
+
+        Parameters
+        ----------
+        items: Sequence
+            The items to use for multiprocessing.
+        max_in_flight: int
+            The maximum number of chunks dispatched and not yet consumed. Ignored when the items are processed
+            serially.
+
+        Yields
+        ------
+        start: int
+            The index of the first item of the chunk.
+        results: list
+            The results of each item of the chunk.
+        """
+        if isinstance(items, zip):
+            items = list(items)
+        self._start_progress(items)
+        for start, (results, seconds, worker) in self._run_chunks(items, max_in_flight):
+            self._update_progress(start, seconds, worker)
+            yield start, results
+        self._finish_progress()
+
+    def run_to_array(self,
+                     items: Sequence,
+                     row_shape: tuple,
+                     dtype: Union[np.dtype, str] = np.float32) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Runs the process on each item and writes the results of each chunk in a preallocated array as soon as the
+        chunk is finished.
+
+        Parameters
+        ----------
+        items: Sequence
+            The items to use for multiprocessing.
+        row_shape: tuple
+            The shape of the result of each item. The process returns None for the items that failed.
+        dtype: Union[np.dtype, str]
+            The dtype of the results.
+
+        Returns
+        -------
+        output: np.ndarray
+            Array with shape (len(items),) + row_shape with the results. The rows of the failed items are zeros.
+        failed: np.ndarray
+            Boolean mask of the items that failed.
+        """
+        output = np.zeros((len(items),) + tuple(row_shape), dtype=dtype)
+        failed = np.zeros(len(items), dtype=bool)
+        for start, results in self.run_chunks(items):
+            for i, row in enumerate(results, start):
+                if row is None:
+                    failed[i] = True
+                else:
+                    output[i] = row
+        return output, failed
+
     @abstractmethod
     def run(self, items: Iterable) -> Iterable:
         """
@@ -66,8 +489,77 @@ class MultiprocessingClass(ABC):
 class JoblibMultiprocessing(MultiprocessingClass):
     """
     Multiprocessing class using joblib.
+    The items are sent to the workers in chunks of consecutive items, so the function (and the object it is bound to,
+    e.g. a featurizer) is pickled once per chunk instead of once per item.
+    Functions that compute a fixed-shape numeric array for each item can use run_to_array, which keeps a pool of
+    persistent workers that receive the function once and write the results directly into a shared memory array.
     """
 
+    def __init__(self,
+                 n_jobs: int = -1,
+                 process: callable = None,
+                 chunk_size: int = None,
+                 progress: ProgressMonitor = None):
+        """
+        Constructor for the JoblibMultiprocessing class.
+
+        Parameters
+        ----------
+        n_jobs: int
+            The number of jobs to use for multiprocessing. If -1, all available cores are used.
+        process: callable
+            The function to use for multiprocessing.
+        chunk_size: int
+            The number of consecutive items sent to a worker at a time. If None, the items are split in about four
+            chunks per worker.
+        progress: ProgressMonitor
+            Hook that reports the progress, throughput and time per item of the jobs.
+        """
+        super().__init__(n_jobs=n_jobs, process=process, chunk_size=chunk_size, progress=progress)
+        self._pool = None
+
+    def _get_pool(self) -> Pool:
+        """
+        Returns the pool of persistent workers, starting it if needed.
+
+        Returns
+        -------
+        Pool
+            The pool of workers holding the process.
+        """
+        if self._pool is None:
+            # the forked workers must share the resource tracker of the parent, otherwise they report the shared
+            # output blocks they attach to as leaked when they exit
+            if resource_tracker is not None:
+                resource_tracker.ensure_running()
+            self._pool = Pool(self.n_workers, initializer=_init_worker, initargs=(self.process,))
+        return self._pool
+
+    def _fallback(self) -> 'ThreadMultiprocessing':
+        """
+        Returns the multiprocessing class used when the process can not be pickled: threads share the process, so it
+        is still run in parallel without pickling it.
+
+        Returns
+        -------
+        ThreadMultiprocessing
+            The multiprocessing class running the process in threads.
+        """
+        name = getattr(self.process, '__name__', self.process.__class__.__name__)
+        self.logger.warning(f"Failed to pickle process {name} function. Processing the input in threads instead.")
+        self.close()
+        return ThreadMultiprocessing(n_jobs=self.n_jobs, process=self.process, chunk_size=self.chunk_size,
+                                     progress=self.progress)
+
+    def close(self) -> None:
+        """
+        Terminates the persistent worker processes (if they were started by run_chunks or run_to_array).
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
     def run(self, items: Iterable) -> Iterable:
         """
         Runs the multiprocessing.
@@ -82,27 +574,740 @@ class JoblibMultiprocessing(MultiprocessingClass):
         results: Iterable
             The results of the multiprocessing.
         """
-        # TODO: Add support for progress bar
-
         try:
             # verifying if the process is a zip and convert it to a list
             if isinstance(items, zip):
                 items = list(items)
 
-            # verifying if the first element is a tuple, if so one must use the args parameter *item
-            if isinstance(items[0], tuple):
-                results = Parallel(n_jobs=self.n_jobs, backend="multiprocessing")(delayed(self.process)(*item)
-                                                                                  for item in items)
-            else:
-                results = Parallel(n_jobs=self.n_jobs, backend="multiprocessing")(delayed(self.process)(item)
-                                                                                  for item in items)
+            # tuple items are unpacked as the arguments of the process
+            self._start_progress(items)
+            bounds = self._chunk_bounds(len(items))
+            chunks = Parallel(n_jobs=self.n_jobs, backend="multiprocessing")(
+                delayed(_run_chunk)(self.process, list(items[start:stop])) for start, stop in bounds)
+            results = []
+            for (start, _), (chunk_results, seconds, worker) in zip(bounds, chunks):
+                self._update_progress(start, seconds, worker)
+                results.extend(chunk_results)
+            self._finish_progress()
 
         except Exception as e:
-            if "pickle" in str(e):
-                self.logger.warning(f"Failed to pickle process {self.process.__name__} function. Processing the input "
-                                    f"iteratively instead.")
-                results = self.run_iteratively(items)
-            else:
+            if "pickle" not in str(e):
                 raise e
+            with self._fallback() as multiprocessing_cls:
+                results = multiprocessing_cls.run(items)
 
         return results
+
+    def _run_chunks(self, items: Sequence, max_in_flight: int = None) \
+            -> Iterator[Tuple[int, Tuple[list, np.ndarray, str]]]:
+        """
+        Runs the process on chunks of consecutive items in persistent workers and yields the results of each chunk in
+        order. Only max_in_flight chunks are dispatched ahead of the consumer, so the memory used by pending results
+        is bounded regardless of the number of items.
+
+        Parameters
+        ----------
+        items: Sequence
+            The items to use for multiprocessing.
+        max_in_flight: int
+            The maximum number of chunks dispatched and not yet consumed. If None, two chunks per worker.
+
+        Yields
+        ------
+        start: int
+            The index of the first item of the chunk.
+        chunk_results: Tuple[list, np.ndarray, str]
+            The results of each item of the chunk, the time spent on each item and the name of the worker.
+        """
+        chunks = self._chunk_bounds(len(items))
+        if self.n_workers == 1 or len(chunks) <= 1:
+            yield from super()._run_chunks(items)
+            return
+        try:
+            pool = self._get_pool()
+        except Exception as e:
+            if "pickle" not in str(e):
+                raise e
+            with self._fallback() as multiprocessing_cls:
+                yield from multiprocessing_cls._run_chunks(items, max_in_flight)
+            return
+
+        max_in_flight = max(max_in_flight or 2 * self.n_workers, 1)
+        pending = deque()
+        for start, stop in chunks:
+            pending.append((start, pool.apply_async(_run_worker_chunk, (list(items[start:stop]),))))
+            if len(pending) >= max_in_flight:
+                start, chunk_results = pending.popleft()
+                yield start, chunk_results.get()
+        while pending:
+            start, chunk_results = pending.popleft()
+            yield start, chunk_results.get()
+
+    def run_to_array(self,
+                     items: Sequence,
+                     row_shape: tuple,
+                     dtype: Union[np.dtype, str] = np.float32) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Runs the process on each item and gathers the results in an array.
+        The process must return an array of shape row_shape for each item (or None if the item failed). The items are
+        sent in chunks to persistent workers that keep the process (sent only once per worker) between calls and write
+        the rows directly into a shared memory array, so the results are not pickled back.
+
+        Parameters
+        ----------
+        items: Sequence
+            The items to use for multiprocessing.
+        row_shape: tuple
+            The shape of the result of each item.
+        dtype: Union[np.dtype, str]
+            The dtype of the results.
+
+        Returns
+        -------
+        output: np.ndarray
+            Array with shape (len(items),) + row_shape with the results. The rows of the failed items are zeros.
+        failed: np.ndarray
+            Boolean mask of the items that failed.
+        """
+        dtype = np.dtype(dtype)
+        shape = (len(items),) + tuple(row_shape)
+        chunks = self._chunk_bounds(len(items))
+        if self.n_workers == 1 or len(chunks) <= 1 or shared_memory is None:
+            return super().run_to_array(items, row_shape, dtype)
+        try:
+            pool = self._get_pool()
+        except Exception as e:
+            if "pickle" not in str(e):
+                raise e
+            with self._fallback() as multiprocessing_cls:
+                return multiprocessing_cls.run_to_array(items, row_shape, dtype)
+
+        memory = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+        try:
+            shared_output = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+            shared_output[:] = 0
+            failed = np.zeros(len(items), dtype=bool)
+            self._start_progress(items)
+            tasks = ((memory.name, shape, dtype, start, list(items[start:stop])) for start, stop in chunks)
+            for start, chunk_failed, seconds, worker in pool.imap_unordered(_run_chunk_to_shared_memory, tasks):
+                failed[start:start + len(chunk_failed)] = chunk_failed
+                self._update_progress(start, seconds, worker)
+            self._finish_progress()
+            output = shared_output.copy()
+            del shared_output
+        finally:
+            memory.close()
+            memory.unlink()
+        return output, failed
+
+
+class ExecutorMultiprocessing(MultiprocessingClass):
+    """
+    Multiprocessing class running chunks of consecutive items in a concurrent.futures executor.
+    The executor (and its workers) is kept between calls until the class is closed. Only a bounded number of chunks
+    is submitted ahead of the consumer of the results.
+    Subclasses can use other executors by overriding _create_executor and _submit.
+    """
+
+    def __init__(self,
+                 n_jobs: int = -1,
+                 process: callable = None,
+                 chunk_size: int = None,
+                 progress: ProgressMonitor = None):
+        """
+        Constructor for the ExecutorMultiprocessing class.
+
+        Parameters
+        ----------
+        n_jobs: int
+            The number of jobs to use for multiprocessing. If -1, all available cores are used.
+        process: callable
+            The function to use for multiprocessing.
+        chunk_size: int
+            The number of consecutive items sent to a worker at a time. If None, the items are split in about four
+            chunks per worker.
+        progress: ProgressMonitor
+            Hook that reports the progress, throughput and time per item of the jobs.
+        """
+        super().__init__(n_jobs=n_jobs, process=process, chunk_size=chunk_size, progress=progress)
+        self._executor = None
+
+    def _create_executor(self) -> Executor:
+        """
+        Creates the executor. The workers receive the process once, when they are started.
+
+        Returns
+        -------
+        Executor
+            The executor.
+        """
+        return ProcessPoolExecutor(self.n_workers, initializer=_init_worker, initargs=(self.process,))
+
+    def _submit(self, executor: Executor, chunk: list) -> Future:
+        """
+        Submits a chunk of items to the executor.
+
+        Parameters
+        ----------
+        executor: Executor
+            The executor.
+        chunk: list
+            The items.
+
+        Returns
+        -------
+        Future
+            The future with the results of the chunk (see _run_chunk).
+        """
+        return executor.submit(_run_worker_chunk, chunk)
+
+    def close(self) -> None:
+        """
+        Shuts down the executor.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _run_chunks(self, items: Sequence, max_in_flight: int = None) \
+            -> Iterator[Tuple[int, Tuple[list, np.ndarray, str]]]:
+        """
+        Runs the process on chunks of consecutive items in the executor and yields the results of each chunk in order.
+
+        Parameters
+        ----------
+        items: Sequence
+            The items to use for multiprocessing.
+        max_in_flight: int
+            The maximum number of chunks submitted and not yet consumed. If None, two chunks per worker.
+
+        Yields
+        ------
+        start: int
+            The index of the first item of the chunk.
+        chunk_results: Tuple[list, np.ndarray, str]
+            The results of each item of the chunk, the time spent on each item and the name of the worker.
+        """
+        chunks = self._chunk_bounds(len(items))
+        if self.n_workers == 1 or len(chunks) <= 1:
+            yield from super()._run_chunks(items)
+            return
+        if self._executor is None:
+            self._executor = self._create_executor()
+
+        max_in_flight = max(max_in_flight or 2 * self.n_workers, 1)
+        pending = deque()
+        for start, stop in chunks:
+            pending.append((start, self._submit(self._executor, list(items[start:stop]))))
+            if len(pending) >= max_in_flight:
+                start, chunk_results = pending.popleft()
+                yield start, chunk_results.result()
+        while pending:
+            start, chunk_results = pending.popleft()
+            yield start, chunk_results.result()
+
+    def run(self, items: Iterable) -> list:
+        """
+        Runs the multiprocessing.
+
+        Parameters
+        ----------
+        items: Iterable
+            The items to use for multiprocessing.
+
+        Returns
+        -------
+        results: list
+            The results of the multiprocessing.
+        """
+        return [result for _, results in self.run_chunks(items) for result in results]
+
+
+class ThreadMultiprocessing(ExecutorMultiprocessing):
+    """
+    Multiprocessing class using a pool of threads.
+    The process is shared by the threads, so it is never pickled. It is the fastest backend for functions that release
+    the GIL (e.g. many RDKit calls) and the fallback for functions that can not be pickled.
+    """
+
+    def _create_executor(self) -> Executor:
+        """
+        Creates the pool of threads.
+
+        Returns
+        -------
+        Executor
+            The pool of threads.
+        """
+        return ThreadPoolExecutor(self.n_workers)
+
+    def _submit(self, executor: Executor, chunk: list) -> Future:
+        """
+        Submits a chunk of items to the pool of threads.
+
+        Parameters
+        ----------
+        executor: Executor
+            The pool of threads.
+        chunk: list
+            The items.
+
+        Returns
+        -------
+        Future
+            The future with the results of the chunk (see _run_chunk).
+        """
+        return executor.submit(_run_chunk, self.process, chunk)
+
+
+class LokyMultiprocessing(ExecutorMultiprocessing):
+    """
+    Multiprocessing class using the loky process pool of joblib.
+    The process is sent with cloudpickle, so local functions and lambdas are supported.
+    """
+
+    def _create_executor(self) -> Executor:
+        """
+        Creates the loky process pool.
+
+        Returns
+        -------
+        Executor
+            The loky process pool.
+        """
+        return LokyProcessPoolExecutor(self.n_workers, initializer=_init_worker, initargs=(self.process,))
+
+
+class DaskMultiprocessing(ExecutorMultiprocessing):
+    """
+    Multiprocessing class using a Dask distributed cluster.
+    The process is scattered once to all the workers of the cluster and the chunks of items are submitted as tasks.
+    """
+
+    def __init__(self,
+                 n_jobs: int = -1,
+                 process: callable = None,
+                 chunk_size: int = None,
+                 progress: ProgressMonitor = None,
+                 client: 'Client' = None):
+        """
+        Constructor for the DaskMultiprocessing class.
+
+        Parameters
+        ----------
+        n_jobs: int
+            The number of workers of the local cluster started when there is no client. If -1, all available cores
+            are used.
+        process: callable
+            The function to use for multiprocessing.
+        chunk_size: int
+            The number of consecutive items sent to a worker at a time. If None, the items are split in about four
+            chunks per worker thread of the cluster.
+        progress: ProgressMonitor
+            Hook that reports the progress, throughput and time per item of the jobs.
+        client: Client
+            The client of the Dask cluster. If None, the current client is used or, if there is none, a local cluster
+            is started (and closed with the class).
+        """
+        if Client is None:
+            raise ImportError("dask.distributed not available. Please install it to use it.")
+        super().__init__(n_jobs=n_jobs, process=process, chunk_size=chunk_size, progress=progress)
+        self._client = client
+        self._owns_client = False
+        self._process_future = None
+
+    @property
+    def client(self) -> 'Client':
+        """
+        Returns the client of the Dask cluster, starting a local cluster if there is no client.
+        """
+        if self._client is None:
+            try:
+                self._client = Client.current()
+            except ValueError:
+                self._client = Client(n_workers=super().n_workers, threads_per_worker=1)
+                self._owns_client = True
+        return self._client
+
+    @property
+    def n_workers(self) -> int:
+        """
+        Returns the number of worker threads of the Dask cluster.
+        """
+        return max(sum(self.client.nthreads().values()), 1)
+
+    def _create_executor(self) -> 'Client':
+        """
+        Scatters the process to the workers of the cluster.
+
+        Returns
+        -------
+        Client
+            The client of the Dask cluster.
+        """
+        self._process_future = self.client.scatter(self.process, broadcast=True)
+        return self.client
+
+    def _submit(self, executor: 'Client', chunk: list) -> Future:
+        """
+        Submits a chunk of items to the Dask cluster.
+
+        Parameters
+        ----------
+        executor: Client
+            The client of the Dask cluster.
+        chunk: list
+            The items.
+
+        Returns
+        -------
+        Future
+            The future with the results of the chunk (see _run_chunk).
+        """
+        return executor.submit(_run_chunk, self._process_future, chunk, pure=False)
+
+    def close(self) -> None:
+        """
+        Releases the process scattered to the workers and closes the local cluster (if it was started by the class).
+        """
+        self._executor = None
+        self._process_future = None
+        if self._owns_client:
+            cluster = self._client.cluster
+            self._client.close()
+            if cluster is not None:
+                cluster.close()
+            self._client = None
+            self._owns_client = False
+
+
+class _IsolatedChunk:
+    """
+    State of a chunk of consecutive items processed by IsolatedMultiprocessing.
+    """
+
+    def __init__(self, start: int, items: list) -> None:
+        """
+        Initializes the chunk.
+
+        Parameters
+        ----------
+        start: int
+            The index of the first item of the chunk.
+        items: list
+            The items of the chunk.
+        """
+        self.start = start
+        self.items = items
+        self.results = [None] * len(items)
+        self.seconds = np.zeros(len(items))
+        self.pending = len(items)
+        self.worker = ''
+
+
+class _IsolatedWorker:
+    """
+    Worker process of IsolatedMultiprocessing and the chunk it is processing.
+    """
+
+    def __init__(self, process: callable, max_tasks: int, max_memory: float) -> None:
+        """
+        Starts the worker process.
+
+        Parameters
+        ----------
+        process: callable
+            The function to run on each item.
+        max_tasks: int
+            The number of items after which the worker retires.
+        max_memory: float
+            The resident memory (in MB) above which the worker retires.
+        """
+        self.connection, worker_connection = Pipe()
+        self.process = Process(target=_run_isolated_worker,
+                               args=(process, worker_connection, max_tasks, max_memory),
+                               daemon=True)
+        self.process.start()
+        worker_connection.close()
+        self.chunk = None
+        self.offset = 0
+        self.since = 0.0
+
+    @property
+    def name(self) -> str:
+        """
+        Returns the name of the worker.
+        """
+        return f'{self.process.pid}/isolated'
+
+    def assign(self, chunk: _IsolatedChunk, offset: int) -> None:
+        """
+        Sends the items of a chunk from offset to the worker.
+
+        Parameters
+        ----------
+        chunk: _IsolatedChunk
+            The chunk.
+        offset: int
+            The position in the chunk of the first item to process.
+        """
+        self.chunk = chunk
+        self.offset = offset
+        self.since = time.perf_counter()
+        self.connection.send((offset, chunk.items[offset:]))
+
+    def stop(self, kill: bool = False) -> None:
+        """
+        Stops the worker process.
+
+        Parameters
+        ----------
+        kill: bool
+            Whether to kill the process instead of asking it to exit.
+        """
+        if not kill:
+            try:
+                self.connection.send(None)
+            except (OSError, ValueError):
+                kill = True
+            self.process.join(timeout=1)
+        if kill or self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+class IsolatedMultiprocessing(MultiprocessingClass):
+    """
+    Multiprocessing class with fault isolation.
+    The items run in worker processes supervised by the parent process:
+    - items that take longer than timeout seconds are abandoned and their worker is killed and replaced;
+    - workers are replaced after max_tasks_per_worker items or when their memory goes over max_memory_per_worker MB;
+    - exceptions raised by the process and crashes of the workers only fail the current item.
+    Failed items get None as result and are recorded in the failures attribute, so a pathological item can not stall
+    or kill the whole job.
+    """
+
+    def __init__(self,
+                 n_jobs: int = -1,
+                 process: callable = None,
+                 chunk_size: int = None,
+                 progress: ProgressMonitor = None,
+                 timeout: float = None,
+                 max_tasks_per_worker: int = None,
+                 max_memory_per_worker: float = None):
+        """
+        Constructor for the IsolatedMultiprocessing class.
+
+        Parameters
+        ----------
+        n_jobs: int
+            The number of worker processes. If -1, all available cores are used.
+        process: callable
+            The function to use for multiprocessing.
+        chunk_size: int
+            The number of consecutive items sent to a worker at a time. If None, the items are split in about four
+            chunks per worker.
+        progress: ProgressMonitor
+            Hook that reports the progress, throughput and time per item of the jobs.
+        timeout: float
+            The maximum wall-clock time (in seconds) of each item. If None, the items have no time limit.
+        max_tasks_per_worker: int
+            The number of items after which a worker is replaced. If None, the workers are not replaced.
+        max_memory_per_worker: float
+            The resident memory (in MB) above which a worker is replaced. If None, the memory is not checked.
+        """
+        super().__init__(n_jobs=n_jobs, process=process, chunk_size=chunk_size, progress=progress)
+        self.timeout = timeout
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_memory_per_worker = max_memory_per_worker
+        self.failures = []
+        self._workers = []
+
+    def close(self) -> None:
+        """
+        Stops the worker processes.
+        """
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+
+    def _start_worker(self) -> _IsolatedWorker:
+        """
+        Starts a new worker process.
+
+        Returns
+        -------
+        _IsolatedWorker
+            The worker.
+        """
+        return _IsolatedWorker(self.process, self.max_tasks_per_worker, self.max_memory_per_worker)
+
+    def _fail(self, chunk: _IsolatedChunk, position: int, error: str, seconds: float) -> None:
+        """
+        Records a failed item.
+
+        Parameters
+        ----------
+        chunk: _IsolatedChunk
+            The chunk of the item.
+        position: int
+            The position of the item in the chunk.
+        error: str
+            The description of the failure.
+        seconds: float
+            The time spent on the item.
+        """
+        chunk.results[position] = None
+        chunk.seconds[position] = seconds
+        chunk.pending -= 1
+        item = describe_item(chunk.items[position])
+        self.failures.append({'index': chunk.start + position, 'item': item, 'error': error})
+        self.logger.warning(f"Failed to process item {chunk.start + position} ({item}): {error}")
+
+    def _replace(self, worker: _IsolatedWorker, resume: deque, kill: bool) -> _IsolatedWorker:
+        """
+        Replaces a worker, queueing the rest of its chunk to be resumed by another worker.
+
+        Parameters
+        ----------
+        worker: _IsolatedWorker
+            The worker to replace.
+        resume: deque
+            The queue of (chunk, offset) to resume.
+        kill: bool
+            Whether to kill the worker process.
+
+        Returns
+        -------
+        _IsolatedWorker
+            The new worker.
+        """
+        if worker.chunk is not None and worker.offset < len(worker.chunk.items):
+            resume.appendleft((worker.chunk, worker.offset))
+        worker.stop(kill=kill)
+        return self._start_worker()
+
+    def _handle_message(self, worker: _IsolatedWorker, message: Tuple[int, Any, float, str, bool]) -> bool:
+        """
+        Records the result of an item sent by a worker.
+
+        Parameters
+        ----------
+        worker: _IsolatedWorker
+            The worker.
+        message: Tuple[int, Any, float, str, bool]
+            The position of the item in the chunk, the result, the time spent, the error (None if the item did not
+            fail) and whether the worker retired.
+
+        Returns
+        -------
+        bool
+            Whether the worker retired.
+        """
+        position, result, seconds, error, retire = message
+        chunk = worker.chunk
+        chunk.worker = worker.name
+        if error is not None:
+            self._fail(chunk, position, error, seconds)
+        else:
+            chunk.results[position] = result
+            chunk.seconds[position] = seconds
+            chunk.pending -= 1
+        worker.offset = position + 1
+        worker.since = time.perf_counter()
+        if worker.offset == len(chunk.items):
+            worker.chunk = None
+        return retire
+
+    def _run_chunks(self, items: Sequence, max_in_flight: int = None) \
+            -> Iterator[Tuple[int, Tuple[list, np.ndarray, str]]]:
+        """
+        Runs the process on chunks of consecutive items in the supervised workers and yields the results of each
+        chunk in order.
+
+        Parameters
+        ----------
+        items: Sequence
+            The items to use for multiprocessing.
+        max_in_flight: int
+            The maximum number of chunks dispatched and not yet consumed. If None, two chunks per worker.
+
+        Yields
+        ------
+        start: int
+            The index of the first item of the chunk.
+        chunk_results: Tuple[list, np.ndarray, str]
+            The results of each item of the chunk (None for failed items), the time spent on each item and the name
+            of the worker.
+        """
+        self.failures = []
+        bounds = deque(self._chunk_bounds(len(items)))
+        max_in_flight = max(max_in_flight or 2 * self.n_workers, 1)
+        while len(self._workers) < self.n_workers:
+            self._workers.append(self._start_worker())
+
+        window = deque()
+        resume = deque()
+        while bounds or window:
+            for worker in self._workers:
+                if worker.chunk is not None:
+                    continue
+                if resume:
+                    worker.assign(*resume.popleft())
+                elif bounds and len(window) < max_in_flight:
+                    start, stop = bounds.popleft()
+                    chunk = _IsolatedChunk(start, list(items[start:stop]))
+                    window.append(chunk)
+                    worker.assign(chunk, 0)
+
+            while window and window[0].pending == 0:
+                chunk = window.popleft()
+                yield chunk.start, (chunk.results, chunk.seconds, chunk.worker)
+            if not window:
+                continue
+
+            busy = [worker for worker in self._workers if worker.chunk is not None]
+            if not busy:
+                continue
+            wait_time = None
+            if self.timeout is not None:
+                wait_time = max(min(worker.since + self.timeout for worker in busy) - time.perf_counter(), 0)
+            ready = wait([worker.connection for worker in busy], wait_time)
+
+            for i, worker in enumerate(self._workers):
+                if worker.chunk is None:
+                    continue
+                if worker.connection in ready:
+                    try:
+                        message = worker.connection.recv()
+                    except (EOFError, OSError):
+                        worker.process.join(timeout=1)
+                        self._fail(worker.chunk, worker.offset, f'worker exited with code {worker.process.exitcode}',
+                                   time.perf_counter() - worker.since)
+                        worker.offset += 1
+                        self._workers[i] = self._replace(worker, resume, kill=True)
+                        continue
+                    if self._handle_message(worker, message):
+                        self._workers[i] = self._replace(worker, resume, kill=False)
+                elif self.timeout is not None and time.perf_counter() - worker.since > self.timeout:
+                    self._fail(worker.chunk, worker.offset, f'timed out after {self.timeout} seconds',
+                               time.perf_counter() - worker.since)
+                    worker.offset += 1
+                    self._workers[i] = self._replace(worker, resume, kill=True)
+
+    def run(self, items: Iterable) -> list:
+        """
+        Runs the multiprocessing.
+
+        Parameters
+        ----------
+        items: Iterable
+            The items to use for multiprocessing.
+
+        Returns
+        -------
+        results: list
+            The results of the multiprocessing (None for the items that failed, see the failures attribute).
+        """
+        return [result for _, results in self.run_chunks(items) for result in results]
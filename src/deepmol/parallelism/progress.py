@@ -0,0 +1,173 @@
+import heapq
+import time
+from typing import Any, Callable, Sequence
+
+import numpy as np
+from rdkit.Chem import Mol, MolToSmiles
+
+from deepmol.loggers.logger import Logger
+
+
+def describe_item(item: Any) -> str:
+    """
+    Get a readable description of an item of a parallel job (the SMILES string of molecules).
+
+    Parameters
+    ----------
+    item: Any
+        The item (for tuple items, the first element is described).
+
+    Returns
+    -------
+    str
+        The description of the item.
+    """
+    if isinstance(item, tuple) and len(item) > 0:
+        item = item[0]
+    if isinstance(item, Mol):
+        return MolToSmiles(item)
+    return str(item)
+
+
+class ProgressMonitor:
+    """
+    Hook that tracks the progress of parallel jobs (see MultiprocessingClass).
+    The workers time each item and the monitor gathers the throughput (items per second), the ETA, the utilization of
+    each worker, a histogram of the time per item and the slowest items (e.g. the molecules that make a featurizer
+    stall). The statistics are logged and sent to an optional callback every log_interval seconds and when the job
+    finishes.
+    """
+
+    def __init__(self,
+                 log_interval: float = 30.0,
+                 n_slowest: int = 10,
+                 callback: Callable[[dict], None] = None,
+                 bins: Sequence[float] = None) -> None:
+        """
+        Initializes the monitor.
+
+        Parameters
+        ----------
+        log_interval: float
+            The minimum number of seconds between two reports.
+        n_slowest: int
+            The number of slowest items to report.
+        callback: Callable[[dict], None]
+            Function called with the statistics (see ProgressMonitor.statistics) of each report.
+        bins: Sequence[float]
+            The edges (in seconds) of the bins of the histogram of the time per item. If None, 16 logarithmic bins
+            from 10 microseconds to 1000 seconds.
+        """
+        self.log_interval = log_interval
+        self.n_slowest = n_slowest
+        self.callback = callback
+        self.bins = np.logspace(-5, 3, 17) if bins is None else np.asarray(bins, dtype=float)
+        self.logger = Logger()
+        self.start([])
+
+    def start(self, items: Sequence) -> None:
+        """
+        Starts tracking a job.
+
+        Parameters
+        ----------
+        items: Sequence
+            The items of the job.
+        """
+        self._items = items
+        self.total = len(items)
+        self.done = 0
+        self._start_time = time.perf_counter()
+        self._last_report = self._start_time
+        self._histogram = np.zeros(len(self.bins) - 1, dtype=np.int64)
+        self._busy = {}
+        self._slowest = []
+
+    def update(self, start: int, seconds: np.ndarray, worker: str) -> None:
+        """
+        Records a finished chunk of consecutive items.
+
+        Parameters
+        ----------
+        start: int
+            The index of the first item of the chunk.
+        seconds: np.ndarray
+            The time spent on each item of the chunk.
+        worker: str
+            The name of the worker that processed the chunk.
+        """
+        seconds = np.asarray(seconds, dtype=float)
+        self.done += len(seconds)
+        self._busy[worker] = self._busy.get(worker, 0.0) + float(seconds.sum())
+        self._histogram += np.histogram(np.clip(seconds, self.bins[0], self.bins[-1]), self.bins)[0]
+        for index in np.argsort(seconds)[::-1][:self.n_slowest]:
+            entry = (float(seconds[index]), start + int(index))
+            if len(self._slowest) < self.n_slowest:
+                heapq.heappush(self._slowest, entry)
+            elif entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+            else:
+                break
+        if time.perf_counter() - self._last_report >= self.log_interval:
+            self.report()
+
+    def finish(self) -> None:
+        """
+        Reports the final statistics of the job.
+        """
+        self.report(final=True)
+
+    def statistics(self) -> dict:
+        """
+        Get the statistics of the current job.
+
+        Returns
+        -------
+        dict
+            Dictionary with the number of items done and in total, the elapsed time, the number of items per second,
+            the ETA in seconds (None before the first chunk), the utilization (fraction of the elapsed time spent
+            processing items) of each worker, the histogram of the time per item (counts and bin edges) and the
+            slowest items (description and seconds).
+        """
+        elapsed = time.perf_counter() - self._start_time
+        items_per_second = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / items_per_second if items_per_second > 0 else None
+        slowest = [(describe_item(self._items[index]), seconds)
+                   for seconds, index in sorted(self._slowest, reverse=True)]
+        return {'done': self.done,
+                'total': self.total,
+                'elapsed': elapsed,
+                'items_per_second': items_per_second,
+                'eta': eta,
+                'worker_utilization': {worker: busy / elapsed if elapsed > 0 else 0.0
+                                       for worker, busy in self._busy.items()},
+                'latency_histogram': (self._histogram.copy(), self.bins),
+                'slowest': slowest}
+
+    def report(self, final: bool = False) -> dict:
+        """
+        Logs the statistics of the current job and sends them to the callback.
+
+        Parameters
+        ----------
+        final: bool
+            Whether the job is finished. The slowest items are only logged in the final report.
+
+        Returns
+        -------
+        dict
+            The statistics (see ProgressMonitor.statistics).
+        """
+        stats = self.statistics()
+        self._last_report = time.perf_counter()
+        eta = 'unknown' if stats['eta'] is None else f"{stats['eta']:.0f}s"
+        utilization = np.mean(list(stats['worker_utilization'].values())) if stats['worker_utilization'] else 0.0
+        self.logger.info(f"Processed {stats['done']}/{stats['total']} items in {stats['elapsed']:.1f}s "
+                         f"({stats['items_per_second']:.1f} items/s, ETA {eta}, {len(stats['worker_utilization'])} "
+                         f"workers with {utilization:.0%} mean utilization).")
+        if final and stats['slowest']:
+            slowest = ', '.join(f'{item} ({seconds:.3f}s)' for item, seconds in stats['slowest'])
+            self.logger.info(f"Slowest items: {slowest}")
+        if self.callback is not None:
+            self.callback(stats)
+        return stats
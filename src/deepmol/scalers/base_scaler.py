@@ -1,9 +1,37 @@
 from abc import ABC, abstractmethod
+from typing import Union
 
 import joblib
 import numpy as np
+import scipy.sparse as sp
 
-from deepmol.datasets import Dataset
+from deepmol.datasets import Dataset, PackedFingerprints
+
+
+def _replace_sparse_columns(X: sp.spmatrix, columns: list, values: Union[np.ndarray, sp.spmatrix]) -> sp.csr_matrix:
+    """
+    Replaces columns of a sparse matrix without converting it to a dense array.
+
+    Parameters
+    ----------
+    X: sp.spmatrix
+        The sparse matrix.
+    columns: list
+        The indexes of the columns to replace.
+    values: Union[np.ndarray, sp.spmatrix]
+        The new values of the columns.
+
+    Returns
+    -------
+    sp.csr_matrix
+        The sparse matrix with the replaced columns.
+    """
+    columns = np.asarray(columns)
+    others = np.setdiff1d(np.arange(X.shape[1]), columns)
+    if len(others) == 0:
+        return sp.csr_matrix(values)[:, np.argsort(columns)]
+    combined = sp.hstack([X[:, others], sp.csr_matrix(values)], format='csr')
+    return combined[:, np.argsort(np.concatenate([others, columns]))]
 
 
 class BaseScaler(ABC):
@@ -75,9 +103,19 @@ class BaseScaler(ABC):
         if not columns:
             columns = [i for i in range(dataset.X.shape[1])]
         try:
-            res = self._fit_transform(dataset.X[:, columns])
-            # TODO: due to X being a property, the "set" method must choose so that it could behave as a numpy array
-            dataset.X[:, columns] = res
+            X = dataset.X
+            if isinstance(X, PackedFingerprints):
+                # the scaled features are no longer binary
+                X = X.to_numpy()
+            res = self._fit_transform(X[:, columns])
+            if sp.issparse(X):
+                X = _replace_sparse_columns(X, columns, res)
+            else:
+                # integer features (e.g. counts) are converted instead of truncating the scaled values
+                X = X.astype(np.result_type(X, res), copy=False)
+                X[:, columns] = res
+            # X is re-assigned so that dataset views that gathered a copy of their features keep the scaled values
+            dataset._X = X
         except Exception as e:
             raise Exception(f"It was not possible to scale the data. Error: {e}")
 
@@ -128,8 +166,16 @@ class BaseScaler(ABC):
         if not columns:
             columns = [i for i in range(dataset.X.shape[1])]
         try:
-            res = self._transform(dataset.X[:, columns])
-            dataset.X[:, columns] = res
+            X = dataset.X
+            if isinstance(X, PackedFingerprints):
+                X = X.to_numpy()
+            res = self._transform(X[:, columns])
+            if sp.issparse(X):
+                X = _replace_sparse_columns(X, columns, res)
+            else:
+                X = X.astype(np.result_type(X, res), copy=False)
+                X[:, columns] = res
+            dataset._X = X
 
         except:
             raise Exception("It was not possible to scale the data")
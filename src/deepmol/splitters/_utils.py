@@ -1,10 +1,14 @@
 import math
-from typing import List
+from functools import partial
+from typing import Any, List, Tuple
 
 import numpy as np
+import scipy.sparse as sp
 from rdkit.Chem import AllChem
 
 from deepmol.datasets import Dataset
+from deepmol.parallelism.multiprocessing import ThreadMultiprocessing
+from deepmol.utils.similarity import count_common_bits, pack_fingerprints, popcount64
 
 
 def get_train_valid_test_indexes(scaffold_sets: List[List[int]],
@@ -94,15 +98,16 @@ def get_mols_for_each_class(dataset: Dataset):
     """
     mols_classes_map = {}
     indices_classes_map = {}
+    y = dataset.y
     for i, mol in enumerate(dataset.mols):
 
-        if dataset.y[i] not in mols_classes_map:
-            mols_classes_map[dataset.y[i]] = [mol]
-            indices_classes_map[dataset.y[i]] = [i]
+        if y[i] not in mols_classes_map:
+            mols_classes_map[y[i]] = [mol]
+            indices_classes_map[y[i]] = [i]
 
         else:
-            mols_classes_map[dataset.y[i]].append(mol)
-            indices_classes_map[dataset.y[i]].append(i)
+            mols_classes_map[y[i]].append(mol)
+            indices_classes_map[y[i]].append(i)
 
     return mols_classes_map, indices_classes_map
 
@@ -124,16 +129,131 @@ def get_fingerprints_for_each_class(dataset: Dataset):
     fps_classes_map = {}
     indices_classes_map = {}
     all_fps = []
+    y = dataset.y
     for i, mol in enumerate(dataset.mols):
 
         fp = AllChem.GetMorganFingerprintAsBitVect(mol, 2, 1024)
         all_fps.append(fp)
-        if dataset.y[i] not in fps_classes_map:
-            fps_classes_map[dataset.y[i]] = [fp]
-            indices_classes_map[dataset.y[i]] = [i]
+        if y[i] not in fps_classes_map:
+            fps_classes_map[y[i]] = [fp]
+            indices_classes_map[y[i]] = [i]
 
         else:
-            fps_classes_map[dataset.y[i]].append(fp)
-            indices_classes_map[dataset.y[i]].append(i)
+            fps_classes_map[y[i]].append(fp)
+            indices_classes_map[y[i]].append(i)
 
     return fps_classes_map, indices_classes_map, all_fps
+
+
+def _butina_neighbors_block(words: np.ndarray,
+                            counts: np.ndarray,
+                            cutoff: float,
+                            block_size: int,
+                            start: int,
+                            stop: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the pairs of neighbours (Tanimoto distance <= cutoff) between a block of rows and the following columns of
+    fingerprints sorted by their number of set bits.
+
+    Parameters
+    ----------
+    words: np.ndarray
+        The packed fingerprints, sorted by their number of set bits.
+    counts: np.ndarray
+        The (sorted) number of set bits of the fingerprints.
+    cutoff: float
+        The maximum Tanimoto distance of neighbours.
+    block_size: int
+        The number of columns compared at a time.
+    start: int
+        The first row of the block.
+    stop: int
+        The end of the rows of the block.
+
+    Returns
+    -------
+    rows: np.ndarray
+        The rows of the pairs of neighbours.
+    columns: np.ndarray
+        The columns (greater than the rows) of the pairs of neighbours.
+    """
+    # the similarity of fingerprints with a <= b set bits is at most a / b (the bound is loosened by a small margin so
+    # that pairs at the cutoff are compared exactly below)
+    threshold = 1 - cutoff - 1e-6
+    stop_column = len(counts) if threshold <= 0 else \
+        int(np.searchsorted(counts, counts[stop - 1] / threshold, side='right'))
+    row_indexes = np.arange(start, stop)
+    rows, columns = [], []
+    for column_start in range(start, stop_column, block_size):
+        column_stop = min(column_start + block_size, stop_column)
+        common = count_common_bits(words[start:stop], words[column_start:column_stop])
+        union = counts[start:stop, None] + counts[None, column_start:column_stop] - common
+        # same double precision arithmetic as the distances given to rdkit.ML.Cluster.Butina.ClusterData
+        similarities = np.zeros(common.shape, dtype=np.float64)
+        np.divide(common, union, out=similarities, where=union > 0)
+        neighbors = (1 - similarities <= cutoff) & (row_indexes[:, None] < np.arange(column_start, column_stop))
+        block_rows, block_columns = np.nonzero(neighbors)
+        rows.append(block_rows + start)
+        columns.append(block_columns + column_start)
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(rows), np.concatenate(columns)
+
+
+def butina_clustering(fingerprints: Any,
+                      cutoff: float,
+                      n_jobs: int = -1,
+                      block_size: int = 1024) -> Tuple[Tuple[int, ...], ...]:
+    """
+    Clusters binary fingerprints with the Butina algorithm, with the same clusters as
+    rdkit.ML.Cluster.Butina.ClusterData on the Tanimoto distances.
+    Instead of the list of all the pairwise distances, only the sparse neighbour lists are kept. They are computed in
+    blocks of bit-packed fingerprints sorted by their number of set bits, skipping the pairs that can not be neighbours
+    (Swamidass-Baldi bound), in parallel threads.
+
+    Parameters
+    ----------
+    fingerprints: Any
+        The fingerprints: a list of RDKit bit vectors or a 2D array of bits.
+    cutoff: float
+        The maximum Tanimoto distance (1 - similarity) of molecules in the same cluster.
+    n_jobs: int
+        The number of threads. If -1, all available cores are used.
+    block_size: int
+        The number of fingerprints compared at a time.
+
+    Returns
+    -------
+    Tuple[Tuple[int, ...], ...]
+        The clusters. The first element of each cluster is its centroid.
+    """
+    words = pack_fingerprints(fingerprints)
+    n_fps = len(words)
+    counts = popcount64(words).sum(axis=1, dtype=np.int32)
+    order = np.argsort(counts, kind='stable')
+    words, counts = np.ascontiguousarray(words[order]), counts[order]
+    process = partial(_butina_neighbors_block, words, counts, cutoff, block_size)
+    blocks = [(start, min(start + block_size, n_fps)) for start in range(0, n_fps, block_size)]
+    with ThreadMultiprocessing(n_jobs=n_jobs, process=process, chunk_size=1) as multiprocessing_cls:
+        results = multiprocessing_cls.run(blocks)
+    rows = order[np.concatenate([np.zeros(0, dtype=np.int64)] + [result[0] for result in results])]
+    columns = order[np.concatenate([np.zeros(0, dtype=np.int64)] + [result[1] for result in results])]
+    neighbors = sp.csr_matrix((np.ones(2 * len(rows), dtype=np.int8),
+                               (np.concatenate([rows, columns]), np.concatenate([columns, rows]))),
+                              shape=(n_fps, n_fps))
+    neighbors.sort_indices()
+
+    # the molecules with more neighbours are the centroids first (ties broken by the larger index, as in RDKit)
+    n_neighbors = np.diff(neighbors.indptr)
+    centroids = np.lexsort((np.arange(n_fps), n_neighbors))[::-1]
+    seen = np.zeros(n_fps, dtype=bool)
+    clusters = []
+    for centroid in centroids:
+        if seen[centroid]:
+            continue
+        members = neighbors.indices[neighbors.indptr[centroid]:neighbors.indptr[centroid + 1]]
+        members = members[~seen[members]]
+        seen[centroid] = True
+        seen[members] = True
+        clusters.append((int(centroid),) + tuple(members.tolist()))
+    return tuple(clusters)
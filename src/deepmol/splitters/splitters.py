@@ -1,4 +1,3 @@
-import copy
 from abc import abstractmethod, ABC
 
 import numpy as np
@@ -8,14 +7,13 @@ from typing import Tuple, List
 from rdkit import DataStructs
 from rdkit.Chem import Mol
 from rdkit.Chem.Scaffolds.MurckoScaffold import MurckoScaffoldSmiles
-from rdkit.ML.Cluster import Butina
 
 from deepmol.datasets import Dataset
 from sklearn.model_selection import KFold, StratifiedKFold
 
 from deepmol.loggers.logger import Logger
 from deepmol.splitters._utils import get_train_valid_test_indexes, get_fingerprints_for_each_class, \
-    get_mols_for_each_class
+    get_mols_for_each_class, butina_clustering
 
 
 class Splitter(ABC):
@@ -240,15 +238,14 @@ class RandomSplitter(Splitter):
           List of length k tuples of (train, test) where `train` and `test` are both `Dataset`.
         """
         self.logger.info("Computing K-fold split")
-        ds = copy.deepcopy(dataset)
-
         kf = KFold(n_splits=k, shuffle=True, random_state=seed)
 
+        # the folds are views of the dataset, so the data is not copied for each fold
         train_datasets = []
         test_datasets = []
-        for train_index, test_index in kf.split(ds.X):
-            train_datasets.append(ds.select_to_split(train_index))
-            test_datasets.append(ds.select_to_split(test_index))
+        for train_index, test_index in kf.split(np.zeros(len(dataset))):
+            train_datasets.append(dataset.select_to_split(train_index))
+            test_datasets.append(dataset.select_to_split(test_index))
 
         return list(zip(train_datasets, test_datasets))
 
@@ -280,15 +277,14 @@ class SingletaskStratifiedSplitter(Splitter):
             A list of length k of tuples of train and test datasets as NumpyDataset objects.
         """
         self.logger.info("Computing Stratified K-fold split")
-        ds = copy.deepcopy(dataset)
-
         skf = StratifiedKFold(n_splits=k, shuffle=True, random_state=seed)
 
+        # the folds are views of the dataset, so the data is not copied for each fold
         train_datasets = []
         test_datasets = []
-        for train_index, test_index in skf.split(ds.X, ds.y):
-            train_datasets.append(ds.select_to_split(train_index))
-            test_datasets.append(ds.select_to_split(test_index))
+        for train_index, test_index in skf.split(np.zeros(len(dataset)), dataset.y):
+            train_datasets.append(dataset.select_to_split(train_index))
+            test_datasets.append(dataset.select_to_split(test_index))
 
         return list(zip(train_datasets, test_datasets))
 
@@ -741,7 +737,7 @@ class ButinaSplitter(Splitter):
     Splitter based on the Butina clustering algorithm.
     """
 
-    def __init__(self, cutoff: float = 0.6):
+    def __init__(self, cutoff: float = 0.6, n_jobs: int = -1):
         """
         Create a ButinaSplitter.
 
@@ -750,9 +746,12 @@ class ButinaSplitter(Splitter):
         cutoff: float
             The cutoff value for tanimoto similarity.  Molecules that are more similar than this will tend to be put in
             the same dataset.
+        n_jobs: int
+            The number of threads used to find the neighbours of the molecules. If -1, all available cores are used.
         """
         super().__init__()
         self.cutoff = cutoff
+        self.n_jobs = n_jobs
 
     def split(self,
               dataset: Dataset,
@@ -802,14 +801,8 @@ class ButinaSplitter(Splitter):
 
         if not is_regression:
             for class_ in fps_classes_map:
-                dists = []
                 fps = fps_classes_map[class_]
-                nfps = len(fps)
-                for i in range(1, nfps):
-                    sims = DataStructs.BulkTanimotoSimilarity(fps[i], fps[:i])
-                    dists.extend([1 - x for x in sims])
-                scaffold_sets = Butina.ClusterData(
-                    dists, nfps, self.cutoff, isDistData=True)
+                scaffold_sets = butina_clustering(fps, self.cutoff, n_jobs=self.n_jobs)
                 scaffold_sets = sorted(scaffold_sets, key=lambda x: -len(x))
 
                 new_scaffold_sets = []  # update for the true indexes of the compounds
@@ -833,13 +826,7 @@ class ButinaSplitter(Splitter):
                 valid_inds.extend(valid_inds_class_)
 
         else:
-            dists = []
-            nfps = len(all_fps)
-            for i in range(1, nfps):
-                sims = DataStructs.BulkTanimotoSimilarity(all_fps[i], all_fps[:i])
-                dists.extend([1 - x for x in sims])
-            scaffold_sets = Butina.ClusterData(
-                dists, nfps, self.cutoff, isDistData=True)
+            scaffold_sets = butina_clustering(all_fps, self.cutoff, n_jobs=self.n_jobs)
             scaffold_sets = sorted(scaffold_sets, key=lambda x: -len(x))
             counter = 0
             for scaffold_set in scaffold_sets:
@@ -1,12 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import Tuple, Union
 
 import numpy as np
 from rdkit.Chem import Mol
 
 from deepmol.datasets import Dataset
 from deepmol.loggers.logger import Logger
-from deepmol.parallelism.multiprocessing import JoblibMultiprocessing
+from deepmol.parallelism.backends import get_multiprocessing_class
+from deepmol.parallelism.multiprocessing import MultiprocessingClass
+from deepmol.parallelism.progress import ProgressMonitor
 from deepmol.utils.utils import canonicalize_mol_object, mol_to_smiles
 
 
@@ -15,7 +17,10 @@ class MolecularStandardizer(ABC):
     Class for handling the standardization of molecules.
     """
 
-    def __init__(self, n_jobs: int = -1) -> None:
+    def __init__(self,
+                 n_jobs: int = -1,
+                 backend: Union[str, MultiprocessingClass] = None,
+                 progress: ProgressMonitor = None) -> None:
         """
         Standardizer for molecules.
 
@@ -23,8 +28,16 @@ class MolecularStandardizer(ABC):
         ----------
         n_jobs: int
             Number of jobs to run in parallel.
+        backend: Union[str, MultiprocessingClass]
+            The parallel backend used in the standardization ('threads', 'loky', 'multiprocessing', 'executor',
+            'dask', 'isolated', any registered backend or 'auto') or a configured multiprocessing class. If None, the default backend is used (see
+            deepmol.parallelism.backends.set_default_backend).
+        progress: ProgressMonitor
+            Hook that reports the progress, throughput and slowest molecules of the standardization.
         """
         self.n_jobs = n_jobs
+        self.backend = backend
+        self.progress = progress
         self.logger = Logger()
         self.logger.info(f"Standardizer {self.__class__.__name__} initialized with {n_jobs} jobs.")
 
@@ -68,8 +81,12 @@ class MolecularStandardizer(ABC):
             Standardized dataset.
         """
         molecules = dataset.mols
-        multiprocessing_cls = JoblibMultiprocessing(n_jobs=self.n_jobs, process=self._standardize_mol)
-        result = list(multiprocessing_cls.run(molecules))
+        with get_multiprocessing_class(self.backend, n_jobs=self.n_jobs, process=self._standardize_mol,
+                                       progress=self.progress) as multiprocessing_cls:
+            result = list(multiprocessing_cls.run(molecules))
+        # failed items of fault-isolated backends have no result, so the molecule is kept as it is
+        result = [(mol, mol_to_smiles(mol, canonical=True)) if res is None else res
+                  for mol, res in zip(molecules, result)]
         dataset._smiles = np.asarray([x[1] for x in result])
         dataset._mols = np.asarray([x[0] for x in result])
         return dataset
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """
+    Size-bounded dictionary that discards the least recently used entries when it is full.
+    """
+
+    def __init__(self, max_size: int = 1024) -> None:
+        """
+        Initializes the cache.
+
+        Parameters
+        ----------
+        max_size: int
+            The maximum number of entries kept in the cache.
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        """
+        Get the number of entries in the cache.
+
+        Returns
+        -------
+        int
+            The number of entries in the cache.
+        """
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """
+        Checks if a key is in the cache without updating its recency.
+
+        Parameters
+        ----------
+        key: Hashable
+            The key to check.
+
+        Returns
+        -------
+        bool
+            True if the key is in the cache.
+        """
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get the value of a key and mark it as the most recently used entry.
+
+        Parameters
+        ----------
+        key: Hashable
+            The key to look up.
+        default: Any
+            The value to return if the key is not in the cache.
+
+        Returns
+        -------
+        Any
+            The cached value or the default value.
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Adds an entry to the cache, evicting the least recently used entries if the cache is full.
+
+        Parameters
+        ----------
+        key: Hashable
+            The key of the entry.
+        value: Any
+            The value of the entry.
+        """
+        if self.max_size <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Removes all the entries of the cache and resets the hit/miss counters.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,376 @@
+from functools import partial
+from typing import List, Tuple, Union
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from rdkit.Chem import Mol
+
+from deepmol.compound_featurization import MolecularFeaturizer, MorganFingerprint
+from deepmol.datasets import Dataset
+from deepmol.parallelism.multiprocessing import ThreadMultiprocessing
+from deepmol.utils.similarity import pack_fingerprints, popcount64, tanimoto_block
+from deepmol.utils.utils import smiles_to_mol
+
+
+class FingerprintIndex:
+    """
+    Nearest-neighbour index of the binary fingerprints of a dataset for Tanimoto similarity searches (e.g.
+    applicability-domain checks: which training compounds are the most similar to a query).
+    The fingerprints are stored bit-packed and sorted by their number of set bits. The Swamidass-Baldi bound
+    (the Tanimoto similarity of fingerprints with a and b set bits is at most min(a, b) / max(a, b)) restricts each
+    search to the fingerprints with a similar number of set bits. The queries are processed in blocks, in parallel
+    threads.
+    """
+
+    def __init__(self, fingerprint: MolecularFeaturizer = None, n_jobs: int = -1, block_size: int = 1024) -> None:
+        """
+        Initializes the index.
+
+        Parameters
+        ----------
+        fingerprint: MolecularFeaturizer
+            The binary fingerprint of the molecules (e.g. MorganFingerprint, MACCSkeysFingerprint). If None, Morgan
+            fingerprints of radius 2 and 2048 bits.
+        n_jobs: int
+            The number of threads used to compute the fingerprints and to run the searches. If -1, all available
+            cores are used.
+        block_size: int
+            The number of queries and indexed fingerprints compared at a time.
+        """
+        fingerprint = fingerprint if fingerprint is not None else MorganFingerprint(n_jobs=n_jobs)
+        if not fingerprint._packable:
+            raise ValueError(f'{fingerprint.__class__.__name__} does not compute binary fingerprints.')
+        self.fingerprint = fingerprint
+        self.n_jobs = n_jobs
+        self.block_size = block_size
+        self.ids = None
+        self._words = None
+        self._counts = None
+        self._order = None
+
+    def __len__(self) -> int:
+        """
+        Get the number of indexed fingerprints.
+
+        Returns
+        -------
+        int
+            The number of indexed fingerprints.
+        """
+        return 0 if self._words is None else len(self._words)
+
+    def _fingerprints(self, molecules: Union[Dataset, List[str], List[Mol], np.ndarray]) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Computes the packed fingerprints of molecules.
+
+        Parameters
+        ----------
+        molecules: Union[Dataset, List[str], List[Mol], np.ndarray]
+            A dataset, SMILES strings, RDKit molecules or a dense array of binary fingerprints.
+
+        Returns
+        -------
+        words: np.ndarray
+            The packed fingerprints of the valid molecules.
+        valid: np.ndarray
+            Boolean mask of the molecules that could be featurized.
+        """
+        if isinstance(molecules, np.ndarray) and molecules.ndim == 2:
+            return pack_fingerprints(molecules), np.ones(len(molecules), dtype=bool)
+        mols = molecules.mols if isinstance(molecules, Dataset) else molecules
+        mols = np.array([smiles_to_mol(mol) if isinstance(mol, str) else mol for mol in mols], dtype=object)
+        with self.fingerprint._get_multiprocessing_class() as multiprocessing_cls:
+            features, remove_mols = self.fingerprint._compute_features(multiprocessing_cls, mols)
+        if len(features) == 0:
+            n_words = 0 if self._words is None else self._words.shape[1]
+            return np.zeros((0, n_words), dtype=np.uint64), ~remove_mols
+        if self.fingerprint.packed:
+            features = np.unpackbits(np.asarray(features, dtype=np.uint8), axis=1,
+                                     count=len(self.fingerprint.feature_names))
+        return pack_fingerprints(np.asarray(features)), ~remove_mols
+
+    def build(self, dataset: Dataset) -> 'FingerprintIndex':
+        """
+        Indexes the molecules of a dataset (replacing the indexed molecules, if any).
+
+        Parameters
+        ----------
+        dataset: Dataset
+            The dataset to index. Molecules that can not be featurized are not indexed.
+
+        Returns
+        -------
+        FingerprintIndex
+            The index.
+        """
+        words, valid = self._fingerprints(dataset)
+        if len(words) == 0:
+            raise ValueError('The dataset has no molecules that can be indexed.')
+        counts = popcount64(words).sum(axis=1, dtype=np.int32)
+        order = np.argsort(counts, kind='stable')
+        self._words = np.ascontiguousarray(words[order])
+        self._counts = counts[order]
+        self._order = np.flatnonzero(valid)[order]
+        self.ids = np.asarray(dataset.ids)
+        return self
+
+    def _window(self, low: float, high: float) -> Tuple[int, int]:
+        """
+        Get the positions of the indexed fingerprints with a number of set bits in a range.
+
+        Parameters
+        ----------
+        low: float
+            The minimum number of set bits.
+        high: float
+            The maximum number of set bits.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The first and end positions of the fingerprints (sorted by number of set bits).
+        """
+        return (int(np.searchsorted(self._counts, low, side='left')),
+                int(np.searchsorted(self._counts, high, side='right')))
+
+    def _query_blocks(self, queries: Union[Dataset, List[str], List[Mol], np.ndarray]) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[Tuple[int, int]]]:
+        """
+        Computes the packed fingerprints of the queries, sorted by number of set bits, and splits them in blocks.
+
+        Parameters
+        ----------
+        queries: Union[Dataset, List[str], List[Mol], np.ndarray]
+            The query molecules or fingerprints.
+
+        Returns
+        -------
+        words: np.ndarray
+            The packed fingerprints of the valid queries, sorted by number of set bits.
+        counts: np.ndarray
+            The number of set bits of the sorted queries.
+        rows: np.ndarray
+            The index of each sorted query in the queries.
+        blocks: List[Tuple[int, int]]
+            The first and end positions of each block of sorted queries.
+        """
+        if self._words is None:
+            raise ValueError('The index is empty. Build it with a dataset first.')
+        words, valid = self._fingerprints(queries)
+        if words.shape[1] != self._words.shape[1]:
+            raise ValueError('The queries must have the same number of bits as the indexed fingerprints.')
+        counts = popcount64(words).sum(axis=1, dtype=np.int32)
+        order = np.argsort(counts, kind='stable')
+        blocks = [(start, min(start + self.block_size, len(order))) for start in range(0, len(order), self.block_size)]
+        return words[order], counts[order], np.flatnonzero(valid)[order], blocks
+
+    def _knn_block(self, words: np.ndarray, counts: np.ndarray, k: int, start: int, stop: int) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the k most similar indexed fingerprints of a block of queries.
+        The search starts with the indexed fingerprints with the same numbers of set bits as the queries and widens
+        until the upper bound of the similarity of the fingerprints left out is below the k-th similarity found for
+        every query.
+
+        Parameters
+        ----------
+        words: np.ndarray
+            The packed fingerprints of the queries.
+        counts: np.ndarray
+            The number of set bits of the queries.
+        k: int
+            The number of neighbours.
+        start: int
+            The first query of the block.
+        stop: int
+            The end of the queries of the block.
+
+        Returns
+        -------
+        similarities: np.ndarray
+            The similarities of the neighbours of each query, in decreasing order.
+        positions: np.ndarray
+            The positions (in the sorted index) of the neighbours of each query.
+        """
+        words, counts = words[start:stop], counts[start:stop]
+        best = np.full((len(words), k), -1, dtype=np.float32)
+        best_positions = np.full((len(words), k), -1, dtype=np.int64)
+        low, high = self._window(counts.min(), counts.max())
+        pending = [(low, high)]
+        step = max(high - low, self.block_size)
+        while True:
+            for column_start, column_stop in pending:
+                for chunk_start in range(column_start, column_stop, self.block_size):
+                    chunk_stop = min(chunk_start + self.block_size, column_stop)
+                    block = tanimoto_block(words, counts, self._words[chunk_start:chunk_stop],
+                                           self._counts[chunk_start:chunk_stop])
+                    candidates = np.concatenate([best, block], axis=1)
+                    positions = np.concatenate(
+                        [best_positions, np.broadcast_to(np.arange(chunk_start, chunk_stop), block.shape)], axis=1)
+                    top = np.argpartition(-candidates, k - 1, axis=1)[:, :k]
+                    best = np.take_along_axis(candidates, top, axis=1)
+                    best_positions = np.take_along_axis(positions, top, axis=1)
+            if low == 0 and high == len(self._words):
+                break
+            # Swamidass-Baldi bounds of the fingerprints out of the window
+            bound = np.zeros(len(words), dtype=np.float64)
+            if low > 0:
+                np.maximum(bound, np.divide(self._counts[low - 1], counts, out=np.zeros(len(words)),
+                                            where=counts > 0), out=bound)
+            if high < len(self._words):
+                np.maximum(bound, np.divide(counts, self._counts[high], out=np.zeros(len(words)),
+                                            where=self._counts[high] > 0), out=bound)
+            if (best.min(axis=1) >= np.minimum(bound, 1)).all():
+                break
+            new_low, new_high = max(low - step, 0), min(high + step, len(self._words))
+            pending = [(new_low, low), (high, new_high)]
+            low, high = new_low, new_high
+            step *= 2
+        order = np.argsort(-best, axis=1, kind='stable')
+        return np.take_along_axis(best, order, axis=1), np.take_along_axis(best_positions, order, axis=1)
+
+    def knn(self, queries: Union[Dataset, List[str], List[Mol], np.ndarray], k: int = 5) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the k most similar indexed molecules of each query.
+
+        Parameters
+        ----------
+        queries: Union[Dataset, List[str], List[Mol], np.ndarray]
+            The query molecules (a dataset, SMILES strings or RDKit molecules) or a dense array of their binary
+            fingerprints.
+        k: int
+            The number of neighbours.
+
+        Returns
+        -------
+        similarities: np.ndarray
+            Float32 array with shape (n_queries, k) with the Tanimoto similarities of the neighbours, in decreasing
+            order. Queries that can not be featurized have similarities of -1.
+        indices: np.ndarray
+            Array with shape (n_queries, k) with the indices of the neighbours in the indexed dataset (use the ids
+            attribute to get their ids). Queries that can not be featurized have indices of -1.
+        """
+        if k < 1:
+            raise ValueError('k must be a positive number of neighbours.')
+        words, counts, rows, blocks = self._query_blocks(queries)
+        k = min(k, len(self))
+        n_queries = len(queries)
+        similarities = np.full((n_queries, k), -1, dtype=np.float32)
+        indices = np.full((n_queries, k), -1, dtype=np.int64)
+        process = partial(self._knn_block, words, counts, k)
+        with ThreadMultiprocessing(n_jobs=self.n_jobs, process=process, chunk_size=1) as multiprocessing_cls:
+            results = multiprocessing_cls.run(blocks)
+        for (start, stop), (block_similarities, positions) in zip(blocks, results):
+            similarities[rows[start:stop]] = block_similarities
+            indices[rows[start:stop]] = self._order[positions]
+        return similarities, indices
+
+    def _range_block(self, words: np.ndarray, counts: np.ndarray, threshold: float, start: int, stop: int) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Finds the indexed fingerprints with a similarity above a threshold to a block of queries.
+
+        Parameters
+        ----------
+        words: np.ndarray
+            The packed fingerprints of the queries.
+        counts: np.ndarray
+            The number of set bits of the queries.
+        threshold: float
+            The minimum similarity.
+        start: int
+            The first query of the block.
+        stop: int
+            The end of the queries of the block.
+
+        Returns
+        -------
+        rows: np.ndarray
+            The positions of the queries (in the block) of the similarities found.
+        positions: np.ndarray
+            The positions (in the sorted index) of the fingerprints found.
+        similarities: np.ndarray
+            The similarities found.
+        """
+        words, counts = words[start:stop], counts[start:stop]
+        if threshold > 0:
+            low, high = self._window(np.ceil(threshold * counts.min() - 1e-6), np.floor(counts.max() / threshold + 1e-6))
+        else:
+            low, high = 0, len(self._words)
+        rows, positions, similarities = [], [], []
+        for chunk_start in range(low, high, self.block_size):
+            chunk_stop = min(chunk_start + self.block_size, high)
+            block = tanimoto_block(words, counts, self._words[chunk_start:chunk_stop],
+                                   self._counts[chunk_start:chunk_stop])
+            block_rows, block_columns = np.nonzero((block >= threshold) & (block > 0))
+            rows.append(block_rows)
+            positions.append(block_columns + chunk_start)
+            similarities.append(block[block_rows, block_columns])
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return np.concatenate(rows), np.concatenate(positions), np.concatenate(similarities)
+
+    def range_query(self, queries: Union[Dataset, List[str], List[Mol], np.ndarray], threshold: float) \
+            -> sp.csr_matrix:
+        """
+        Finds the indexed molecules with a Tanimoto similarity above a threshold to each query.
+
+        Parameters
+        ----------
+        queries: Union[Dataset, List[str], List[Mol], np.ndarray]
+            The query molecules (a dataset, SMILES strings or RDKit molecules) or a dense array of their binary
+            fingerprints.
+        threshold: float
+            The minimum similarity.
+
+        Returns
+        -------
+        sp.csr_matrix
+            Matrix with shape (n_queries, n_indexed_molecules) with the similarities above the threshold (columns
+            in the order of the indexed dataset). Queries that can not be featurized have empty rows.
+        """
+        words, counts, rows, blocks = self._query_blocks(queries)
+        process = partial(self._range_block, words, counts, threshold)
+        with ThreadMultiprocessing(n_jobs=self.n_jobs, process=process, chunk_size=1) as multiprocessing_cls:
+            results = multiprocessing_cls.run(blocks)
+        query_rows = [rows[start + block_rows] for (start, _), (block_rows, _, _) in zip(blocks, results)]
+        columns = [self._order[positions] for _, positions, _ in results]
+        similarities = [block_similarities for _, _, block_similarities in results]
+        return sp.csr_matrix((np.concatenate([np.zeros(0, dtype=np.float32)] + similarities),
+                              (np.concatenate([np.zeros(0, dtype=np.int64)] + query_rows),
+                               np.concatenate([np.zeros(0, dtype=np.int64)] + columns))),
+                             shape=(len(queries), len(self.ids)))
+
+    def save(self, file_path: str) -> None:
+        """
+        Saves the index to a file (e.g. next to the model trained on the indexed dataset).
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the file where the index will be saved.
+        """
+        joblib.dump(self, file_path)
+
+    @classmethod
+    def load(cls, file_path: str) -> 'FingerprintIndex':
+        """
+        Loads an index saved with save.
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the file where the index is saved.
+
+        Returns
+        -------
+        FingerprintIndex
+            The index.
+        """
+        index = joblib.load(file_path)
+        if not isinstance(index, cls):
+            raise ValueError(f'{file_path} does not contain a {cls.__name__}.')
+        return index
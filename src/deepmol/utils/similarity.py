@@ -0,0 +1,450 @@
+from functools import partial
+from typing import Any, List, Tuple, Union
+
+import numpy as np
+import scipy.sparse as sp
+from rdkit import DataStructs
+
+from deepmol.parallelism.multiprocessing import ThreadMultiprocessing
+
+# similarity metrics of binary fingerprints computed from the numbers of common and set bits
+SIMILARITY_METRICS = ('tanimoto', 'dice', 'cosine')
+
+# number of set bits of each byte value (used when numpy has no bitwise_count)
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount64(words: np.ndarray) -> np.ndarray:
+    """
+    Counts the set bits of each 64 bit word.
+
+    Parameters
+    ----------
+    words: np.ndarray
+        Array of uint64 values.
+
+    Returns
+    -------
+    np.ndarray
+        Array with the same shape with the number of set bits of each word.
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words)
+    words = np.ascontiguousarray(words)
+    return _POPCOUNT_TABLE[words.view(np.uint8)].reshape(words.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+def pack_fingerprints(fingerprints: Any) -> np.ndarray:
+    """
+    Packs binary fingerprints into rows of 64 bit words.
+
+    Parameters
+    ----------
+    fingerprints: Any
+        The fingerprints: RDKit bit vectors, a dense two dimensional array of 0s and 1s or PackedFingerprints.
+        Arrays of uint64 words (already packed) are returned as they are.
+
+    Returns
+    -------
+    np.ndarray
+        Array of uint64 words with shape (n_fingerprints, ceil(n_bits / 64)).
+    """
+    if hasattr(fingerprints, 'packed'):
+        packed = fingerprints.packed
+    elif isinstance(fingerprints, np.ndarray) and fingerprints.dtype == np.uint64 and fingerprints.ndim == 2:
+        return fingerprints
+    elif isinstance(fingerprints, np.ndarray):
+        packed = np.packbits(fingerprints != 0, axis=1)
+    else:
+        fingerprints = list(fingerprints)
+        n_bits = fingerprints[0].GetNumBits() if fingerprints else 0
+        packed = np.zeros((len(fingerprints), (n_bits + 7) // 8), dtype=np.uint8)
+        bits = np.zeros(n_bits, dtype=np.uint8)
+        for i, fp in enumerate(fingerprints):
+            DataStructs.ConvertToNumpyArray(fp, bits)
+            packed[i] = np.packbits(bits)
+    packed = np.asarray(packed, dtype=np.uint8)
+    n_words = (packed.shape[1] + 7) // 8
+    words = np.zeros((packed.shape[0], n_words * 8), dtype=np.uint8)
+    words[:, :packed.shape[1]] = packed
+    return words.view(np.uint64)
+
+
+def _pack_pair(fingerprints: Any, other: Any = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Packs the two sets of fingerprints of a comparison and counts their set bits.
+
+    Parameters
+    ----------
+    fingerprints: Any
+        The fingerprints of the rows (see pack_fingerprints).
+    other: Any
+        The fingerprints of the columns. If None, the fingerprints are compared with themselves.
+
+    Returns
+    -------
+    words: np.ndarray
+        The packed fingerprints of the rows.
+    counts: np.ndarray
+        The number of set bits of the rows.
+    other_words: np.ndarray
+        The packed fingerprints of the columns.
+    other_counts: np.ndarray
+        The number of set bits of the columns.
+    """
+    words = pack_fingerprints(fingerprints)
+    other_words = words if other is None else pack_fingerprints(other)
+    if words.shape[1] != other_words.shape[1]:
+        raise ValueError('The fingerprints must have the same number of bits to be compared.')
+    counts = popcount64(words).sum(axis=1, dtype=np.int32)
+    other_counts = counts if other is None else popcount64(other_words).sum(axis=1, dtype=np.int32)
+    return words, counts, other_words, other_counts
+
+
+def similarity_from_counts(common: np.ndarray,
+                           counts: np.ndarray,
+                           other_counts: np.ndarray,
+                           metric: str = 'tanimoto') -> np.ndarray:
+    """
+    Computes the similarities of pairs of binary fingerprints from their numbers of common and set bits.
+
+    Parameters
+    ----------
+    common: np.ndarray
+        The number of common set bits of each pair.
+    counts: np.ndarray
+        The number of set bits of the first fingerprint of each pair (broadcast against common).
+    other_counts: np.ndarray
+        The number of set bits of the second fingerprint of each pair (broadcast against common).
+    metric: str
+        The similarity metric: 'tanimoto' (common / union), 'dice' (2 * common / (counts + other_counts)) or
+        'cosine' (common / sqrt(counts * other_counts)).
+
+    Returns
+    -------
+    np.ndarray
+        Float32 array with the similarities. The similarity with an empty fingerprint is 0.
+    """
+    if metric == 'tanimoto':
+        numerator, denominator = common, counts + other_counts - common
+    elif metric == 'dice':
+        numerator, denominator = 2 * common, counts + other_counts
+    elif metric == 'cosine':
+        numerator, denominator = common, np.sqrt(counts * other_counts.astype(np.float64))
+    else:
+        raise ValueError(f'Unknown similarity metric {metric}. Available metrics: {list(SIMILARITY_METRICS)}')
+    numerator, denominator = np.broadcast_arrays(numerator, denominator)
+    similarities = np.zeros(numerator.shape, dtype=np.float32)
+    np.divide(numerator, denominator, out=similarities, where=denominator > 0)
+    return similarities
+
+
+def count_common_bits(words: np.ndarray, other_words: np.ndarray) -> np.ndarray:
+    """
+    Counts the common set bits of every pair of packed fingerprints of two blocks.
+    The counts are accumulated one word at a time over the whole block (as an outer product), so the temporary arrays
+    have the size of the block.
+
+    Parameters
+    ----------
+    words: np.ndarray
+        The packed fingerprints of the rows of the block.
+    other_words: np.ndarray
+        The packed fingerprints of the columns of the block.
+
+    Returns
+    -------
+    np.ndarray
+        Int32 array with shape (len(words), len(other_words)) with the number of common set bits.
+    """
+    common = np.zeros((len(words), len(other_words)), dtype=np.int32)
+    for w in range(words.shape[1]):
+        common += popcount64(words[:, w, None] & other_words[None, :, w])
+    return common
+
+
+def tanimoto_block(words: np.ndarray,
+                   counts: np.ndarray,
+                   other_words: np.ndarray,
+                   other_counts: np.ndarray) -> np.ndarray:
+    """
+    Computes the Tanimoto similarities between two blocks of packed fingerprints.
+
+    Parameters
+    ----------
+    words: np.ndarray
+        The packed fingerprints of the rows of the block.
+    counts: np.ndarray
+        The number of set bits of the rows.
+    other_words: np.ndarray
+        The packed fingerprints of the columns of the block.
+    other_counts: np.ndarray
+        The number of set bits of the columns.
+
+    Returns
+    -------
+    np.ndarray
+        Float32 array with the similarities. The similarity of two empty fingerprints is 0.
+    """
+    common = count_common_bits(words, other_words)
+    return similarity_from_counts(common, counts[:, None], other_counts[None, :])
+
+
+def _fill_tanimoto_block(output: np.ndarray,
+                         words: np.ndarray,
+                         counts: np.ndarray,
+                         other_words: np.ndarray,
+                         other_counts: np.ndarray,
+                         symmetric: bool,
+                         row_start: int,
+                         row_stop: int,
+                         column_start: int,
+                         column_stop: int) -> None:
+    """
+    Computes a block of the similarity matrix and writes it to the output (and its mirror, for symmetric matrices).
+
+    Parameters
+    ----------
+    output: np.ndarray
+        The similarity matrix.
+    words: np.ndarray
+        The packed fingerprints of the rows of the matrix.
+    counts: np.ndarray
+        The number of set bits of the rows.
+    other_words: np.ndarray
+        The packed fingerprints of the columns of the matrix.
+    other_counts: np.ndarray
+        The number of set bits of the columns.
+    symmetric: bool
+        Whether the rows and the columns are the same fingerprints.
+    row_start: int
+        The first row of the block.
+    row_stop: int
+        The end of the rows of the block.
+    column_start: int
+        The first column of the block.
+    column_stop: int
+        The end of the columns of the block.
+    """
+    block = tanimoto_block(words[row_start:row_stop], counts[row_start:row_stop],
+                           other_words[column_start:column_stop], other_counts[column_start:column_stop])
+    output[row_start:row_stop, column_start:column_stop] = block
+    if symmetric and row_start != column_start:
+        output[column_start:column_stop, row_start:row_stop] = block.T
+
+
+def _blocks(n_rows: int, n_columns: int, block_size: int, symmetric: bool) -> List[Tuple[int, int, int, int]]:
+    """
+    Splits a matrix into square blocks (only the upper triangle for symmetric matrices).
+
+    Parameters
+    ----------
+    n_rows: int
+        The number of rows of the matrix.
+    n_columns: int
+        The number of columns of the matrix.
+    block_size: int
+        The number of rows and columns of each block.
+    symmetric: bool
+        Whether the matrix is symmetric.
+
+    Returns
+    -------
+    List[Tuple[int, int, int, int]]
+        The first row, end row, first column and end column of each block.
+    """
+    blocks = []
+    for row_start in range(0, n_rows, block_size):
+        first_column = row_start if symmetric else 0
+        for column_start in range(first_column, n_columns, block_size):
+            blocks.append((row_start, min(row_start + block_size, n_rows),
+                           column_start, min(column_start + block_size, n_columns)))
+    return blocks
+
+
+def tanimoto_matrix(fingerprints: Any,
+                    other: Any = None,
+                    dtype: Union[np.dtype, str] = np.float32,
+                    block_size: int = 512,
+                    n_jobs: int = -1,
+                    path: str = None) -> np.ndarray:
+    """
+    Computes the Tanimoto similarities between two sets of binary fingerprints.
+    The fingerprints are packed in 64 bit words and the matrix is computed in square blocks with vectorized popcounts.
+    The blocks run in parallel threads (numpy releases the GIL) and only the upper triangle is computed when the
+    fingerprints are compared with themselves.
+
+    Parameters
+    ----------
+    fingerprints: Any
+        The fingerprints of the rows (see pack_fingerprints).
+    other: Any
+        The fingerprints of the columns. If None, the fingerprints are compared with themselves.
+    dtype: Union[np.dtype, str]
+        The dtype of the matrix (e.g. float32 or float16).
+    block_size: int
+        The number of rows and columns of each block.
+    n_jobs: int
+        The number of threads. If -1, all available cores are used.
+    path: str
+        If given, the matrix is written to a memory-mapped .npy file at this path instead of memory.
+
+    Returns
+    -------
+    np.ndarray
+        The similarity matrix with shape (len(fingerprints), len(other)). The similarity of two empty fingerprints is 0.
+    """
+    symmetric = other is None
+    words, counts, other_words, other_counts = _pack_pair(fingerprints, other)
+    shape = (len(words), len(other_words))
+    if path is not None:
+        output = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+    else:
+        output = np.empty(shape, dtype=dtype)
+    process = partial(_fill_tanimoto_block, output, words, counts, other_words, other_counts, symmetric)
+    with ThreadMultiprocessing(n_jobs=n_jobs, process=process, chunk_size=1) as multiprocessing_cls:
+        multiprocessing_cls.run(_blocks(shape[0], shape[1], block_size, symmetric))
+    if path is not None:
+        output.flush()
+    return output
+
+
+def _neighbors_block(words: np.ndarray,
+                     counts: np.ndarray,
+                     other_words: np.ndarray,
+                     other_counts: np.ndarray,
+                     k: int,
+                     threshold: float,
+                     exclude_self: bool,
+                     block_size: int,
+                     row_start: int,
+                     row_stop: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Finds the most similar columns of a block of rows, comparing the rows with one block of columns at a time.
+
+    Parameters
+    ----------
+    words: np.ndarray
+        The packed fingerprints of the rows.
+    counts: np.ndarray
+        The number of set bits of the rows.
+    other_words: np.ndarray
+        The packed fingerprints of the columns.
+    other_counts: np.ndarray
+        The number of set bits of the columns.
+    k: int
+        The number of most similar columns kept per row (None to keep all the columns above the threshold).
+    threshold: float
+        The minimum similarity of the kept columns (None for no minimum).
+    exclude_self: bool
+        Whether to skip the column with the same index as the row.
+    block_size: int
+        The number of columns compared at a time.
+    row_start: int
+        The first row of the block.
+    row_stop: int
+        The end of the rows of the block.
+
+    Returns
+    -------
+    rows: np.ndarray
+        The rows of the kept similarities.
+    columns: np.ndarray
+        The columns of the kept similarities.
+    similarities: np.ndarray
+        The kept similarities.
+    """
+    n_rows = row_stop - row_start
+    row_indexes = np.arange(row_start, row_stop)
+    if k is not None:
+        best = np.full((n_rows, k), -1, dtype=np.float32)
+        best_columns = np.zeros((n_rows, k), dtype=np.int64)
+    rows, columns, similarities = [], [], []
+    for column_start in range(0, len(other_words), block_size):
+        column_stop = min(column_start + block_size, len(other_words))
+        block = tanimoto_block(words[row_start:row_stop], counts[row_start:row_stop],
+                               other_words[column_start:column_stop], other_counts[column_start:column_stop])
+        # similarities that are not kept are marked with -1
+        if exclude_self:
+            block[row_indexes[:, None] == np.arange(column_start, column_stop)[None, :]] = -1
+        if threshold is not None:
+            block[block < threshold] = -1
+        if k is None:
+            block_rows, block_columns = np.nonzero(block > 0)
+            rows.append(block_rows + row_start)
+            columns.append(block_columns + column_start)
+            similarities.append(block[block_rows, block_columns])
+            continue
+        candidates = np.concatenate([best, block], axis=1)
+        candidate_columns = np.concatenate(
+            [best_columns, np.broadcast_to(np.arange(column_start, column_stop), block.shape)], axis=1)
+        if candidates.shape[1] > k:
+            top = np.argpartition(-candidates, k - 1, axis=1)[:, :k]
+            best = np.take_along_axis(candidates, top, axis=1)
+            best_columns = np.take_along_axis(candidate_columns, top, axis=1)
+        else:
+            best, best_columns = candidates, candidate_columns
+    if k is not None:
+        keep = best > 0
+        return np.nonzero(keep)[0] + row_start, best_columns[keep], best[keep]
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return np.concatenate(rows), np.concatenate(columns), np.concatenate(similarities)
+
+
+def tanimoto_neighbors(fingerprints: Any,
+                       other: Any = None,
+                       k: int = None,
+                       threshold: float = None,
+                       exclude_self: bool = False,
+                       dtype: Union[np.dtype, str] = np.float32,
+                       block_size: int = 512,
+                       n_jobs: int = -1) -> sp.csr_matrix:
+    """
+    Computes the sparse matrix of the largest Tanimoto similarities between two sets of binary fingerprints: the k
+    most similar columns of each row and/or the similarities above a threshold.
+    The rows are processed in blocks (in parallel threads) against one block of columns at a time, so the memory used
+    is bounded by the number of threads and the block size, plus the kept similarities.
+
+    Parameters
+    ----------
+    fingerprints: Any
+        The fingerprints of the rows (see pack_fingerprints).
+    other: Any
+        The fingerprints of the columns. If None, the fingerprints are compared with themselves.
+    k: int
+        The number of most similar columns kept per row. If None, all the columns above the threshold are kept.
+    threshold: float
+        The minimum similarity of the kept columns. If None, the k most similar columns are kept.
+    exclude_self: bool
+        Whether to skip the similarity of each fingerprint with itself (only when other is None).
+    dtype: Union[np.dtype, str]
+        The dtype of the similarities (e.g. float32 or float16).
+    block_size: int
+        The number of rows and columns of the blocks compared at a time.
+    n_jobs: int
+        The number of threads. If -1, all available cores are used.
+
+    Returns
+    -------
+    sp.csr_matrix
+        Matrix with shape (len(fingerprints), len(other)) with the kept similarities. Null similarities are not stored.
+    """
+    if k is None and threshold is None:
+        raise ValueError('Either k or threshold must be given.')
+    if k is not None and k < 1:
+        raise ValueError('k must be a positive number of neighbours.')
+    exclude_self = exclude_self and other is None
+    words, counts, other_words, other_counts = _pack_pair(fingerprints, other)
+    shape = (len(words), len(other_words))
+    if k is not None:
+        k = min(k, shape[1])
+    process = partial(_neighbors_block, words, counts, other_words, other_counts, k, threshold, exclude_self,
+                      block_size)
+    blocks = [(start, min(start + block_size, shape[0])) for start in range(0, shape[0], block_size)]
+    with ThreadMultiprocessing(n_jobs=n_jobs, process=process, chunk_size=1) as multiprocessing_cls:
+        results = multiprocessing_cls.run(blocks)
+    rows = np.concatenate([np.zeros(0, dtype=np.int64)] + [result[0] for result in results])
+    columns = np.concatenate([np.zeros(0, dtype=np.int64)] + [result[1] for result in results])
+    similarities = np.concatenate([np.zeros(0, dtype=np.float32)] + [result[2] for result in results])
+    return sp.csr_matrix((similarities.astype(dtype), (rows, columns)), shape=shape)
@@ -1,4 +1,5 @@
 import random
+import threading
 
 import pandas as pd
 import joblib
@@ -20,11 +21,82 @@ from PIL import Image
 from IPython.display import display
 
 from deepmol.loggers import Logger
+from deepmol.parallelism.multiprocessing import JoblibMultiprocessing
+from deepmol.utils.cache import LRUCache
+
+# in-process memos of SMILES parsing and writing (shared by the pipeline steps)
+_smiles_to_mol_cache = LRUCache(4096)
+_mol_to_smiles_cache = LRUCache(4096)
+_memo_lock = threading.Lock()
+_missing = object()
+
+
+def set_memo_size(max_size: int) -> None:
+    """
+    Sets the maximum number of entries of the in-process memos of smiles_to_mol and mol_to_smiles. A size
+    of 0 disables memoization.
+
+    Parameters
+    ----------
+    max_size: int
+        The maximum number of entries of each memo.
+    """
+    with _memo_lock:
+        for cache in (_smiles_to_mol_cache, _mol_to_smiles_cache):
+            cache.max_size = max_size
+            cache.clear()
+
+
+def clear_memos() -> None:
+    """
+    Removes all the entries of the in-process memos of smiles_to_mol and mol_to_smiles.
+    """
+    with _memo_lock:
+        for cache in (_smiles_to_mol_cache, _mol_to_smiles_cache):
+            cache.clear()
+
+
+def _memo_get(cache: LRUCache, key: Any) -> Any:
+    """
+    Get a value of a memo (thread-safe).
+
+    Parameters
+    ----------
+    cache: LRUCache
+        The memo.
+    key: Any
+        The key.
+
+    Returns
+    -------
+    Any
+        The value or _missing if the key is not in the memo.
+    """
+    with _memo_lock:
+        return cache.get(key, _missing)
+
+
+def _memo_put(cache: LRUCache, key: Any, value: Any) -> None:
+    """
+    Adds a value to a memo (thread-safe).
+
+    Parameters
+    ----------
+    cache: LRUCache
+        The memo.
+    key: Any
+        The key.
+    value: Any
+        The value.
+    """
+    with _memo_lock:
+        cache.put(key, value)
 
 
 def smiles_to_mol(smiles: str, **kwargs) -> Union[Mol, None]:
     """
     Convert SMILES to RDKit molecule object.
+    The molecules are memoized by SMILES string and each call returns a new copy.
     Parameters
     ----------
     smiles: str
@@ -37,14 +109,24 @@ def smiles_to_mol(smiles: str, **kwargs) -> Union[Mol, None]:
         RDKit molecule object.
     """
     try:
-        return Chem.MolFromSmiles(smiles, **kwargs)
+        key = (smiles, tuple(sorted(kwargs.items())))
+        mol = _memo_get(_smiles_to_mol_cache, key)
     except TypeError:
-        return None
+        key, mol = None, _missing
+    if mol is _missing:
+        try:
+            mol = Chem.MolFromSmiles(smiles, **kwargs)
+        except TypeError:
+            return None
+        if key is not None:
+            _memo_put(_smiles_to_mol_cache, key, mol)
+    return Chem.Mol(mol) if mol is not None else None
 
 
 def mol_to_smiles(mol: Mol, **kwargs) -> Union[str, None]:
     """
     Convert SMILES to RDKit molecule object.
+    The SMILES strings are memoized by the binary pickle of the molecule.
     Parameters
     ----------
     mol: Mol
@@ -56,10 +138,72 @@ def mol_to_smiles(mol: Mol, **kwargs) -> Union[str, None]:
     smiles: str
         SMILES string.
     """
+    if not isinstance(mol, Mol):
+        return None
     try:
-        return Chem.MolToSmiles(mol, **kwargs)
+        key = (mol.ToBinary(), tuple(sorted(kwargs.items())))
+        smiles = _memo_get(_mol_to_smiles_cache, key)
     except TypeError:
-        return None
+        key, smiles = None, _missing
+    if smiles is _missing:
+        try:
+            smiles = Chem.MolToSmiles(mol, **kwargs)
+        except TypeError:
+            return None
+        if key is not None:
+            _memo_put(_mol_to_smiles_cache, key, smiles)
+    return smiles
+
+
+def _valid_smiles_mask(smiles: np.ndarray) -> np.ndarray:
+    """
+    Checks which SMILES strings of an array can be converted to RDKit molecule objects.
+
+    Parameters
+    ----------
+    smiles: np.ndarray
+        SMILES strings to check.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask, True for the valid SMILES strings.
+    """
+    mask = np.zeros(len(smiles), dtype=bool)
+    for i, s in enumerate(smiles):
+        # the molecules are not memoized (see smiles_to_mol), as they are only needed for the check
+        try:
+            mask[i] = Chem.MolFromSmiles(s) is not None
+        except TypeError:
+            pass
+    return mask
+
+
+def validate_smiles(smiles: Union[List[str], np.ndarray], n_jobs: int = 1) -> np.ndarray:
+    """
+    Checks which SMILES strings can be parsed into RDKit molecule objects.
+    The molecules are only used for the check and are not kept in memory.
+    When n_jobs is not 1, the SMILES are split into contiguous chunks that are checked in parallel.
+
+    Parameters
+    ----------
+    smiles: Union[List[str], np.ndarray]
+        SMILES strings to check.
+    n_jobs: int
+        The number of jobs to use. If -1, all available cores are used.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask, True for the valid SMILES strings.
+    """
+    smiles = np.asarray(smiles)
+    n_chunks = joblib.cpu_count() if n_jobs == -1 else n_jobs
+    if n_chunks <= 1 or len(smiles) < 2 * n_chunks:
+        return _valid_smiles_mask(smiles)
+    chunks = np.array_split(smiles, n_chunks)
+    masks = JoblibMultiprocessing(process=_valid_smiles_mask, n_jobs=n_jobs).run(chunks)
+    return np.concatenate(list(masks))
 
 
 def canonicalize_mol_object(mol_object: Mol) -> Mol:
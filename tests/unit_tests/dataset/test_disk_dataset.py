@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from rdkit.Chem import Mol
+
+from deepmol.datasets import DiskDataset, SmilesDataset
+
+
+class TestDiskDataset(TestCase):
+
+    def setUp(self) -> None:
+        self.output_dir = tempfile.mkdtemp()
+        self.dataset = DiskDataset(os.path.join(self.output_dir, 'dataset'),
+                                   smiles=['C', 'CC', 'CCC(', 'CCC', 'CCCC', 'CCCCC'],
+                                   X=[[1, 0, 1], [0, 1, np.nan], [1, 1, 1], [1, 0, 0], [0, 0, 1], [1, 1, 0]],
+                                   y=[1, 0, 1, 0, 1, 0],
+                                   ids=[1, 2, 3, 4, 5, 6],
+                                   feature_names=['a', 'b', 'c'],
+                                   chunk_size=2)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.output_dir)
+        if os.path.exists('deepmol.log'):
+            os.remove('deepmol.log')
+
+    def test_disk_dataset_args(self):
+        self.assertEqual(len(self.dataset), 5)
+        self.assertEqual(list(self.dataset.ids), ['1', '2', '4', '5', '6'])
+        self.assertIsInstance(self.dataset.X, np.memmap)
+        self.assertEqual(self.dataset.X.shape, (5, 3))
+        self.assertEqual(self.dataset.mode, 'classification')
+        for mol in self.dataset.mols:
+            self.assertIsInstance(mol, Mol)
+
+        loaded = DiskDataset.load(os.path.join(self.output_dir, 'dataset'))
+        self.assertEqual(list(loaded.smiles), ['C', 'CC', 'CCC', 'CCCC', 'CCCCC'])
+        self.assertEqual(list(loaded.feature_names), ['a', 'b', 'c'])
+        self.assertEqual(loaded.mode, 'classification')
+
+        with self.assertRaises(ValueError):
+            DiskDataset.load(os.path.join(self.output_dir, 'not_a_dataset'))
+
+    def test_select_and_remove(self):
+        self.dataset.remove_elements(['1', '5'])
+        self.assertEqual(list(self.dataset.ids), ['2', '4', '6'])
+        self.assertEqual(list(self.dataset.y), [0, 0, 0])
+        self.dataset.select_features_by_name(['a', 'c'])
+        self.assertEqual(self.dataset.X.shape, (3, 2))
+        self.assertEqual(list(self.dataset.feature_names), ['a', 'c'])
+        self.assertEqual(self.dataset.X[2].tolist(), [1, 0])
+
+    def test_remove_nan(self):
+        self.dataset.remove_nan(axis=1)
+        self.assertEqual(len(self.dataset), 5)
+        self.assertEqual(list(self.dataset.feature_names), ['a', 'b'])
+
+        dataset = DiskDataset.from_dataset(SmilesDataset(smiles=['C', 'CC', 'CCC'], X=[[1, 0], [np.nan, 1], [1, 1]]),
+                                           os.path.join(self.output_dir, 'nan'), chunk_size=2)
+        dataset.remove_nan(axis=0)
+        self.assertEqual(list(dataset.smiles), ['C', 'CCC'])
+
+    def test_select_to_split_and_merge(self):
+        split = self.dataset.select_to_split([4, 0], data_dir=os.path.join(self.output_dir, 'split'))
+        self.assertEqual(list(split.ids), ['6', '1'])
+        self.assertEqual(split.X.tolist(), [[1, 1, 0], [1, 0, 1]])
+        self.assertEqual(list(split.feature_names), ['a', 'b', 'c'])
+
+        other = SmilesDataset(smiles=['CCO'], X=[[2, 2, 2]], y=[1], ids=['7'])
+        merged = split.merge([other], data_dir=os.path.join(self.output_dir, 'merged'))
+        self.assertEqual(list(merged.ids), ['6', '1', '7'])
+        self.assertEqual(merged.X.shape, (3, 3))
+        self.assertEqual(list(merged.y), [0, 1, 1])
+
+        with self.assertRaises(ValueError):
+            split.merge([split])
+
+    def test_save_features(self):
+        path = os.path.join(self.output_dir, 'features.csv')
+        self.dataset.save_features(path)
+        df = pd.read_csv(path)
+        self.assertEqual(df.shape, (5, 3))
+        self.assertEqual(list(df.columns), ['a', 'b', 'c'])
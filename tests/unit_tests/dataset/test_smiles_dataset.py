@@ -1,12 +1,19 @@
 import os
 import shutil
-from unittest import TestCase
+import tempfile
+from unittest import TestCase, skipIf
 
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from rdkit.Chem import Mol, MolFromSmiles
 
-from deepmol.datasets import SmilesDataset
+from deepmol.datasets import SmilesDataset, DatasetView, PackedFingerprints
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
 
 
 class TestSmilesDataset(TestCase):
@@ -253,6 +260,27 @@ class TestSmilesDataset(TestCase):
         self.assertEqual(df.X.shape, (4, 2))
         self.assertEqual(df.feature_names, ['XXX', 'ZZZ'])
 
+    def test_remove_elements(self):
+        dataset = SmilesDataset(smiles=['C', 'CC', 'CCC', 'CCCC', 'CCCCC'],
+                                X=[[1, 0], [0, 1], [1, 1], [0, 0], [2, 2]],
+                                y=[1, 0, 1, 0, 1],
+                                ids=[1, 2, 3, 4, 5])
+        dataset.remove_elements(['2', '4', 'not_in_dataset'])
+        self.assertEqual(len(dataset), 3)
+        self.assertEqual(list(dataset.ids), ['1', '3', '5'])
+        self.assertEqual(list(dataset.smiles), ['C', 'CCC', 'CCCCC'])
+        self.assertEqual(dataset.X.shape, (3, 2))
+        self.assertEqual(list(dataset.y), [1, 1, 1])
+
+        dataset.remove_elements_by_index([0])
+        self.assertEqual(list(dataset.ids), ['3', '5'])
+
+        dataset.select(['5', '3'])
+        self.assertEqual(list(dataset.ids), ['3', '5'])
+        dataset.select(['5'])
+        self.assertEqual(list(dataset.ids), ['5'])
+        self.assertEqual(list(dataset.smiles), ['CCCCC'])
+
     def test_select_to_split(self):
         dataset = SmilesDataset(smiles=['C', 'CC', 'CCC', 'CCCC', 'CCCCC'],
                                 X=[[1, 0, 1], [0, 1, 0], [1, 0, 1], [1, 0, 1], [1, 0, 1]],
@@ -280,6 +308,189 @@ class TestSmilesDataset(TestCase):
         self.assertEqual(len(split2.ids), 3)
         self.assertEqual(split2.n_tasks, 1)
 
+    def test_select_to_split_view(self):
+        dataset = SmilesDataset(smiles=['C', 'CC', 'CCC', 'CCCC', 'CCCCC'],
+                                X=[[1, 0], [0, 1], [1, 1], [0, 0], [2, 2]],
+                                y=[1, 0, 1, 0, 1],
+                                ids=[1, 2, 3, 4, 5])
+        split = dataset.select_to_split([4, 0, 2])
+        self.assertIsInstance(split, DatasetView)
+        self.assertFalse(split.is_materialized)
+        self.assertEqual(list(split.ids), ['5', '1', '3'])
+        self.assertEqual(split.X.tolist(), [[2, 2], [1, 0], [1, 1]])
+
+        sub_split = split.select_to_split([1, 2])
+        self.assertEqual(list(sub_split.ids), ['1', '3'])
+        self.assertEqual(list(sub_split.smiles), ['C', 'CCC'])
+
+        split.remove_elements(['1'])
+        self.assertTrue(split.is_materialized)
+        self.assertEqual(list(split.ids), ['5', '3'])
+        self.assertEqual(len(dataset), 5)
+        self.assertEqual(list(sub_split.ids), ['1', '3'])
+
+        split.select_features_by_index([1])
+        self.assertEqual(split.X.shape, (2, 1))
+        self.assertEqual(dataset.X.shape, (5, 2))
+
+    def test_view_gathers_rows_once(self):
+        dataset = SmilesDataset(smiles=['C', 'CC', 'CCC', 'CCCC', 'CCCCC'],
+                                X=[[1, 0], [0, 1], [1, 1], [0, 0], [2, 2]],
+                                y=[1, 0, 1, 0, 1],
+                                ids=[1, 2, 3, 4, 5])
+        split = dataset.select_to_split([4, 0, 2])
+        y = split.y
+        self.assertIs(split.y, y)
+        self.assertEqual([split.y[i] for i in range(len(split))], [1, 1, 1])
+        self.assertFalse(split.is_materialized)
+
+        X = split.X
+        split.remove_elements(['1'])
+        self.assertTrue(split.is_materialized)
+        self.assertEqual(split.X.tolist(), [[2, 2], [1, 1]])
+        self.assertEqual(X.tolist(), [[2, 2], [1, 0], [1, 1]])
+        self.assertEqual(dataset.X.tolist(), [[1, 0], [0, 1], [1, 1], [0, 0], [2, 2]])
+
+        # the rows are gathered again when the view points to a new parent array
+        split = dataset.select_to_split([1, 3])
+        self.assertEqual(split.y.tolist(), [0, 0])
+        split._arrays['y'] = np.array([5, 6, 7, 8, 9])
+        self.assertEqual(split.y.tolist(), [6, 8])
+
+    def test_lazy_mols(self):
+        dataset = SmilesDataset(smiles=['C', 'CC', 'CCCCC(', 'CCC', 'CCCC'],
+                                X=[[1, 0], [0, 1], [1, 1], [0, 0], [2, 2]],
+                                y=[1, 0, 1, 0, 1],
+                                lazy_mols=True)
+        self.assertTrue(dataset.lazy_mols)
+        self.assertEqual(len(dataset), 4)
+        self.assertEqual(len(dataset.mols), 4)
+        self.assertEqual(list(dataset.smiles), ['C', 'CC', 'CCC', 'CCCC'])
+        for mol in dataset.mols:
+            self.assertIsInstance(mol, Mol)
+        self.assertEqual(dataset.mols[2].GetNumAtoms(), 3)
+
+        dataset.remove_elements([dataset.ids[0]])
+        self.assertEqual(len(dataset.mols), 3)
+        self.assertEqual(dataset.mols[0].GetNumAtoms(), 2)
+
+        split = dataset.select_to_split([2, 0])
+        self.assertEqual([mol.GetNumAtoms() for mol in split.mols], [4, 2])
+
+        merged = dataset.merge([SmilesDataset(smiles=['CCCCCC'], X=[[3, 3]], y=[0])])
+        self.assertTrue(merged.lazy_mols)
+        self.assertEqual(len(merged.mols), 4)
+        self.assertEqual(merged.mols[3].GetNumAtoms(), 6)
+        self.assertEqual(len(np.array(merged.mols)), 4)
+
+    def test_iterbatches(self):
+        dataset = SmilesDataset(smiles=['C', 'CC', 'CCC', 'CCCC', 'CCCCC'],
+                                X=[[1, 0], [0, 1], [1, 1], [0, 0], [2, 2]],
+                                y=[1, 0, 1, 0, 1],
+                                ids=[1, 2, 3, 4, 5])
+        batches = list(dataset.iterbatches(batch_size=2, deterministic=True))
+        self.assertEqual([list(ids) for _, _, _, ids in batches], [['1', '2'], ['3', '4'], ['5']])
+        X_batch, y_batch, w_batch, _ = batches[0]
+        self.assertTrue(np.shares_memory(X_batch, dataset.X))
+        self.assertEqual(y_batch.tolist(), [1, 0])
+        self.assertEqual(w_batch.tolist(), [1, 1])
+
+        batches = list(dataset.iterbatches(batch_size=2, epochs=2, pad_batches=True))
+        self.assertEqual(len(batches), 6)
+        self.assertTrue(all(len(ids) == 2 for _, _, _, ids in batches))
+        self.assertEqual(set(np.concatenate([ids for _, _, _, ids in batches[:3]])), {'1', '2', '3', '4', '5'})
+
+        self.assertEqual(len(list(dataset.iterbatches())), 1)
+
+        split = dataset.select_to_split([4, 0, 2])
+        batches = list(split.iterbatches(batch_size=2, deterministic=True))
+        self.assertEqual([X.tolist() for X, _, _, _ in batches], [[[2, 2], [1, 0]], [[1, 1]]])
+        self.assertFalse(split.is_materialized)
+
+    def test_packed_fingerprints(self):
+        X = np.array([[1, 0, 1, 1, 0, 0, 0, 0, 1], [0, 0, 0, 0, 0, 0, 0, 0, 0], [1, 1, 1, 1, 0, 0, 0, 0, 1]])
+        packed = PackedFingerprints.from_dense(X)
+        self.assertEqual(packed.shape, (3, 9))
+        self.assertEqual(packed.packed.shape, (3, 2))
+        self.assertEqual(packed[0].tolist(), [1, 0, 1, 1, 0, 0, 0, 0, 1])
+        self.assertEqual(packed[:, [0, 1]].tolist(), [[1, 0], [0, 0], [1, 1]])
+        self.assertTrue(np.array_equal(np.asarray(packed[[2, 0]]), X[[2, 0]]))
+
+        similarities = packed.tanimoto()
+        self.assertEqual(similarities.dtype, np.float32)
+        self.assertAlmostEqual(similarities[0, 2], 0.8, places=6)
+        self.assertEqual(similarities[1].tolist(), [0, 0, 0])
+        self.assertEqual(similarities[2, 2], 1)
+
+        dataset = SmilesDataset(smiles=['C', 'CC', 'CCC'], X=packed, y=[1, 0, 1])
+        self.assertTrue(dataset.packed)
+        dataset.remove_elements([dataset.ids[1]])
+        self.assertIsInstance(dataset.X, PackedFingerprints)
+        self.assertEqual(dataset.X.shape, (2, 9))
+        merged = dataset.merge([SmilesDataset(smiles=['CCCC'], X=packed[[1]], y=[0])])
+        self.assertIsInstance(merged.X, PackedFingerprints)
+        self.assertEqual(merged.X.shape, (3, 9))
+
+    def test_sparse_features(self):
+        X = sp.csr_matrix(np.array([[1, 0, 0, 2], [0, 0, np.nan, 0], [1, 0, 0, 2], [0, 3, 0, 0]]))
+        dataset = SmilesDataset(smiles=['C', 'CC', 'CCC', 'CCCC'], X=X, y=[1, 0, 1, 0], ids=[1, 2, 3, 4],
+                                feature_names=['a', 'b', 'c', 'd'])
+        self.assertTrue(dataset.sparse)
+        dataset.remove_nan(axis=1)
+        self.assertIsInstance(dataset.X, sp.csr_matrix)
+        self.assertEqual(dataset.X.shape, (4, 3))
+        self.assertEqual(list(dataset.feature_names), ['a', 'b', 'd'])
+
+        dataset.remove_nan(axis=0)
+        self.assertEqual(len(dataset), 4)
+        dataset.remove_duplicates()
+        self.assertEqual(list(dataset.ids), ['1', '2', '4'])
+
+        dataset.select_features_by_name(['b', 'd'])
+        self.assertIsInstance(dataset.X, sp.csr_matrix)
+        self.assertEqual(dataset.X.toarray().tolist(), [[0, 2], [0, 0], [3, 0]])
+
+        X_batch, _, _, _ = next(dataset.iterbatches(batch_size=2, deterministic=True))
+        self.assertTrue(sp.issparse(X_batch))
+
+        merged = dataset.merge([SmilesDataset(smiles=['CCCCC'], X=[[4, 4]], y=[1], ids=[5])])
+        self.assertIsInstance(merged.X, sp.csr_matrix)
+        self.assertEqual(merged.X.shape, (4, 2))
+
+    @skipIf(pyarrow is None, 'pyarrow not available')
+    def test_parquet(self):
+        dataset = SmilesDataset(smiles=['C', 'CC', 'CCC'],
+                                X=np.array([[1, 0.5], [0, np.nan], [2, 2]], dtype=np.float32),
+                                y=[[1, 0], [0, 1], [1, 1]],
+                                ids=['a', 'b', 'c'],
+                                feature_names=['f1', 'f2'],
+                                label_names=['l1', 'l2'],
+                                mode=['classification', 'classification'])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dataset.parquet')
+            dataset.to_parquet(path)
+
+            loaded = SmilesDataset.from_parquet(path)
+            self.assertEqual(list(loaded.ids), ['a', 'b', 'c'])
+            self.assertEqual(list(loaded.smiles), ['C', 'CC', 'CCC'])
+            self.assertEqual(loaded.X.dtype, np.float32)
+            self.assertTrue(np.array_equal(loaded.X, dataset.X, equal_nan=True))
+            self.assertEqual(loaded.y.tolist(), [[1, 0], [0, 1], [1, 1]])
+            self.assertEqual(list(loaded.feature_names), ['f1', 'f2'])
+            self.assertEqual(list(loaded.label_names), ['l1', 'l2'])
+            self.assertEqual(loaded.mode, ['classification', 'classification'])
+            self.assertEqual(loaded.mols[1].GetNumAtoms(), 2)
+
+            projected = SmilesDataset.from_parquet(path, columns=['X'])
+            self.assertIsNone(projected.y)
+            self.assertEqual(projected.X.shape, (3, 2))
+
+            packed = SmilesDataset(smiles=['C', 'CC'], X=PackedFingerprints.from_dense([[1, 0, 1], [0, 1, 1]]))
+            packed.to_parquet(path)
+            loaded = SmilesDataset.from_parquet(path)
+            self.assertIsInstance(loaded.X, PackedFingerprints)
+            self.assertEqual(np.asarray(loaded.X).tolist(), [[1, 0, 1], [0, 1, 1]])
+
     def test_merge(self):
         d1 = SmilesDataset(smiles=['CCCCCCCCCC', 'CCCCCCCCCCCCCCC'],
                            X=[[1, 0, 1], [0, 1, 0]],
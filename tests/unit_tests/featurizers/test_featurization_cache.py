@@ -0,0 +1,79 @@
+import os
+import pickle
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from deepmol.compound_featurization import FeaturizationCache, MACCSkeysFingerprint, MorganFingerprint, \
+    TwoDimensionDescriptors
+from deepmol.datasets import SmilesDataset
+
+
+class TestFeaturizationCache(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.cache = FeaturizationCache(os.path.join(self.directory, 'features.sqlite'))
+        self.smiles = ['CCO', 'c1ccccc1', 'CCN', 'CCCC', 'CC(=O)O', 'CCCl', 'OCC', 'invalid']
+
+    def tearDown(self) -> None:
+        self.cache.close()
+        shutil.rmtree(self.directory)
+        if os.path.exists('deepmol.log'):
+            os.remove('deepmol.log')
+
+    def test_cached_featurization(self):
+        expected = MorganFingerprint(n_jobs=1).featurize(SmilesDataset(smiles=self.smiles))
+        first = MorganFingerprint(n_jobs=1, cache=self.cache).featurize(SmilesDataset(smiles=self.smiles))
+        np.testing.assert_array_equal(first.X, expected.X)
+        # 'CCO' and 'OCC' have the same canonical SMILES
+        self.assertEqual(len(self.cache), 6)
+
+        self.cache.hits, self.cache.misses = 0, 0
+        second = MorganFingerprint(n_jobs=1, cache=self.cache).featurize(SmilesDataset(smiles=self.smiles))
+        np.testing.assert_array_equal(second.X, expected.X)
+        self.assertEqual(list(second.smiles), list(expected.smiles))
+        self.assertEqual(self.cache.hits, 7)
+        self.assertEqual(self.cache.misses, 0)
+
+        MorganFingerprint(n_jobs=1, radius=3, cache=self.cache).featurize(SmilesDataset(smiles=self.smiles))
+        self.assertEqual(len(self.cache), 12)
+
+    def test_same_featurizer(self):
+        # the state built lazily by the featurizer (e.g. its fingerprint generator) is not part of the keys
+        featurizer = MACCSkeysFingerprint(n_jobs=1, cache=self.cache)
+        key = FeaturizationCache.featurizer_key(featurizer)
+        featurizer.featurize(SmilesDataset(smiles=self.smiles))
+        self.assertEqual(FeaturizationCache.featurizer_key(featurizer), key)
+
+        self.cache.hits, self.cache.misses = 0, 0
+        featurizer.featurize(SmilesDataset(smiles=self.smiles))
+        self.assertEqual(self.cache.hits, 7)
+        self.assertEqual(self.cache.misses, 0)
+
+    def test_partial_hits(self):
+        featurizer = TwoDimensionDescriptors(n_jobs=1, cache=self.cache)
+        featurizer.featurize(SmilesDataset(smiles=self.smiles[:3]))
+        features = featurizer.featurize(SmilesDataset(smiles=self.smiles)).X
+        expected = TwoDimensionDescriptors(n_jobs=1).featurize(SmilesDataset(smiles=self.smiles)).X
+        np.testing.assert_allclose(features, expected)
+        # the first three molecules and OCC (same canonical SMILES as CCO)
+        self.assertEqual(self.cache.hits, 4)
+
+    def test_eviction(self):
+        cache = FeaturizationCache(os.path.join(self.directory, 'small.sqlite'), max_size=1000)
+        MorganFingerprint(n_jobs=1, cache=cache).featurize(SmilesDataset(smiles=self.smiles))
+        self.assertLessEqual(cache.size, 1000)
+        self.assertLess(len(cache), 6)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        cache.close()
+
+    def test_pickle(self):
+        self.assertEqual(len(self.cache), 0)
+        cache = pickle.loads(pickle.dumps(self.cache))
+        self.assertIsNone(cache._connection)
+        self.assertEqual(cache.path, self.cache.path)
+        cache.close()
@@ -2,6 +2,7 @@ import os
 from copy import copy
 from unittest import TestCase
 
+import numpy as np
 from rdkit import Chem
 from rdkit.Chem import MolFromSmiles
 from rdkit.Chem.rdMolAlign import AlignMol
@@ -10,7 +11,9 @@ from deepmol.compound_featurization.rdkit_descriptors import ThreeDimensionalMol
     AutoCorr3D, \
     RadialDistributionFunction, PlaneOfBestFit, MORSE, WHIM, RadiusOfGyration, InertialShapeFactor, Eccentricity, \
     Asphericity, SpherocityIndex, PrincipalMomentsOfInertia, NormalizedPrincipalMomentsRatios, \
-    generate_conformers_to_sdf_file, TwoDimensionDescriptors, get_all_3D_descriptors
+    generate_conformers_to_sdf_file, TwoDimensionDescriptors, get_all_3D_descriptors, descriptor_costs
+from deepmol.datasets import SmilesDataset
+from deepmol.utils.errors import PreConditionViolationException
 from tests.unit_tests.featurizers.test_featurizers import FeaturizerTestCase
 
 
@@ -27,6 +30,29 @@ class Test2DDescriptors(FeaturizerTestCase, TestCase):
         TwoDimensionDescriptors().featurize(dataset)
         self.assertEqual(dataset_rows_number, dataset._X.shape[0])
 
+    def test_descriptor_subset(self):
+        smiles = ['CCO', 'c1ccccc1O', 'CC(=O)Nc1ccc(O)cc1']
+        full = TwoDimensionDescriptors(n_jobs=1).featurize(SmilesDataset(smiles=smiles))
+        names = ['MolLogP', 'TPSA', 'NumHDonors']
+        subset = TwoDimensionDescriptors(descriptors=names, n_jobs=2).featurize(SmilesDataset(smiles=smiles))
+        self.assertEqual(subset.feature_names.tolist(), names)
+        columns = [full.feature_names.tolist().index(name) for name in names]
+        np.testing.assert_allclose(subset.X, full.X[:, columns])
+
+        with self.assertRaises(ValueError):
+            TwoDimensionDescriptors(descriptors=['MolLogP', 'NotADescriptor'])
+
+    def test_time_budget(self):
+        costs = descriptor_costs(descriptors=['MolLogP', 'TPSA', 'qed', 'Ipc'])
+        self.assertEqual(set(costs), {'MolLogP', 'TPSA', 'qed', 'Ipc'})
+        self.assertTrue(all(cost >= 0 for cost in costs.values()))
+
+        costs = {'MolLogP': 1e-4, 'TPSA': 2e-5, 'qed': 2e-3, 'Ipc': 1e-3}
+        featurizer = TwoDimensionDescriptors(descriptors=list(costs), time_budget=5e-4, costs=costs)
+        self.assertEqual(featurizer.feature_names, ['MolLogP', 'TPSA'])
+        with self.assertRaises(ValueError):
+            TwoDimensionDescriptors(descriptors=list(costs), time_budget=1e-6, costs=costs)
+
 
 class Test3DDescriptors(FeaturizerTestCase, TestCase):
 
@@ -108,11 +134,9 @@ class Test3DDescriptors(FeaturizerTestCase, TestCase):
         self.valid_3D_featurizers_with_nan(NormalizedPrincipalMomentsRatios, mandatory_generation_of_conformers=True)
 
     def valid_featurize_to_fail(self, method, **kwargs):
-        with self.assertRaises(SystemExit) as cm:
+        with self.assertRaises(PreConditionViolationException):
             method(**kwargs).featurize(self.mock_dataset)
 
-        self.assertEqual(cm.exception.code, 1)
-
     def test_featurize_to_fail(self):
         self.valid_featurize_to_fail(All3DDescriptors, mandatory_generation_of_conformers=False)
         self.valid_featurize_to_fail(AutoCorr3D, mandatory_generation_of_conformers=False)
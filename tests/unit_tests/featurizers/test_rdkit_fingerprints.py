@@ -1,9 +1,21 @@
+import os
+import pickle
+import tempfile
 from copy import copy
 from unittest import TestCase
 
+import numpy as np
+import scipy.sparse as sp
+from rdkit import Chem
+from rdkit.Chem import rdMolDescriptors, rdmolops
+
 from deepmol.compound_featurization import MorganFingerprint, \
     MACCSkeysFingerprint, \
     LayeredFingerprint, RDKFingerprint, AtomPairFingerprint
+from deepmol.compound_featurization import TwoDimensionDescriptors
+from deepmol.datasets import DiskDataset, SmilesDataset, PackedFingerprints
+from deepmol.feature_selection import LowVarianceFS
+from deepmol.scalers import MaxAbsScaler, StandardScaler
 from tests.unit_tests.featurizers.test_featurizers import FeaturizerTestCase
 
 
@@ -49,3 +61,96 @@ class TestRDKitFingerprints(FeaturizerTestCase, TestCase):
         dataset = copy(self.mock_dataset_with_invalid)
         RDKFingerprint().featurize(dataset)
         self.assertEqual(dataset_rows_number, dataset._X.shape[0])
+
+    def test_featurize_disk_dataset(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            dataset = DiskDataset(data_dir, smiles=self.original_smiles_with_invalid, chunk_size=3)
+            dataset_rows_number = len(dataset)
+            MorganFingerprint(n_jobs=1).featurize(dataset)
+            self.assertEqual((dataset_rows_number, 2048), dataset.X.shape)
+            self.assertEqual(len(dataset.feature_names), 2048)
+            self.assertTrue(os.path.exists(os.path.join(data_dir, 'X.npy')))
+
+    def test_featurize_packed(self):
+        dense = MorganFingerprint(n_jobs=1).featurize(SmilesDataset(smiles=self.original_smiles_with_invalid))
+        dataset = MorganFingerprint(n_jobs=1, packed=True).featurize(
+            SmilesDataset(smiles=self.original_smiles_with_invalid))
+        self.assertTrue(dataset.packed)
+        self.assertIsInstance(dataset.X, PackedFingerprints)
+        self.assertEqual(dataset.X.shape, dense.X.shape)
+        self.assertEqual(dataset.X.packed.shape, (len(dataset), 256))
+        self.assertTrue(np.array_equal(np.asarray(dataset.X), dense.X))
+
+        X_batch, _, _, _ = next(dataset.iterbatches(batch_size=2, deterministic=True))
+        self.assertEqual(X_batch.dtype, np.float32)
+        self.assertTrue(np.array_equal(X_batch, dense.X[:2]))
+
+        with self.assertRaises(ValueError):
+            TwoDimensionDescriptors(packed=True)
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            dataset = DiskDataset(data_dir, smiles=self.original_smiles_with_invalid, chunk_size=3)
+            MACCSkeysFingerprint(n_jobs=1, packed=True).featurize(dataset)
+            self.assertEqual(dataset.X.dtype, np.uint8)
+            self.assertEqual(dataset.X.shape, (len(dataset), 167))
+
+    def test_featurize_sparse(self):
+        dense = MorganFingerprint(n_jobs=1).featurize(SmilesDataset(smiles=self.original_smiles_with_invalid))
+        dataset = MorganFingerprint(n_jobs=1, sparse=True).featurize(
+            SmilesDataset(smiles=self.original_smiles_with_invalid))
+        self.assertTrue(dataset.sparse)
+        self.assertIsInstance(dataset.X, sp.csr_matrix)
+        self.assertTrue(np.array_equal(dataset.X.toarray(), dense.X))
+
+        MaxAbsScaler().fit_transform(dataset, columns=[2, 0, 1])
+        self.assertIsInstance(dataset.X, sp.csr_matrix)
+        self.assertTrue(np.array_equal(dataset.X.toarray(), dense.X))
+
+        LowVarianceFS(threshold=0.1).select_features(dataset)
+        self.assertTrue(dataset.sparse)
+        self.assertEqual(dataset.X.shape[1], len(dataset.feature_names))
+        self.assertLess(dataset.X.shape[1], 2048)
+
+        with self.assertRaises(ValueError):
+            MorganFingerprint(packed=True, sparse=True)
+
+    def test_fingerprint_generators(self):
+        smiles = ['CC(=O)Oc1ccccc1C(=O)O', 'C[C@H](N)C(=O)O', 'c1ccc2ccccc2c1', 'CCN(CC)CC', 'OC1CCCCC1']
+        mols = [Chem.MolFromSmiles(s) for s in smiles]
+        legacy = {
+            MorganFingerprint(chiral=True): lambda m: rdMolDescriptors.GetMorganFingerprintAsBitVect(
+                m, 2, nBits=2048, useChirality=True),
+            MorganFingerprint(radius=3, size=1024, features=True): lambda m: rdMolDescriptors.
+            GetMorganFingerprintAsBitVect(m, 3, nBits=1024, useFeatures=True),
+            RDKFingerprint(): lambda m: rdmolops.RDKFingerprint(m),
+            RDKFingerprint(tgtDensity=0.3): lambda m: rdmolops.RDKFingerprint(m, tgtDensity=0.3),
+            AtomPairFingerprint(): lambda m: rdMolDescriptors.GetHashedAtomPairFingerprintAsBitVect(m),
+            AtomPairFingerprint(nBitsPerEntry=2): lambda m: rdMolDescriptors.GetHashedAtomPairFingerprintAsBitVect(
+                m, nBitsPerEntry=2),
+        }
+        for featurizer, fingerprint in legacy.items():
+            for mol in mols:
+                features = featurizer._featurize(mol)
+                self.assertEqual(features.dtype, np.uint8)
+                self.assertTrue(np.array_equal(features, np.array(list(fingerprint(mol)))))
+
+        # the generators are not pickled, the workers build their own
+        featurizer = pickle.loads(pickle.dumps(MorganFingerprint()))
+        self.assertTrue(np.array_equal(featurizer._featurize(mols[0]), MorganFingerprint()._featurize(mols[0])))
+
+        # the rows are computed as uint8, the datasets keep float32 features
+        dataset = MorganFingerprint(n_jobs=2).featurize(SmilesDataset(smiles=smiles))
+        self.assertEqual(dataset.X.dtype, np.float32)
+        self.assertTrue(np.array_equal(dataset.X, MorganFingerprint(n_jobs=1).featurize(
+            SmilesDataset(smiles=smiles)).X))
+
+        scaled = MorganFingerprint(n_jobs=1).featurize(SmilesDataset(smiles=smiles))
+        StandardScaler().fit_transform(scaled)
+        self.assertEqual(scaled.X.dtype, np.float32)
+        np.testing.assert_allclose(scaled.X.mean(axis=0), 0, atol=1e-6)
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            disk_dataset = DiskDataset(data_dir, smiles=smiles, chunk_size=2)
+            MorganFingerprint(n_jobs=1).featurize(disk_dataset)
+            self.assertEqual(disk_dataset.X.dtype, np.float32)
+            self.assertTrue(np.array_equal(disk_dataset.X, dataset.X))
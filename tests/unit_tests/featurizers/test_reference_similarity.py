@@ -0,0 +1,69 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+from rdkit import Chem, DataStructs
+from rdkit.Chem import AllChem, MACCSkeys
+
+from deepmol.compound_featurization import ReferenceSimilarity, MACCSkeysFingerprint, TwoDimensionDescriptors, \
+    FeaturizationCache
+from deepmol.datasets import SmilesDataset
+
+
+class TestReferenceSimilarity(TestCase):
+
+    def setUp(self) -> None:
+        self.anchors = ['CCO', 'c1ccccc1O', 'CC(=O)Nc1ccc(O)cc1']
+        self.smiles = ['CCCO', 'c1ccccc1', 'CC(=O)Oc1ccccc1C(=O)O', 'CCN(CC)CC', 'invalid', 'OCC']
+
+    def tearDown(self) -> None:
+        if os.path.exists('deepmol.log'):
+            os.remove('deepmol.log')
+
+    def test_metrics(self):
+        anchor_fps = [AllChem.GetMorganFingerprintAsBitVect(Chem.MolFromSmiles(s), 2, nBits=2048)
+                      for s in self.anchors]
+        expected = {'tanimoto': DataStructs.BulkTanimotoSimilarity,
+                    'dice': DataStructs.BulkDiceSimilarity,
+                    'cosine': DataStructs.BulkCosineSimilarity}
+        for metric, similarity in expected.items():
+            dataset = ReferenceSimilarity(self.anchors, metric=metric, n_jobs=1).featurize(
+                SmilesDataset(smiles=self.smiles))
+            self.assertEqual(dataset.X.shape, (5, 3))
+            self.assertEqual(dataset.X.dtype, np.float32)
+            self.assertEqual(list(dataset.feature_names), [f'{metric}_anchor_{i}' for i in range(3)])
+            for row, smiles in zip(dataset.X, dataset.smiles):
+                fp = AllChem.GetMorganFingerprintAsBitVect(Chem.MolFromSmiles(smiles), 2, nBits=2048)
+                np.testing.assert_allclose(row, similarity(fp, anchor_fps), atol=1e-6)
+
+    def test_fingerprint_and_anchors(self):
+        featurizer = ReferenceSimilarity(SmilesDataset(smiles=self.anchors), fingerprint=MACCSkeysFingerprint(),
+                                         n_jobs=2)
+        X = featurizer.featurize(SmilesDataset(smiles=self.smiles[:4])).X
+        anchor_fps = [MACCSkeys.GenMACCSKeys(Chem.MolFromSmiles(s)) for s in self.anchors]
+        fp = MACCSkeys.GenMACCSKeys(Chem.MolFromSmiles(self.smiles[0]))
+        np.testing.assert_allclose(X[0], DataStructs.BulkTanimotoSimilarity(fp, anchor_fps), atol=1e-6)
+
+        with self.assertRaises(ValueError):
+            ReferenceSimilarity(self.anchors, metric='euclidean')
+        with self.assertRaises(ValueError):
+            ReferenceSimilarity(self.anchors, fingerprint=TwoDimensionDescriptors())
+        with self.assertRaises(ValueError):
+            ReferenceSimilarity(['CCO', 'invalid'])
+
+    def test_save_load_and_cache(self):
+        featurizer = ReferenceSimilarity(self.anchors, n_jobs=1)
+        expected = featurizer.featurize(SmilesDataset(smiles=self.smiles)).X
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'anchors.pkl')
+            featurizer.save(path)
+            loaded = ReferenceSimilarity.load(path)
+            np.testing.assert_array_equal(loaded.featurize(SmilesDataset(smiles=self.smiles)).X, expected)
+
+            # featurizers with other anchors do not share the cached features
+            cache = FeaturizationCache(os.path.join(directory, 'cache.sqlite'))
+            ReferenceSimilarity(self.anchors, n_jobs=1, cache=cache).featurize(SmilesDataset(smiles=self.smiles))
+            ReferenceSimilarity(self.anchors[:2], n_jobs=1, cache=cache).featurize(SmilesDataset(smiles=self.smiles))
+            self.assertEqual(cache.hits, 0)
+            cache.close()
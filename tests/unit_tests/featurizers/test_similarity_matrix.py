@@ -1,6 +1,13 @@
+import os
+import tempfile
 from unittest import TestCase
 
+import numpy as np
+from rdkit import DataStructs
+from rdkit.Chem import AllChem
+
 from deepmol.compound_featurization import TanimotoSimilarityMatrix
+from deepmol.datasets import SmilesDataset
 from unit_tests.featurizers.test_featurizers import FeaturizerTestCase
 
 
@@ -11,3 +18,37 @@ class TestSimilarityMatrix(FeaturizerTestCase, TestCase):
         TanimotoSimilarityMatrix(n_molecules=dataset_rows_number).featurize(self.mock_dataset)
         self.assertEqual(dataset_rows_number, self.mock_dataset._X.shape[0])
         self.assertEqual(dataset_rows_number, self.mock_dataset._X.shape[1])
+
+    def test_similarities(self):
+        smiles = ['CCO', 'c1ccccc1O', 'CC(=O)Nc1ccc(O)cc1', 'CCN(CC)CC', 'CC(=O)Oc1ccccc1C(=O)O', 'OCC'] * 3
+        dataset = SmilesDataset(smiles=smiles)
+        fps = [AllChem.GetMorganFingerprintAsBitVect(mol, 2, nBits=1024) for mol in dataset.mols]
+        expected = np.array([DataStructs.BulkTanimotoSimilarity(fp, fps) for fp in fps])
+
+        TanimotoSimilarityMatrix(n_molecules=len(smiles), block_size=4, n_jobs=2).featurize(dataset)
+        self.assertEqual(dataset.X.dtype, np.float32)
+        np.testing.assert_allclose(dataset.X, expected, atol=1e-6)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'similarities.npy')
+            dataset = SmilesDataset(smiles=smiles)
+            TanimotoSimilarityMatrix(n_molecules=len(smiles), dtype=np.float16, path=path).featurize(dataset)
+            self.assertIsInstance(dataset.X, np.memmap)
+            self.assertEqual(dataset.X.dtype, np.float16)
+            np.testing.assert_allclose(np.load(path), expected, atol=1e-3)
+            del dataset
+
+    def test_sparse_neighbours(self):
+        smiles = ['CCO', 'c1ccccc1O', 'CC(=O)Nc1ccc(O)cc1', 'CCN(CC)CC', 'CC(=O)Oc1ccccc1C(=O)O', 'OCC', 'CCCO']
+        dense = TanimotoSimilarityMatrix(n_molecules=len(smiles)).featurize(SmilesDataset(smiles=smiles)).X
+
+        dataset = TanimotoSimilarityMatrix(n_molecules=len(smiles), k=2, block_size=3).featurize(
+            SmilesDataset(smiles=smiles))
+        self.assertTrue(dataset.sparse)
+        self.assertEqual(dataset.X.shape, (7, 7))
+        self.assertTrue((np.diff(dataset.X.indptr) <= 2).all())
+        np.testing.assert_allclose(np.sort(dataset.X.toarray(), axis=1)[:, -2:], np.sort(dense, axis=1)[:, -2:])
+
+        dataset = TanimotoSimilarityMatrix(n_molecules=len(smiles), threshold=0.3, block_size=2).featurize(
+            SmilesDataset(smiles=smiles))
+        np.testing.assert_allclose(dataset.X.toarray(), np.where(dense >= 0.3, dense, 0))
@@ -1,7 +1,13 @@
+import gzip
 import os
+import shutil
+import tempfile
 from unittest import TestCase
 
+import numpy as np
+
 from deepmol.loaders import SDFLoader, CSVLoader
+from deepmol.loaders._utils import read_sdf_file, sdf_chunk_offsets, load_offset_index
 from tests import TEST_DIR
 
 
@@ -44,6 +50,28 @@ class TestLoaders(TestCase):
         self.assertEqual(dataset4.X.shape, (3, 2))
         self.assertEqual(len(dataset4.y), 3)
 
+    def test_sdf_loader_chunks_and_gzip(self):
+        dataset = os.path.join(TEST_DIR, 'data', 'dataset_sweet_3D_to_test.sdf')
+        offsets = sdf_chunk_offsets(dataset, chunk_bytes=10000)
+        self.assertGreater(len(offsets), 1)
+        self.assertEqual(offsets[-1][1], os.path.getsize(dataset))
+
+        mols, properties = read_sdf_file(dataset, ['_Name'], n_jobs=1)
+        chunk_mols, chunk_properties = read_sdf_file(dataset, ['_Name'], n_jobs=2, chunk_bytes=10000)
+        self.assertEqual(len(mols), 100)
+        self.assertEqual(len(chunk_mols), 100)
+        self.assertEqual(list(chunk_properties['_Name']), list(properties['_Name']))
+
+        results = os.path.join(TEST_DIR, 'data', 'results_test.sdf')
+        with tempfile.TemporaryDirectory() as directory:
+            gzipped = os.path.join(directory, 'results_test.sdf.gz')
+            with open(results, 'rb') as f_in, gzip.open(gzipped, 'wb') as f_out:
+                shutil.copyfileobj(f_in, f_out)
+            loader = SDFLoader(gzipped, id_field='_ID', labels_fields=['_Class', '_Class2'])
+            sdf_dataset = loader.create_dataset()
+            self.assertEqual(len(sdf_dataset.mols), 5)
+            self.assertEqual(sdf_dataset.y.shape, (5, 2))
+
     def test_csv_loader(self):
         data_path = os.path.join(TEST_DIR, 'data')
         dataset_path = os.path.join(data_path, "train_dataset.csv")
@@ -73,3 +101,40 @@ class TestLoaders(TestCase):
         df3 = csv3.create_dataset()
         self.assertEqual(len(df3.mols), 10)
         self.assertEqual(df3.y.shape, (10, 2))
+
+    def test_csv_loader_iter_datasets(self):
+        dataset_path = os.path.join(TEST_DIR, 'data', 'tox21_small.csv')
+        loader = CSVLoader(dataset_path, smiles_field='smiles', id_field='mol_id', labels_fields=['NR-AR', 'SR-p53'])
+        shards = list(loader.iter_datasets(chunk_size=100))
+        self.assertEqual(len(shards), 5)
+        self.assertEqual(shards[0].y.shape[1], 2)
+        self.assertEqual(shards[0].ids[0], 'TOX3021')
+        self.assertEqual(sum(len(shard) for shard in shards), len(loader.create_dataset()))
+
+    def test_offset_index(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sdf_path = os.path.join(directory, 'dataset.sdf')
+            shutil.copy(os.path.join(TEST_DIR, 'data', 'dataset_sweet_3D_to_test.sdf'), sdf_path)
+            offsets = load_offset_index(sdf_path, 'sdf')
+            self.assertEqual(len(offsets), 101)
+            self.assertTrue(os.path.exists(sdf_path + '.offsets.npz'))
+            self.assertTrue(np.array_equal(load_offset_index(sdf_path, 'sdf'), offsets))
+
+            all_mols, properties = read_sdf_file(sdf_path, ['_Name'], n_jobs=1)
+            loader = SDFLoader(sdf_path, id_field='_Name', use_index=True, shard_size=10)
+            dataset = loader.load_range(40, 50)
+            self.assertEqual(list(dataset.ids), list(properties['_Name'][40:50]))
+            sample = loader.create_dataset()
+            self.assertEqual(len(sample.mols), 10)
+            self.assertEqual(len(set(sample.ids)), 10)
+
+            csv_path = os.path.join(directory, 'dataset.csv')
+            shutil.copy(os.path.join(TEST_DIR, 'data', 'tox21_small.csv'), csv_path)
+            loader = CSVLoader(csv_path, smiles_field='smiles', id_field='mol_id', labels_fields=['NR-AR'],
+                               shard_size=20, use_index=True)
+            full = CSVLoader(csv_path, smiles_field='smiles', id_field='mol_id').create_dataset()
+            dataset = loader.load_range(100, 110)
+            self.assertEqual(list(dataset.ids), list(full.ids[100:110]))
+            sample = loader.create_dataset()
+            self.assertEqual(len(set(sample.ids)), 20)
+            self.assertTrue(set(sample.ids).issubset(set(full.ids)))
@@ -1,6 +1,9 @@
 import copy
 from unittest import TestCase, skip
 
+import numpy as np
+
+from deepmol.datasets import SmilesDataset
 from deepmol.scalers import StandardScaler, MinMaxScaler, MaxAbsScaler, RobustScaler, PolynomialFeatures, Normalizer, \
     Binarizer, KernelCenterer, QuantileTransformer, PowerTransformer
 from unit_tests.scalers.test_scalers import ScalersTestCase
@@ -33,3 +36,19 @@ class SklearnScalersTestCase(ScalersTestCase, TestCase):
         scaler = PolynomialFeatures(degree=2)
         scaler.fit_transform(df)
         self.assertFalse((self.polynomial_features.X == df.X).all())
+
+
+class IntegerFeaturesScalingTestCase(TestCase):
+
+    def test_integer_features(self):
+        # the scaled values of integer features are not truncated
+        X = np.array([[0, 1], [1, 3], [1, 5], [0, 7]], dtype=np.uint8)
+        dataset = SmilesDataset(smiles=['CCO', 'CCN', 'CCC', 'CCCl'], X=X.copy())
+        scaler = StandardScaler()
+        scaler.fit_transform(dataset)
+        self.assertEqual(dataset.X.dtype, np.float64)
+        np.testing.assert_allclose(dataset.X, (X - X.mean(axis=0)) / X.std(axis=0))
+
+        dataset = SmilesDataset(smiles=['CCO', 'CCN'], X=np.array([[1, 3], [0, 7]], dtype=np.int64))
+        scaler.transform(dataset)
+        np.testing.assert_allclose(dataset.X, ([[1, 3], [0, 7]] - X.mean(axis=0)) / X.std(axis=0))
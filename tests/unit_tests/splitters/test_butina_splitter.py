@@ -1,10 +1,14 @@
 from unittest import TestCase, skip
+from unittest.mock import patch
 
 import numpy as np
 from rdkit import DataStructs
 from rdkit.Chem import AllChem
+from rdkit.ML.Cluster import Butina
 
+from deepmol.parallelism.multiprocessing import ThreadMultiprocessing
 from deepmol.splitters import ButinaSplitter
+from deepmol.splitters._utils import butina_clustering
 from unit_tests.splitters.test_splitters import SplittersTestCase
 
 
@@ -19,6 +23,24 @@ class ButinaSplitterTestCase(SplittersTestCase, TestCase):
         self.assertEqual(len(train_dataset.smiles), 4)
         self.assertEqual(len(test_dataset.smiles), 1)
 
+    def test_butina_clustering(self):
+        fps = [AllChem.GetMorganFingerprintAsBitVect(x, 2, 1024) for x in self.dataset_to_test.mols]
+        fps.append(DataStructs.ExplicitBitVect(1024))
+        dists = []
+        for i in range(1, len(fps)):
+            dists.extend([1 - x for x in DataStructs.BulkTanimotoSimilarity(fps[i], fps[:i])])
+        for cutoff in [0.2, 0.6, 0.7, 1.0]:
+            expected = Butina.ClusterData(dists, len(fps), cutoff, isDistData=True)
+            for block_size in [7, 1024]:
+                clusters = butina_clustering(fps, cutoff, n_jobs=2, block_size=block_size)
+                self.assertEqual(clusters, expected)
+
+        # the thread pool is closed after clustering
+        with patch.object(ThreadMultiprocessing, 'close', autospec=True,
+                          side_effect=ThreadMultiprocessing.close) as close:
+            butina_clustering(fps, 0.6, n_jobs=2, block_size=7)
+        close.assert_called_once()
+
     @skip("Not implemented yet!")
     def test_k_fold_split(self):
         butina_splitter = ButinaSplitter()
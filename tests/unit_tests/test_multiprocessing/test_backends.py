@@ -0,0 +1,93 @@
+import os
+from unittest import TestCase, skipIf
+
+import numpy as np
+
+from deepmol.compound_featurization import LayeredFingerprint, MorganFingerprint, RDKFingerprint
+from deepmol.datasets import SmilesDataset
+from deepmol.parallelism.backends import get_multiprocessing_class, set_default_backend, get_default_backend, \
+    register_backend, available_backends
+from deepmol.parallelism.multiprocessing import ThreadMultiprocessing, JoblibMultiprocessing, DaskMultiprocessing, \
+    MultiprocessingClass
+
+try:
+    from distributed import Client, LocalCluster
+except ImportError:
+    Client = None
+
+
+def square(x):
+    return x ** 2
+
+
+class TestBackends(TestCase):
+
+    def tearDown(self) -> None:
+        set_default_backend('auto')
+        if os.path.exists('deepmol.log'):
+            os.remove('deepmol.log')
+
+    def test_backends(self):
+        for backend in ['threads', 'loky', 'multiprocessing', 'executor']:
+            with get_multiprocessing_class(backend, n_jobs=2, process=square, chunk_size=2) as multiprocessing_cls:
+                self.assertEqual(list(multiprocessing_cls.run(list(range(9)))), [x ** 2 for x in range(9)])
+                output, failed = multiprocessing_cls.run_to_array(np.arange(5), (), np.int64)
+                self.assertEqual(output.tolist(), [0, 1, 4, 9, 16])
+                self.assertFalse(failed.any())
+
+    def test_auto_and_default_backend(self):
+        self.assertIsInstance(get_multiprocessing_class(gil_bound=True), JoblibMultiprocessing)
+        self.assertIsInstance(get_multiprocessing_class(gil_bound=False), ThreadMultiprocessing)
+
+        set_default_backend('threads')
+        self.assertEqual(get_default_backend(), 'threads')
+        self.assertIsInstance(get_multiprocessing_class(gil_bound=True), ThreadMultiprocessing)
+        self.assertIsInstance(get_multiprocessing_class('multiprocessing'), JoblibMultiprocessing)
+
+        with self.assertRaises(ValueError):
+            set_default_backend('not_a_backend')
+        with self.assertRaises(ValueError):
+            get_multiprocessing_class('not_a_backend')
+        with self.assertRaises(ValueError):
+            register_backend('auto', ThreadMultiprocessing)
+        with self.assertRaises(ValueError):
+            register_backend('list', list)
+
+        register_backend('custom_threads', ThreadMultiprocessing)
+        self.assertIn('custom_threads', available_backends())
+
+    def test_auto_backend_of_featurizers(self):
+        # RDKit releases the GIL in the topological and layered fingerprints
+        for featurizer in [RDKFingerprint(n_jobs=2), LayeredFingerprint(n_jobs=2)]:
+            multiprocessing_cls = get_multiprocessing_class('auto', n_jobs=2, gil_bound=featurizer._gil_bound)
+            self.assertIsInstance(multiprocessing_cls, ThreadMultiprocessing)
+            self.assertIsInstance(featurizer._get_multiprocessing_class(), ThreadMultiprocessing)
+        self.assertIsInstance(MorganFingerprint(n_jobs=2)._get_multiprocessing_class(), JoblibMultiprocessing)
+
+        smiles = ['CCO', 'c1ccccc1', 'CCN', 'CCCC', 'CC(=O)O', 'CCCl'] * 2
+        expected = RDKFingerprint(n_jobs=1).featurize(SmilesDataset(smiles=smiles)).X
+        features = RDKFingerprint(n_jobs=2).featurize(SmilesDataset(smiles=smiles)).X
+        np.testing.assert_array_equal(features, expected)
+
+    def test_unpicklable_process_runs_in_threads(self):
+        offset = 1
+        results = JoblibMultiprocessing(n_jobs=2, process=lambda x: x + offset).run([1, 2, 3])
+        self.assertEqual(list(results), [2, 3, 4])
+
+    def test_featurizer_backend(self):
+        smiles = ['CCO', 'c1ccccc1', 'CCN', 'CCCC', 'CC(=O)O', 'CCCl'] * 2
+        expected = MorganFingerprint(n_jobs=1).featurize(SmilesDataset(smiles=smiles)).X
+        features = MorganFingerprint(n_jobs=2, backend='threads').featurize(SmilesDataset(smiles=smiles)).X
+        np.testing.assert_array_equal(features, expected)
+
+        set_default_backend('loky')
+        features = MorganFingerprint(n_jobs=2).featurize(SmilesDataset(smiles=smiles)).X
+        np.testing.assert_array_equal(features, expected)
+
+    @skipIf(Client is None, "dask.distributed not installed")
+    def test_dask_backend(self):
+        with LocalCluster(n_workers=2, threads_per_worker=1, processes=False) as cluster, Client(cluster) as client:
+            multiprocessing_cls = DaskMultiprocessing(process=square, chunk_size=2, client=client)
+            self.assertIsInstance(multiprocessing_cls, MultiprocessingClass)
+            with multiprocessing_cls:
+                self.assertEqual(multiprocessing_cls.run(list(range(9))), [x ** 2 for x in range(9)])
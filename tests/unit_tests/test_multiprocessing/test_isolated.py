@@ -0,0 +1,62 @@
+import os
+import time
+from unittest import TestCase
+
+import numpy as np
+
+from deepmol.compound_featurization import MorganFingerprint
+from deepmol.datasets import SmilesDataset
+from deepmol.parallelism.multiprocessing import IsolatedMultiprocessing
+
+
+def fragile(x):
+    if x == 'hang':
+        time.sleep(60)
+    elif x == 'crash':
+        os._exit(3)
+    elif x == 'error':
+        raise ValueError('bad item')
+    return len(x), os.getpid()
+
+
+class TestIsolatedMultiprocessing(TestCase):
+
+    def tearDown(self) -> None:
+        if os.path.exists('deepmol.log'):
+            os.remove('deepmol.log')
+
+    def test_failures_are_recorded(self):
+        items = ['a', 'hang', 'bb', 'crash', 'ccc', 'error', 'dddd']
+        start = time.perf_counter()
+        with IsolatedMultiprocessing(n_jobs=2, process=fragile, chunk_size=3, timeout=1) as multiprocessing_cls:
+            results = multiprocessing_cls.run(items)
+            failures = multiprocessing_cls.failures
+        self.assertLess(time.perf_counter() - start, 30)
+        self.assertEqual([None if result is None else result[0] for result in results], [1, None, 2, None, 3, None, 4])
+        self.assertEqual([failure['index'] for failure in sorted(failures, key=lambda f: f['index'])], [1, 3, 5])
+        errors = {failure['item']: failure['error'] for failure in failures}
+        self.assertIn('timed out', errors['hang'])
+        self.assertIn('exited with code 3', errors['crash'])
+        self.assertIn('ValueError: bad item', errors['error'])
+
+    def test_worker_recycling(self):
+        items = [str(i) for i in range(10)]
+        with IsolatedMultiprocessing(n_jobs=1, process=fragile, chunk_size=5, max_tasks_per_worker=2) \
+                as multiprocessing_cls:
+            results = multiprocessing_cls.run(items)
+        self.assertEqual([result[0] for result in results], [1] * 10)
+        pids = [result[1] for result in results]
+        self.assertEqual(len(set(pids)), 5)
+        self.assertTrue(all(pids[i] == pids[i + 1] for i in range(0, 10, 2)))
+
+        with IsolatedMultiprocessing(n_jobs=1, process=fragile, max_memory_per_worker=1) as multiprocessing_cls:
+            results = multiprocessing_cls.run(items[:3])
+        self.assertEqual(len({result[1] for result in results}), 3)
+
+    def test_featurize_with_isolated_backend(self):
+        smiles = ['CCO', 'c1ccccc1', 'CCN', 'CCCC', 'CC(=O)O', 'CCCl']
+        expected = MorganFingerprint(n_jobs=1).featurize(SmilesDataset(smiles=smiles)).X
+        backend = IsolatedMultiprocessing(n_jobs=2, timeout=30)
+        features = MorganFingerprint(backend=backend).featurize(SmilesDataset(smiles=smiles)).X
+        np.testing.assert_array_equal(features, expected)
+        self.assertEqual(backend.failures, [])
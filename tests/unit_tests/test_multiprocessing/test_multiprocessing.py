@@ -1,5 +1,9 @@
 import os
+from collections.abc import Sequence
 from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
 
 from deepmol.parallelism.multiprocessing import JoblibMultiprocessing
 
@@ -8,6 +12,30 @@ def divide(a, b):
     return a / b
 
 
+def powers(x):
+    if x < 0:
+        return None
+    return np.array([x, x ** 2, x ** 3], dtype=np.float64)
+
+
+class DispatchRecorder(Sequence):
+    """
+    Items that count the chunks taken from them (each chunk is dispatched as a slice of the items).
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.dispatched = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            self.dispatched += 1
+        return self.items[index]
+
+
 class TestMultiProcessing(TestCase):
 
     def tearDown(self) -> None:
@@ -44,3 +72,48 @@ class TestMultiProcessing(TestCase):
             JoblibMultiprocessing(n_jobs=5, process=divide).run([(1, 0), (2, 1), (3, 2)])
 
         JoblibMultiprocessing(n_jobs=5, process=divide).run_iteratively([(1, 1), (2, 1), (3, 2)])
+
+    def test_multiprocessing_chunks(self):
+        results = JoblibMultiprocessing(n_jobs=2, process=divide, chunk_size=2).run([(i, 2) for i in range(7)])
+        self.assertEqual(list(results), [i / 2 for i in range(7)])
+
+    def test_multiprocessing_run_to_array(self):
+        items = [1, 2, -1, 3, 4, -2, 5]
+        expected = np.array([[x, x ** 2, x ** 3] if x >= 0 else [0, 0, 0] for x in items], dtype=np.float64)
+        with JoblibMultiprocessing(n_jobs=2, process=powers, chunk_size=2) as multiprocessing_cls:
+            for _ in range(2):
+                output, failed = multiprocessing_cls.run_to_array(items, (3,), np.float64)
+                np.testing.assert_array_equal(output, expected)
+                self.assertEqual(list(failed), [x < 0 for x in items])
+            self.assertIsNotNone(multiprocessing_cls._pool)
+        self.assertIsNone(multiprocessing_cls._pool)
+
+        output, failed = JoblibMultiprocessing(n_jobs=1, process=powers).run_to_array(items, (3,), np.float64)
+        np.testing.assert_array_equal(output, expected)
+
+        # without multiprocessing.shared_memory (Python 3.7) the results are pickled back
+        with patch('deepmol.parallelism.multiprocessing.shared_memory', None):
+            with JoblibMultiprocessing(n_jobs=2, process=powers, chunk_size=2) as multiprocessing_cls:
+                output, failed = multiprocessing_cls.run_to_array(items, (3,), np.float64)
+        np.testing.assert_array_equal(output, expected)
+        self.assertEqual(list(failed), [x < 0 for x in items])
+
+    def test_multiprocessing_run_chunks(self):
+        items = [(i, 2) for i in range(11)]
+        with JoblibMultiprocessing(n_jobs=2, process=divide, chunk_size=3) as multiprocessing_cls:
+            chunks = list(multiprocessing_cls.run_chunks(items, max_in_flight=2))
+        self.assertEqual([start for start, _ in chunks], [0, 3, 6, 9])
+        self.assertEqual([result for _, results in chunks for result in results], [i / 2 for i in range(11)])
+
+        serial_chunks = list(JoblibMultiprocessing(n_jobs=1, process=divide, chunk_size=3).run_chunks(items))
+        self.assertEqual(serial_chunks, chunks)
+
+        # only max_in_flight chunks are dispatched ahead of the consumer
+        for max_in_flight in [1, 2, 3]:
+            recorder = DispatchRecorder([(i, 2) for i in range(20)])
+            with JoblibMultiprocessing(n_jobs=2, process=divide, chunk_size=2) as multiprocessing_cls:
+                for consumed, _ in enumerate(multiprocessing_cls.run_chunks(recorder, max_in_flight=max_in_flight)):
+                    self.assertLessEqual(recorder.dispatched - consumed, max_in_flight)
+                    if consumed == 0:
+                        self.assertEqual(recorder.dispatched, max_in_flight)
+            self.assertEqual(recorder.dispatched, 10)
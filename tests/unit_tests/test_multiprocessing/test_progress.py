@@ -0,0 +1,56 @@
+import os
+import time
+from unittest import TestCase
+
+import numpy as np
+from rdkit.Chem import MolFromSmiles
+
+from deepmol.compound_featurization import MorganFingerprint
+from deepmol.datasets import SmilesDataset
+from deepmol.parallelism.multiprocessing import JoblibMultiprocessing, ThreadMultiprocessing
+from deepmol.parallelism.progress import ProgressMonitor
+
+
+def slow_length(smiles):
+    time.sleep(0.05 if smiles == 'CCCCCCCC' else 0.001)
+    return len(smiles)
+
+
+class TestProgressMonitor(TestCase):
+
+    def tearDown(self) -> None:
+        if os.path.exists('deepmol.log'):
+            os.remove('deepmol.log')
+
+    def test_progress_statistics(self):
+        reports = []
+        monitor = ProgressMonitor(log_interval=0, n_slowest=2, callback=reports.append)
+        items = ['C', 'CC', 'CCCCCCCC', 'CCC', 'CCCC', 'CCCCC']
+        for multiprocessing_cls in [JoblibMultiprocessing(n_jobs=2, process=slow_length, chunk_size=2, progress=monitor),
+                                    ThreadMultiprocessing(n_jobs=2, process=slow_length, chunk_size=2, progress=monitor)]:
+            reports.clear()
+            with multiprocessing_cls:
+                self.assertEqual(list(multiprocessing_cls.run(items)), [len(item) for item in items])
+            # one report per chunk and a final report
+            self.assertEqual(len(reports), 4)
+            stats = reports[-1]
+            self.assertEqual(stats['done'], 6)
+            self.assertEqual(stats['total'], 6)
+            self.assertEqual(stats['eta'], 0)
+            self.assertGreater(stats['items_per_second'], 0)
+            self.assertEqual(stats['slowest'][0][0], 'CCCCCCCC')
+            self.assertEqual(len(stats['slowest']), 2)
+            self.assertEqual(stats['latency_histogram'][0].sum(), 6)
+            self.assertTrue(all(0 <= utilization for utilization in stats['worker_utilization'].values()))
+
+    def test_progress_slowest_molecules(self):
+        reports = []
+        monitor = ProgressMonitor(log_interval=np.inf, n_slowest=3, callback=reports.append)
+        smiles = ['CCO', 'c1ccccc1', 'CCN', 'CCCC', 'CC(=O)O', 'CCCl']
+        MorganFingerprint(n_jobs=1, progress=monitor).featurize(SmilesDataset(smiles=smiles))
+        self.assertEqual(len(reports), 1)
+        self.assertEqual(reports[0]['done'], len(smiles))
+        self.assertEqual(len(reports[0]['slowest']), 3)
+        for item, seconds in reports[0]['slowest']:
+            self.assertIsNotNone(MolFromSmiles(item))
+            self.assertGreaterEqual(seconds, 0)
@@ -0,0 +1,88 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+
+from deepmol.compound_featurization import MACCSkeysFingerprint, MorganFingerprint, TwoDimensionDescriptors
+from deepmol.datasets import SmilesDataset
+from deepmol.utils.fingerprint_index import FingerprintIndex
+from deepmol.utils.similarity import tanimoto_matrix
+
+
+class TestFingerprintIndex(TestCase):
+
+    def setUp(self) -> None:
+        self.smiles = ['CCO', 'c1ccccc1O', 'CC(=O)Nc1ccc(O)cc1', 'CCN(CC)CC', 'CC(=O)Oc1ccccc1C(=O)O', 'C1CCCCC1',
+                       'CCCl', 'CCCCCCCCO', 'c1ccc2ccccc2c1', 'CC(C)Cc1ccc(C(C)C(=O)O)cc1', 'OCC(O)CO', 'CCOCC']
+        self.dataset = SmilesDataset(smiles=self.smiles, ids=[f'mol_{i}' for i in range(len(self.smiles))])
+        self.queries = ['CCCO', 'c1ccccc1N', 'CC(=O)Oc1ccccc1', 'invalid']
+        featurizer = MorganFingerprint(n_jobs=1)
+        self.fps = np.stack([featurizer._featurize(mol) for mol in self.dataset.mols])
+        self.query_fps = np.stack([featurizer._featurize(mol) for mol in SmilesDataset(smiles=self.queries[:3]).mols])
+        self.expected = tanimoto_matrix(self.query_fps, self.fps)
+
+    def test_knn(self):
+        for block_size in [1, 2, 1024]:
+            index = FingerprintIndex(n_jobs=2, block_size=block_size).build(self.dataset)
+            self.assertEqual(len(index), len(self.smiles))
+            similarities, indices = index.knn(self.queries, k=3)
+            self.assertEqual(similarities.shape, (4, 3))
+            np.testing.assert_allclose(similarities[:3], -np.sort(-self.expected, axis=1)[:, :3], atol=1e-6)
+            np.testing.assert_allclose(np.take_along_axis(self.expected, indices[:3], axis=1), similarities[:3],
+                                       atol=1e-6)
+            # molecules that can not be featurized have no neighbours
+            np.testing.assert_array_equal(indices[3], [-1, -1, -1])
+            self.assertEqual(index.ids[indices[0, 0]], 'mol_0')
+
+        # at most all the indexed molecules are returned
+        similarities, indices = index.knn(self.query_fps, k=20)
+        self.assertEqual(similarities.shape, (3, len(self.smiles)))
+        self.assertEqual(set(indices[0]), set(range(len(self.smiles))))
+
+        with self.assertRaises(ValueError):
+            index.knn(self.queries, k=0)
+
+    def test_range_query(self):
+        index = FingerprintIndex(n_jobs=1, block_size=2).build(self.dataset)
+        for threshold in [0.2, 0.5, 1.0]:
+            neighbors = index.range_query(self.queries, threshold)
+            self.assertTrue(sp.isspmatrix_csr(neighbors))
+            self.assertEqual(neighbors.shape, (4, len(self.smiles)))
+            expected = np.where(self.expected >= threshold, self.expected, 0)
+            np.testing.assert_allclose(neighbors.toarray()[:3], expected, atol=1e-6)
+            self.assertEqual(neighbors[3].nnz, 0)
+
+    def test_invalid_molecules(self):
+        dataset = SmilesDataset(smiles=['CCO', 'c1ccccc1O', 'CCN(CC)CC'], ids=['a', 'b', 'c'])
+        dataset._mols[1] = None
+        index = FingerprintIndex(n_jobs=1).build(dataset)
+        self.assertEqual(len(index), 2)
+        similarities, indices = index.knn(['CCO', 'CCN(CC)CC'], k=1)
+        np.testing.assert_array_equal(indices[:, 0], [0, 2])
+        np.testing.assert_allclose(similarities[:, 0], [1, 1])
+
+        with self.assertRaises(ValueError):
+            FingerprintIndex(n_jobs=1).build(SmilesDataset(smiles=['CCO'], ids=['a']).select_to_split([]))
+
+    def test_fingerprints(self):
+        index = FingerprintIndex(MACCSkeysFingerprint(n_jobs=1), n_jobs=1).build(self.dataset)
+        similarities, _ = index.knn(self.smiles[:2], k=1)
+        np.testing.assert_allclose(similarities[:, 0], [1, 1])
+        with self.assertRaises(ValueError):
+            FingerprintIndex(TwoDimensionDescriptors())
+
+    def test_save_load(self):
+        index = FingerprintIndex(n_jobs=1).build(self.dataset)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'index.pkl')
+            index.save(path)
+            loaded = FingerprintIndex.load(path)
+            np.testing.assert_array_equal(loaded.knn(self.queries, k=3)[1], index.knn(self.queries, k=3)[1])
+            np.testing.assert_array_equal(loaded.ids, index.ids)
+
+            joblib.dump(MorganFingerprint(), path)
+            with self.assertRaises(ValueError):
+                FingerprintIndex.load(path)
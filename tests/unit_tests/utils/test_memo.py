@@ -0,0 +1,60 @@
+from unittest import TestCase
+
+from rdkit import Chem
+
+from deepmol.utils import utils
+from deepmol.datasets import SmilesDataset
+from deepmol.utils.utils import smiles_to_mol, mol_to_smiles, set_memo_size, clear_memos, validate_smiles
+
+
+class TestMemo(TestCase):
+
+    def setUp(self) -> None:
+        clear_memos()
+
+    def tearDown(self) -> None:
+        set_memo_size(4096)
+
+    def test_smiles_to_mol(self):
+        first = smiles_to_mol('CC(=O)O')
+        second = smiles_to_mol('CC(=O)O')
+        self.assertIsNot(first, second)
+        self.assertEqual(Chem.MolToSmiles(first), Chem.MolToSmiles(second))
+        self.assertEqual(utils._smiles_to_mol_cache.hits, 1)
+
+        # the cached molecule is not modified through the returned copies
+        first.SetProp('name', 'acetic acid')
+        self.assertFalse(smiles_to_mol('CC(=O)O').HasProp('name'))
+
+        self.assertIsNone(smiles_to_mol('invalid'))
+        self.assertIsNone(smiles_to_mol('invalid'))
+        self.assertIsNone(smiles_to_mol(None))
+        self.assertIsNotNone(smiles_to_mol('C(C)O', sanitize=False))
+
+    def test_mol_to_smiles(self):
+        mol = Chem.MolFromSmiles('OCC')
+        self.assertEqual(mol_to_smiles(mol), 'CCO')
+        self.assertEqual(mol_to_smiles(Chem.MolFromSmiles('OCC')), 'CCO')
+        self.assertEqual(utils._mol_to_smiles_cache.hits, 1)
+        self.assertEqual(mol_to_smiles(mol, canonical=False), 'OCC')
+        self.assertEqual(mol_to_smiles(Chem.MolFromSmiles('[CH3:1][OH:2]')), '[CH3:1][OH:2]')
+        self.assertIsNone(mol_to_smiles(None))
+
+    def test_memo_size(self):
+        set_memo_size(2)
+        for smiles in ['C', 'CC', 'CCC']:
+            smiles_to_mol(smiles)
+        self.assertEqual(len(utils._smiles_to_mol_cache), 2)
+
+        set_memo_size(0)
+        smiles_to_mol('C')
+        self.assertEqual(len(utils._smiles_to_mol_cache), 0)
+
+    def test_parsed_molecules_not_memoized(self):
+        self.assertEqual(validate_smiles(['C', 'invalid', None, 'CCO']).tolist(), [True, False, False, True])
+        self.assertEqual(len(utils._smiles_to_mol_cache), 0)
+
+        # lazy molecules are only kept in the cache of the dataset
+        dataset = SmilesDataset(smiles=['C', 'CC', 'CCC'], lazy_mols=True)
+        self.assertEqual([mol.GetNumAtoms() for mol in dataset.mols], [1, 2, 3])
+        self.assertEqual(len(utils._smiles_to_mol_cache), 0)
@@ -0,0 +1,79 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+import scipy.sparse as sp
+from rdkit import Chem, DataStructs
+from rdkit.Chem import AllChem
+
+from deepmol.parallelism.multiprocessing import ThreadMultiprocessing
+from deepmol.utils.similarity import pack_fingerprints, popcount64, tanimoto_matrix, tanimoto_neighbors
+
+
+class TestSimilarity(TestCase):
+
+    def setUp(self) -> None:
+        smiles = ['CCO', 'c1ccccc1O', 'CC(=O)Nc1ccc(O)cc1', 'CCN(CC)CC', 'CC(=O)Oc1ccccc1C(=O)O', 'C1CCCCC1', 'CCCl']
+        self.fps = [AllChem.GetMorganFingerprintAsBitVect(Chem.MolFromSmiles(s), 2, nBits=2048) for s in smiles]
+        self.dense = np.array([list(fp) for fp in self.fps], dtype=np.uint8)
+
+    def test_pack_fingerprints(self):
+        words = pack_fingerprints(self.fps)
+        self.assertEqual(words.dtype, np.uint64)
+        self.assertEqual(words.shape, (7, 32))
+        np.testing.assert_array_equal(words, pack_fingerprints(self.dense))
+        np.testing.assert_array_equal(popcount64(words).sum(axis=1), self.dense.sum(axis=1))
+        self.assertIs(pack_fingerprints(words), words)
+
+        # fingerprints with a number of bits that is not a multiple of 64 are padded with zeros
+        self.assertEqual(pack_fingerprints(np.ones((2, 100))).shape, (2, 2))
+
+    def test_tanimoto_matrix(self):
+        expected = np.array([DataStructs.BulkTanimotoSimilarity(fp, self.fps) for fp in self.fps])
+        for block_size in [1, 3, 512]:
+            similarities = tanimoto_matrix(self.fps, block_size=block_size, n_jobs=2)
+            self.assertEqual(similarities.dtype, np.float32)
+            np.testing.assert_allclose(similarities, expected, atol=1e-6)
+
+        similarities = tanimoto_matrix(self.dense[:3], self.fps[2:], block_size=2)
+        np.testing.assert_allclose(similarities, expected[:3, 2:], atol=1e-6)
+
+        # the similarity of two empty fingerprints is 0
+        similarities = tanimoto_matrix(np.zeros((2, 64)), dtype=np.float16)
+        self.assertEqual(similarities.dtype, np.float16)
+        self.assertEqual(similarities.tolist(), [[0, 0], [0, 0]])
+
+        with self.assertRaises(ValueError):
+            tanimoto_matrix(self.fps, np.ones((2, 1024)))
+
+    def test_tanimoto_neighbors(self):
+        dense = tanimoto_matrix(self.fps)
+        neighbours = tanimoto_neighbors(self.fps, k=3, exclude_self=True, block_size=2, n_jobs=2)
+        self.assertIsInstance(neighbours, sp.csr_matrix)
+        expected = dense.copy()
+        np.fill_diagonal(expected, 0)
+        for i, row in enumerate(neighbours.toarray()):
+            self.assertEqual(np.count_nonzero(row), min(3, np.count_nonzero(expected[i])))
+            np.testing.assert_allclose(np.sort(row)[-3:], np.sort(expected[i])[-3:])
+
+        neighbours = tanimoto_neighbors(self.fps, self.fps[:4], threshold=0.2, block_size=3)
+        self.assertEqual(neighbours.shape, (7, 4))
+        np.testing.assert_allclose(neighbours.toarray(), np.where(dense[:, :4] >= 0.2, dense[:, :4], 0))
+
+        neighbours = tanimoto_neighbors(self.fps, k=100, threshold=0.5)
+        np.testing.assert_allclose(neighbours.toarray(), np.where(dense >= 0.5, dense, 0))
+
+        with self.assertRaises(ValueError):
+            tanimoto_neighbors(self.fps)
+        with self.assertRaises(ValueError):
+            tanimoto_neighbors(self.fps, k=0)
+
+    def test_thread_pools_closed(self):
+        with patch.object(ThreadMultiprocessing, 'close', autospec=True,
+                          side_effect=ThreadMultiprocessing.close) as close:
+            tanimoto_matrix(self.fps, block_size=2, n_jobs=2)
+            self.assertEqual(close.call_count, 1)
+            tanimoto_neighbors(self.fps, k=2, block_size=2, n_jobs=2)
+            self.assertEqual(close.call_count, 2)
+        for (multiprocessing_cls,), _ in close.call_args_list:
+            self.assertIsNone(multiprocessing_cls._executor)